@@ -5,11 +5,13 @@ Integrates with gmail_monitoring, email_filtering, and email_notifications skill
 """
 import os
 import json
+import threading
 from typing import Dict, List, Optional
 from datetime import datetime
 # from duckduckgo_search import DDGS (Disabled)
 from src.utils.config import Config
-from skills.chatbot_skill.skill import ChatbotSkill
+from src.utils.chat_sessions import ChatSessionManager
+from src.utils.context_compaction import compact_history, estimate_tokens, history_tokens
 import logging
 
 logger = logging.getLogger(__name__)
@@ -19,40 +21,23 @@ class ChatAgent:
     """Agent for handling conversational interactions with users using Gemini"""
     
     def __init__(self):
-        # Initialize Chatbot Skill
-        # Using gemini-2.5-flash as requested, falling back to 3.0-flash
-        self.chatbot_skill = ChatbotSkill(
-            api_key=Config.GOOGLE_API_KEY,
-            model_name='gemini-2.5-flash',
-            fallback_models=['gemini-3.0-flash']
-        )
+        # Tool backends (and the Gemini model) are built on first use: constructing
+        # them imports googleapiclient / Playwright / google.generativeai and can
+        # touch the network, which must not delay API server startup.
+        self._chatbot_skill = None
+        self._email_agent = None
+        self._odoo_agent = None
+        self._whatsapp_agent = None
+        self._linkedin_agent = None
+        self._notification_agent = None
+        self._init_lock = threading.RLock()
         
         # Initialize Skills
         from skills.web_search_skill.skill import WebSearchSkill
-        from agents.email_agent import EmailAgent
-        from agents.odoo_agent import OdooAgent
-
-        from agents.whatsapp_agent import WhatsAppAgent
-        from agents.linkedin_agent import LinkedInAgent
-        
         self.web_search_skill = WebSearchSkill()
         
-        # Initialize Agents (for tool use)
-        self.email_agent = EmailAgent(
-            credentials_path=Config.GMAIL_CREDENTIALS_PATH,
-            token_path=Config.GMAIL_TOKEN_PATH,
-            filter_keywords=Config.FILTER_KEYWORDS
-        )
-        
-        self.odoo_agent = OdooAgent()
-        self.whatsapp_agent = WhatsAppAgent()
-        self.linkedin_agent = LinkedInAgent()
-        
-        # Initialize Notification Agent for sending emails
-        from agents.notification_agent import NotificationAgent
-        self.notification_agent = NotificationAgent()
-        
         # Define Tools
+        # Keeping all tools active: WebSearch, Email, Odoo, WhatsApp, LinkedIn
         self.tools = [
             self.web_search_skill.search, 
             self._check_email_tool,
@@ -64,18 +49,153 @@ class ChatAgent:
             self._send_whatsapp_tool,
             self._post_linkedin_tool
         ]
-        self.chatbot_skill.set_tools(self.tools)
-        
-        # Tools were overwritten here previously - causing the bug!
-        # Keeping all tools active: WebSearch, Email, Odoo, WhatsApp, LinkedIn
-        self.chatbot_skill.set_tools(self.tools)
         
-        self.chat_session = None
-        self.conversation_history: List[Dict[str, str]] = []
+        # One Gemini chat session + conversation history per user_id, bounded in memory
+        self.sessions = ChatSessionManager(
+            self._start_session,
+            persist_dir=Config.CHAT_SESSION_DIR,
+            max_sessions=Config.CHAT_MAX_SESSIONS,
+            ttl_seconds=Config.CHAT_SESSION_TTL,
+            max_memory_bytes=Config.CHAT_SESSION_MEMORY_MB * 1024 * 1024
+        )
         # System prompt is now handled by the skill context or prepended to history/message if API supports it,
         # but for simplicity we'll keep the system prompt logic or pass it if the skill supported it.
         # The current simple skill doesn't strictly enforce system prompt in __init__, so we'll rely on it behaving as a chat model.
         
+    def _lazy(self, attr: str, factory):
+        """Build a backend once, on first use (thread-safe)"""
+        value = getattr(self, attr)
+        if value is None:
+            with self._init_lock:
+                value = getattr(self, attr)
+                if value is None:
+                    value = factory()
+                    setattr(self, attr, value)
+        return value
+    
+    @property
+    def chatbot_skill(self):
+        def build():
+            from skills.chatbot_skill.skill import ChatbotSkill
+            # Using gemini-2.5-flash as requested, falling back to 3.0-flash
+            skill = ChatbotSkill(
+                api_key=Config.GOOGLE_API_KEY,
+                model_name='gemini-2.5-flash',
+                fallback_models=['gemini-3.0-flash']
+            )
+            skill.set_tools(self.tools)
+            return skill
+        return self._lazy("_chatbot_skill", build)
+    
+    @property
+    def email_agent(self):
+        def build():
+            from agents.email_agent import EmailAgent
+            return EmailAgent(
+                credentials_path=Config.GMAIL_CREDENTIALS_PATH,
+                token_path=Config.GMAIL_TOKEN_PATH,
+                filter_keywords=Config.FILTER_KEYWORDS
+            )
+        return self._lazy("_email_agent", build)
+    
+    @property
+    def odoo_agent(self):
+        def build():
+            from agents.odoo_agent import OdooAgent
+            return OdooAgent()
+        return self._lazy("_odoo_agent", build)
+    
+    @property
+    def whatsapp_agent(self):
+        def build():
+            from agents.whatsapp_agent import WhatsAppAgent
+            return WhatsAppAgent()
+        return self._lazy("_whatsapp_agent", build)
+    
+    @property
+    def linkedin_agent(self):
+        def build():
+            from agents.linkedin_agent import LinkedInAgent
+            return LinkedInAgent()
+        return self._lazy("_linkedin_agent", build)
+    
+    @property
+    def notification_agent(self):
+        def build():
+            # Notification Agent for sending emails
+            from agents.notification_agent import NotificationAgent
+            return NotificationAgent()
+        return self._lazy("_notification_agent", build)
+    
+    def warm_up(self):
+        """Build the Gemini model ahead of the first chat (call off the request path)"""
+        return self.chatbot_skill
+    
+    def _start_session(self, history: List[Dict[str, str]]):
+        """Start a Gemini chat session primed with a user's earlier turns (rehydration)"""
+        gemini_history = []
+        for i, turn in enumerate(history):
+            text = turn["content"]
+            if i == 0 and turn["role"] == "user":
+                # The system prompt is sent with the first user message
+                text = self._build_system_prompt() + "\n\n" + text
+            gemini_history.append({
+                "role": "user" if turn["role"] == "user" else "model",
+                "parts": [text]
+            })
+        return self.chatbot_skill.start_chat(history=gemini_history)
+    
+    def _compact_if_needed(self, state, user_message: str):
+        """
+        Summarize older turns once the context would exceed the token budget.
+        
+        The estimate (chars / 4) is compared with the prompt size Gemini
+        reported for the previous turn, which also covers tool-call traffic.
+        """
+        estimated = (estimate_tokens(self._build_system_prompt()) + history_tokens(state.history)
+                     + estimate_tokens(user_message))
+        if max(estimated, state.prompt_tokens) <= Config.CHAT_CONTEXT_TOKEN_BUDGET:
+            return
+        
+        history, compacted = compact_history(
+            state.history,
+            keep_recent=Config.CHAT_KEEP_RECENT_TURNS,
+            summary_tokens=Config.CHAT_CONTEXT_TOKEN_BUDGET // 8
+        )
+        if not compacted:
+            return
+        
+        logger.info(f"ChatAgent: Compacted {compacted} turn(s) for '{state.user_id}' "
+                    f"(~{max(estimated, state.prompt_tokens)} tokens > {Config.CHAT_CONTEXT_TOKEN_BUDGET})")
+        state.history[:] = history
+        state.chat_session = self._start_session(state.history)
+        state.prompt_tokens = 0
+    
+    def _check_session_model(self, state):
+        """
+        Keep a user's session on the skill's current model.
+        
+        After a fallback switch (e.g. the primary model returned 404), sessions
+        started on the old model would fail every turn: the session is dropped
+        so the next turn rebuilds it from the history on the fallback model.
+        """
+        current = self.chatbot_skill.model_name
+        if state.model_name is not None and state.model_name != current:
+            logger.info(f"ChatAgent: Restarting session for '{state.user_id}' on {current} "
+                        f"(was {state.model_name})")
+            state.chat_session = self._start_session(state.history)
+        state.model_name = current
+    
+    def _drop_stale_session(self, state):
+        """Drop the session if the model was switched during this turn (rebuilt next turn)"""
+        if state.model_name != self.chatbot_skill.model_name:
+            self._drop_session(state)
+    
+    def _drop_session(self, state):
+        """Drop the session; the next turn rebuilds it from the history"""
+        state.chat_session = None
+        state.model_name = None
+    
     def _build_system_prompt(self) -> str:
         """Build system prompt with agent context and capabilities"""
         return f"""You are the Panversity Student Assistant, an AI-powered helper for students and staff.
@@ -311,46 +431,60 @@ Be helpful, concise, and professional. Use emojis sparingly to make responses fr
             odoo_context = ""
             if any(kw in user_message.lower() for kw in ["odoo", "lead", "crm", "sales", "opportunity"]):
                 try:
-                    from agents.odoo_agent import OdooAgent
-                    odoo = OdooAgent()
-                    if odoo.enabled:
-                        summary = odoo.get_recent_leads_summary()
+                    # Cached and refreshed in the background: never waits on Odoo
+                    from agents.odoo_agent import get_leads_summary_cache
+                    summary = get_leads_summary_cache().get()
+                    if summary:
                         odoo_context = f"\n[SYSTEM CONTEXT]\n{summary}\n[END CONTEXT]\n"
                 except Exception as e:
                     print(f"ChatAgent: Failed to fetch Odoo context: {e}")
 
-            # Initialize chat session if not exists
-            if self.chat_session is None:
-                self.chat_session = self.chatbot_skill.start_chat(history=[])
+            with self.sessions.session(user_id) as state:
+                self._compact_if_needed(state, user_message)
+                self._check_session_model(state)
                 
-            # Prepare message with context
-            # We rely on the model to call tools (Web Search) if needed.
-            full_context = ""
-            if len(self.conversation_history) == 0:
-                 full_context = self._build_system_prompt() + "\n\n"
+                # Prepare message with context
+                # We rely on the model to call tools (Web Search) if needed.
+                full_context = ""
+                if len(state.history) == 0:
+                     full_context = self._build_system_prompt() + "\n\n"
 
-            full_message = full_context + user_message
+                full_message = full_context + odoo_context + user_message
             
-            # Get response from Skill (Gemini handles function calling automatically via SDK)
-            ai_message = self.chatbot_skill.generate_response(self.chat_session, full_message)
+                # Get response from Skill (tool calls are resolved inside the skill)
+                result = self.chatbot_skill.complete_turn(state.chat_session, full_message)
+                if result["error"]:
+                    # Failed turns stay out of the history; the session is rebuilt from it next turn
+                    self._drop_session(state)
+                    return {
+                        "status": "error",
+                        "response": result["error"],
+                        "timestamp": datetime.now().isoformat(),
+                        "user_id": user_id,
+                        "error": result["error"]
+                    }
+                ai_message, usage = result["text"], result["usage"]
+                state.prompt_tokens = usage.get("prompt_tokens", 0)
+                self._drop_stale_session(state)
             
-            # Add to conversation history
-            self.conversation_history.append({
-                "role": "user",
-                "content": user_message,
-                "timestamp": datetime.now().isoformat()
-            })
-            self.conversation_history.append({
-                "role": "assistant",
-                "content": ai_message,
-                "timestamp": datetime.now().isoformat()
-            })
+                # Add to conversation history
+                state.history.append({
+                    "role": "user",
+                    "content": user_message,
+                    "timestamp": datetime.now().isoformat()
+                })
+                state.history.append({
+                    "role": "assistant",
+                    "content": ai_message,
+                    "timestamp": datetime.now().isoformat()
+                })
             
             return {
                 "status": "success",
                 "response": ai_message,
                 "timestamp": datetime.now().isoformat(),
                 "user_id": user_id,
+                "tokens_used": usage.get("total_tokens", 0),
                 "web_search_used": False # Handled internally by model now
             }
             
@@ -375,53 +509,71 @@ Be helpful, concise, and professional. Use emojis sparingly to make responses fr
         Yields:
             Chunks of the AI response
         """
-        try:
-            # Initialize chat session if not exists
-            if self.chat_session is None:
-                self.chat_session = self.chatbot_skill.start_chat(history=[])
+        for event in self.stream_chat_events(user_message, user_id):
+            if event["type"] in ("text", "error"):
+                yield event["content"]
+    
+    def stream_chat_events(self, user_message: str, user_id: str = "default"):
+        """
+        Stream a chat turn as events (see ChatbotSkill.stream_events)
+        
+        Text arrives incrementally; tool calls made by the model show up as
+        tool_start / tool_end events between text segments.
+        
+        Args:
+            user_message: The user's message
+            user_id: User identifier for context
             
-            # Prepare message
-            full_context = ""
-            if len(self.conversation_history) == 0:
-                 full_context = self._build_system_prompt() + "\n\n"
+        Yields:
+            Event dicts: text, tool_start, tool_end, usage, error
+        """
+        try:
+            with self.sessions.session(user_id) as state:
+                self._compact_if_needed(state, user_message)
+                self._check_session_model(state)
+                
+                # Prepare message
+                full_context = ""
+                if len(state.history) == 0:
+                     full_context = self._build_system_prompt() + "\n\n"
 
-            full_message = full_context + user_message
-            # yield f"🔍 *Thinking... (I can search the web if needed)*\n\n"
-            
-            # Prepare message
-            full_context = ""
-            if len(self.conversation_history) == 0:
-                 full_context = self._build_system_prompt() + "\n\n"
-            
-            # Note: Streaming with tools is complex in some SDKs. 
-            # If function call happens, it might not stream until function resolves.
-            # For now, we assume standard stream.
+                full_message = full_context + user_message
 
-            # Stream response from Skill
-            full_response = ""
-            for chunk in self.chatbot_skill.stream_response(self.chat_session, full_message):
-                full_response += chunk
-                yield chunk
+                # Stream response from Skill
+                full_response = ""
+                failed = False
+                for event in self.chatbot_skill.stream_events(state.chat_session, full_message):
+                    if event["type"] == "text":
+                        full_response += event["content"]
+                    elif event["type"] == "error":
+                        failed = True
+                    elif event["type"] == "usage":
+                        state.prompt_tokens = event["prompt_tokens"]
+                    yield event
+                if failed:
+                    # Failed turns stay out of the history; the session is rebuilt from it next turn
+                    self._drop_session(state)
+                    return
+                self._drop_stale_session(state)
             
-            # Add to conversation history
-            self.conversation_history.append({
-                "role": "user",
-                "content": user_message,
-                "timestamp": datetime.now().isoformat()
-            })
-            self.conversation_history.append({
-                "role": "assistant",
-                "content": full_response,
-                "timestamp": datetime.now().isoformat()
-            })
+                # Add to conversation history
+                state.history.append({
+                    "role": "user",
+                    "content": user_message,
+                    "timestamp": datetime.now().isoformat()
+                })
+                state.history.append({
+                    "role": "assistant",
+                    "content": full_response,
+                    "timestamp": datetime.now().isoformat()
+                })
             
         except Exception as e:
-            yield f"Error: {str(e)}"
+            yield {"type": "error", "content": f"Error: {str(e)}"}
     
-    def clear_history(self):
-        """Clear conversation history and reset chat session"""
-        self.conversation_history = []
-        self.chat_session = None
+    def clear_history(self, user_id: str = "default"):
+        """Clear a user's conversation history and reset their chat session"""
+        self.sessions.clear(user_id)
     
     def get_status(self) -> Dict[str, any]:
         """
@@ -433,7 +585,7 @@ Be helpful, concise, and professional. Use emojis sparingly to make responses fr
         return {
             "agent": "ChatAgent",
             "status": "active",
-            "conversation_length": len(self.conversation_history),
+            "sessions": self.sessions.get_stats(),
             "gemini_configured": bool(Config.GOOGLE_API_KEY),
             "model": "gemini-2.5-flash",
             "skills_available": [
@@ -445,7 +597,7 @@ Be helpful, concise, and professional. Use emojis sparingly to make responses fr
             "web_search": "enabled"
         }
     
-    def get_conversation_history(self) -> List[Dict[str, str]]:
-        """Get current conversation history"""
-        return self.conversation_history.copy()
+    def get_conversation_history(self, user_id: str = "default") -> List[Dict[str, str]]:
+        """Get a user's conversation history"""
+        return self.sessions.get_history(user_id)
 
@@ -43,24 +43,30 @@ class LinkedInAgent:
         messages = results.get("messages", [])
         logger.info(f"LinkedInAgent: Found {len(messages)} messages.")
         
-        created_count = 0
+        synced_count = 0
+        skipped_count = 0
         errors = []
         
-        # 2. Sync to Odoo
-        for msg in messages:
-            if odoo_agent and odoo_agent.enabled:
-                res = odoo_agent.create_lead_from_linkedin(msg)
-                if res.get("success"):
-                    created_count += 1
+        # 2. Sync to Odoo (already-synced messages are skipped, new leads created in bulk)
+        if messages and odoo_agent and odoo_agent.enabled:
+            res = odoo_agent.create_leads_from_linkedin(messages)
+            if "results" not in res:
+                errors.append(f"Failed to sync leads: {res.get('error')}")
+            for msg, outcome in zip(messages, res.get("results", [])):
+                if not outcome["success"]:
+                    errors.append(f"Failed to sync lead for {msg.get('sender')}: {outcome.get('error')}")
+                elif outcome["action"] == "skipped":
+                    skipped_count += 1
                 else:
-                    errors.append(f"Failed to create lead for {msg.get('sender')}: {res.get('error')}")
-            else:
-                 logger.warning("LinkedInAgent: Odoo Agent not available/enabled. Skipping sync.")
+                    synced_count += 1
+        elif messages:
+             logger.warning("LinkedInAgent: Odoo Agent not available/enabled. Skipping sync.")
         
         return {
             "success": True,
             "leads_found": len(messages),
-            "leads_synced": created_count,
+            "leads_synced": synced_count,
+            "leads_skipped": skipped_count,
             "errors": errors
         }
         
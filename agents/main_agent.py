@@ -10,12 +10,11 @@ from typing import List, Dict, Any
 from pathlib import Path
 
 from src.utils.config import Config
-from agents.email_agent import EmailAgent
-from agents.notification_agent import NotificationAgent
-from agents.whatsapp_agent import WhatsAppAgent
-from agents.linkedin_agent import LinkedInAgent
-from agents.github_agent import GitHubAgent
-from agents.odoo_agent import OdooAgent
+from src.utils.dispatch_queue import DispatchQueue
+from src.utils.digest import DigestAggregator
+from src.utils.history_log import get_history_log
+from src.utils.history_store import get_history_store
+from src.utils.lead_index import content_id
 
 logging.basicConfig(
     level=logging.INFO,
@@ -41,9 +40,18 @@ class MainAgent:
         self.linkedin_agent = None
         self.github_agent = None
         self.odoo_agent = None
+        self.dispatcher = None
+        self.digest = None
         self.running = False
         self.chat_history_dir = Path("History/chat_history")
         self.chat_history_dir.mkdir(parents=True, exist_ok=True)
+        self.history_store = get_history_store(self.config.HISTORY_DB_PATH)
+        self.history_log = get_history_log(
+            str(self.chat_history_dir),
+            fsync=self.config.HISTORY_FSYNC,
+            flush_interval=self.config.HISTORY_FLUSH_INTERVAL,
+            store=self.history_store
+        )
         
         # Validate configuration
         errors = self.config.validate()
@@ -57,6 +65,15 @@ class MainAgent:
         """Initialize all agents"""
         logger.info("Main Agent: Initializing Panaversity Student Assistant...")
         
+        # Sub-agent imports pull in googleapiclient / Playwright; keep them out of
+        # module import so the API server can import MainAgent cheaply
+        from agents.email_agent import EmailAgent
+        from agents.notification_agent import NotificationAgent
+        from agents.whatsapp_agent import WhatsAppAgent
+        from agents.linkedin_agent import LinkedInAgent
+        from agents.github_agent import GitHubAgent
+        from agents.odoo_agent import OdooAgent
+        
         self.config.print_config()
         
         # Initialize Email Agent
@@ -117,6 +134,9 @@ class MainAgent:
         else:
             logger.info("Main Agent: Odoo Agent disabled (missing config)")
 
+        # Start the dispatch queue now so jobs left over from a crash resume at startup
+        self._start_dispatcher()
+
         logger.info("Main Agent: Initialization complete!")
     
     def check_emails(self):
@@ -142,42 +162,33 @@ class MainAgent:
             
             logger.info(f"Main Agent: Processing {len(relevant_emails)} email(s)")
             
-            # Send notifications via Notification Agent
+            # Hand the notifications to the dispatch queue; workers send them in the background
+            dispatcher = self.dispatcher
+            jobs_queued = 0
             for email in relevant_emails:
                 safe_subject = email['subject'].encode('ascii', 'ignore').decode('ascii')
-                logger.info(f"Main Agent: Processing '{safe_subject}'")
-                
-                success = self.notification_agent.send_email_alert(
-                    admin_email=self.config.ADMIN_EMAIL,
-                    email_data=email
-                )
+                logger.info(f"Main Agent: Queueing alerts for '{safe_subject}'")
                 
-                if success:
-                    logger.info(f"[OK] Notification sent for: {email['subject']}")
-                else:
-                    logger.error(f"[FAIL] Failed to send notification for: {email['subject']}")
+                # In digest mode alerts are buffered and sent as one batch per window
+                if self.digest:
+                    self.digest.add(email)
                 
-                # Send WhatsApp Alert
-                if self.whatsapp_agent:
-                    wa_message = f"📧 New Important Email: {email['subject']}\nFrom: {email.get('sender', 'Unknown')}"
-                    wa_result = self.whatsapp_agent.send_alert(wa_message)
-                    if wa_result.get("success"):
-                        logger.info(f"[OK] WhatsApp alert sent for: {email['subject']}")
-                    else:
-                        logger.error(f"[FAIL] Failed to send WhatsApp alert: {wa_result.get('error')}")
-                
-                # Create Odoo Lead
-                if self.odoo_agent and self.odoo_agent.enabled:
-                    odoo_result = self.odoo_agent.create_lead_from_email(email)
-                    if odoo_result.get("success"):
-                        logger.info(f"[OK] Created Odoo Lead ID: {odoo_result.get('id')}")
-                    else:
-                        logger.error(f"[FAIL] Failed to create Odoo Lead: {odoo_result.get('error')}")
+                for channel in dispatcher.channels:
+                    if channel.endswith("_digest") or channel == "whatsapp_alert":
+                        continue
+                    dispatcher.enqueue(channel, email)
+                    jobs_queued += 1
+
+            # WhatsApp alerts of one check go out as one paced batch on the open session
+            if "whatsapp_alert" in dispatcher.channels:
+                dispatcher.enqueue("whatsapp_alert", {"emails": relevant_emails})
+                jobs_queued += 1
 
             # Log to chat history
             self._log_to_chat_history("email_check", {
                 "status": "completed",
                 "emails_found": len(relevant_emails),
+                "jobs_queued": jobs_queued,
                 "emails": [{"subject": e['subject'], "priority": e.get('priority')} for e in relevant_emails]
             })
         
@@ -191,29 +202,133 @@ class MainAgent:
         logger.info("Main Agent: Email check task complete")
         logger.info("=" * 60)
     
-    def _log_to_chat_history(self, task_name: str, data: Dict[str, Any]):
-        """Log task execution to chat history"""
-        timestamp = datetime.now().isoformat()
+    def _start_dispatcher(self) -> DispatchQueue:
+        """Create and start the notification dispatch queue (recovering persisted jobs)"""
+        if self.dispatcher is None:
+            dispatcher = DispatchQueue()
+            retries = self.config.DISPATCH_MAX_RETRIES
+            backoff = self.config.DISPATCH_BACKOFF_SECONDS
+            
+            # Alerts go out either per email or as one digest per window
+            suffix = "_digest" if self.config.DIGEST_ENABLED else "_alert"
+            if self.notification_agent:
+                handler = self._dispatch_email_digest if self.config.DIGEST_ENABLED else self._dispatch_email_alert
+                dispatcher.register(f"email{suffix}", handler,
+                                    workers=2, max_retries=retries, backoff=backoff)
+            if self.whatsapp_agent:
+                # One browser profile: WhatsApp sends must not run in parallel
+                handler = self._dispatch_whatsapp_digest if self.config.DIGEST_ENABLED else self._dispatch_whatsapp_alert
+                dispatcher.register(f"whatsapp{suffix}", handler,
+                                    workers=1, max_retries=retries, backoff=backoff)
+            if self.odoo_agent and self.odoo_agent.enabled:
+                # Lead dedupe is lookup-then-create: one worker so jobs for a thread cannot race
+                dispatcher.register("odoo_lead", self._dispatch_odoo_lead,
+                                    workers=1, max_retries=retries, backoff=backoff)
+            
+            dispatcher.start()
+            self.dispatcher = dispatcher
+            
+            if self.config.DIGEST_ENABLED:
+                # Buffered alerts are kept on disk so a crash mid-window does not drop them
+                self.digest = DigestAggregator(
+                    self._flush_digest,
+                    window_seconds=self.config.DIGEST_WINDOW_SECONDS,
+                    max_items=self.config.DIGEST_MAX_ITEMS,
+                    buffer_path="data/vault/digest_buffer.jsonl"
+                )
+                logger.info(f"Main Agent: Digest mode on ({self.config.DIGEST_WINDOW_SECONDS}s window, "
+                            f"max {self.config.DIGEST_MAX_ITEMS} items)")
+                self.digest.recover()
+        return self.dispatcher
+    
+    def _flush_digest(self, emails: List[Dict[str, Any]]):
+        """Digest callback: queue one combined alert per channel"""
+        for channel in self.dispatcher.channels:
+            if channel.endswith("_digest"):
+                self.dispatcher.enqueue(channel, {"emails": emails})
+    
+    def _dispatch_email_alert(self, email: Dict[str, Any]) -> bool:
+        """Dispatch handler: SMTP alert for one email"""
+        success = self.notification_agent.send_email_alert(
+            admin_email=self.config.ADMIN_EMAIL,
+            email_data=email
+        )
+        
+        if success:
+            logger.info(f"[OK] Notification sent for: {email['subject']}")
+        else:
+            logger.error(f"[FAIL] Failed to send notification for: {email['subject']}")
+        return success
+    
+    def _dispatch_whatsapp_alert(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Dispatch handler: one WhatsApp alert per email, sent as one batch"""
+        # Jobs queued before batching carry a single email
+        emails = payload["emails"] if "emails" in payload else [payload]
+        wa_messages = [f"📧 New Important Email: {email['subject']}\nFrom: {email.get('sender', 'Unknown')}"
+                       for email in emails]
+        wa_result = self.whatsapp_agent.send_alerts(wa_messages)
+        
+        failed = [email for email, result in zip(emails, wa_result.get("results", [])) if not result.get("success")]
+        failed += emails[len(wa_result.get("results", [])):]
+        for email, result in zip(emails, wa_result.get("results", [])):
+            if result.get("success"):
+                logger.info(f"[OK] WhatsApp alert {result.get('status')} for: {email['subject']}")
+            else:
+                logger.error(f"[FAIL] Failed to send WhatsApp alert: {result.get('error')}")
+        
+        if failed:
+            # The queue retries this job: only resend the alerts that did not go out
+            return {"success": False,
+                    "error": wa_result.get("error") or f"{len(failed)} of {len(emails)} WhatsApp alert(s) failed",
+                    "retry_payload": {"emails": failed}}
+        return wa_result
+    
+    def _dispatch_email_digest(self, payload: Dict[str, Any]) -> bool:
+        """Dispatch handler: one SMTP digest for a batch of emails"""
+        emails = payload["emails"]
+        success = self.notification_agent.send_digest_alert(
+            admin_email=self.config.ADMIN_EMAIL,
+            emails=emails
+        )
+        
+        if success:
+            logger.info(f"[OK] Digest sent for {len(emails)} email(s)")
+        else:
+            logger.error(f"[FAIL] Failed to send digest for {len(emails)} email(s)")
+        return success
+    
+    def _dispatch_whatsapp_digest(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Dispatch handler: one WhatsApp message for a batch of emails"""
+        emails = payload["emails"]
+        wa_result = self.whatsapp_agent.send_digest_alert(emails)
+        
+        if wa_result.get("success"):
+            logger.info(f"[OK] WhatsApp digest sent for {len(emails)} email(s)")
+        else:
+            logger.error(f"[FAIL] Failed to send WhatsApp digest: {wa_result.get('error')}")
+        return wa_result
+    
+    def _dispatch_odoo_lead(self, email: Dict[str, Any]) -> Dict[str, Any]:
+        """Dispatch handler: Odoo lead for one email"""
+        odoo_result = self.odoo_agent.create_lead_from_email(email)
+        
+        if odoo_result.get("success"):
+            logger.info(f"[OK] Odoo Lead ID {odoo_result.get('id')} ({odoo_result.get('action')})")
+        else:
+            logger.error(f"[FAIL] Failed to create Odoo Lead: {odoo_result.get('error')}")
+        return odoo_result
+    
+    def _log_to_chat_history(self, task_name: str, data: Dict[str, Any], status: str = None):
+        """Log task execution to chat history (appended to History/chat_history/YYYY-MM-DD.jsonl)"""
         log_entry = {
-            "timestamp": timestamp,
+            "timestamp": datetime.now().isoformat(),
             "task": task_name,
             "data": data
         }
+        if status is not None:
+            log_entry["status"] = status
         
-        # Create daily log file
-        date_str = datetime.now().strftime("%Y-%m-%d")
-        log_file = self.chat_history_dir / f"{date_str}.json"
-        
-        # Append to log
-        logs = []
-        if log_file.exists():
-            with open(log_file, 'r') as f:
-                logs = json.load(f)
-        
-        logs.append(log_entry)
-        
-        with open(log_file, 'w') as f:
-            json.dump(logs, f, indent=2)
+        self.history_log.append(log_entry)
     
     def schedule_tasks(self):
         """Schedule periodic tasks"""
@@ -244,12 +359,22 @@ class MainAgent:
         except KeyboardInterrupt:
             logger.info("Main Agent: Stopping assistant...")
             self.running = False
+            if self.digest:
+                self.digest.flush()
+            if self.dispatcher:
+                self.dispatcher.stop()
     
     def run_manual_check(self):
         """Run a single manual email check"""
         logger.info("Main Agent: Running manual email check...")
         self.initialize()
         self.check_emails()
+        
+        # Send any buffered digest now, then wait for queued notifications before exiting
+        if self.digest:
+            self.digest.flush()
+        if self.dispatcher and not self.dispatcher.join(timeout=600):
+            logger.warning("Main Agent: Some notifications are still queued; they will resume on next start")
         logger.info("Main Agent: Manual check complete!")
     
     def status(self):
@@ -291,6 +416,7 @@ class MainAgent:
             "linkedin_agent": self.linkedin_agent.get_status() if self.linkedin_agent else "disabled",
             "github_agent": self.github_agent.get_status() if self.github_agent else "disabled",
             "odoo_agent": self.odoo_agent.get_status() if self.odoo_agent else "disabled",
+            "dispatch_queue": self.dispatcher.get_status() if self.dispatcher else "idle",
             "config": {
                 "email_check_interval": self.config.EMAIL_CHECK_INTERVAL,
                 "filter_keywords": self.config.FILTER_KEYWORDS,
@@ -321,10 +447,12 @@ class MainAgent:
             if self.odoo_agent and self.odoo_agent.enabled:
                 sender = event_data.get('sender', 'Unknown')
                 content = event_data.get('last_message') or event_data.get('content') or ""
+                # Same message again -> no-op; new message from the same sender -> note on their lead
                 self.odoo_agent.create_lead_from_email({
+                    "id": event_data.get("id") or content_id(sender, content),
                     "subject": f"Trigger from {source}: {sender}",
                     "sender": sender,
                     "body": content
-                })  # Reusing email method for now or add generic create_lead
+                }, source=source)
         
         logger.info("Main Agent: Trigger processing complete.")
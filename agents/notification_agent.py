@@ -2,7 +2,7 @@
 Notification Agent - Uses Email Notification Skill
 """
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from skills.email_notifications.email_notifications import EmailNotificationSkill
 from src.utils.config import Config
 
@@ -41,6 +41,22 @@ class NotificationAgent:
         
         return success
     
+    def send_digest_alert(self, admin_email: str, emails: List[Dict[str, Any]]) -> bool:
+        """Send one digest notification covering several emails"""
+        logger.info(f"Notification Agent: Sending digest for {len(emails)} email(s)")
+        
+        success = self.notification_skill.notify_digest(
+            admin_email=admin_email,
+            emails=emails
+        )
+        
+        if success:
+            logger.info("Notification Agent: Digest sent successfully")
+        else:
+            logger.error("Notification Agent: Failed to send digest")
+        
+        return success
+    
     def send_email(self, to_email: str, subject: str, body: str) -> Dict[str, Any]:
         """Send a direct email"""
         try:
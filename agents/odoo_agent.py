@@ -2,12 +2,50 @@
 Odoo Agent
 """
 import logging
-from typing import Dict, Any
+import threading
+from typing import Dict, Any, List
 from skills.odoo_skill.skill import OdooSkill
+from src.utils.cache import RefreshingCache
 from src.utils.config import Config
+from src.utils.lead_index import content_id, get_lead_index, lead_keys
 
 logger = logging.getLogger(__name__)
 
+_leads_summary_cache = None
+_leads_summary_lock = threading.Lock()
+
+# The dedupe is lookup -> create -> index write; two syncs of the same thread
+# running at once would both miss the index and both create a lead
+_upsert_lock = threading.Lock()
+
+
+def get_leads_summary_cache() -> RefreshingCache:
+    """
+    Process-wide cache of OdooAgent.get_recent_leads_summary()
+    
+    Loaded and refreshed in the background by one long-lived OdooAgent (so the
+    XML-RPC login happens once); chat turns read it without waiting on Odoo.
+    """
+    global _leads_summary_cache
+    with _leads_summary_lock:
+        if _leads_summary_cache is None:
+            agent = OdooAgent()
+            _leads_summary_cache = RefreshingCache(
+                # Raise on Odoo errors so the cache keeps the last good summary and backs off
+                lambda: agent.get_recent_leads_summary(raise_errors=True),
+                ttl=Config.ODOO_LEADS_CACHE_TTL,
+                name="odoo-leads"
+            )
+            if agent.enabled:
+                _leads_summary_cache.start()
+        return _leads_summary_cache
+
+
+def invalidate_leads_summary():
+    """Drop the cached summary after a lead was created in this process"""
+    if _leads_summary_cache is not None:
+        _leads_summary_cache.invalidate()
+
 class OdooAgent:
     """Agent for Odoo ERP interaction"""
     
@@ -15,8 +53,14 @@ class OdooAgent:
         self.skill = OdooSkill()
         self.enabled = self.skill.enabled
         
-    def create_lead_from_email(self, email_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Create a CRM lead from an email"""
+    def create_lead_from_email(self, email_data: Dict[str, Any], source: str = "email") -> Dict[str, Any]:
+        """
+        Create a CRM lead from an email (idempotent)
+        
+        An email that was already synced is skipped; a new email in a thread
+        that already has a lead (same sender and subject) is added to that
+        lead as a note instead of creating another one.
+        """
         if not self.enabled:
             return {"success": False, "error": "Odoo disabled"}
             
@@ -26,35 +70,169 @@ class OdooAgent:
         
         description = f"Generated from Email.\nSender: {sender}\n\nBody:\n{body}"
         
-        logger.info(f"OdooAgent: Creating Lead for '{subject}'...")
+        logger.info(f"OdooAgent: Syncing Lead for '{subject}'...")
         
-        return self.skill.create_lead(
-            name=subject,
-            email_from=sender,
-            description=description
+        return self.upsert_lead(
+            {"name": subject, "email_from": sender, "description": description},
+            source=source, sender=sender, subject=subject, message_id=email_data.get("id")
         )
         
     def create_lead_from_linkedin(self, message_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Create a CRM lead from a LinkedIn message"""
+        """Create a CRM lead from a LinkedIn message (idempotent, see create_leads_from_linkedin)"""
         if not self.enabled:
             return {"success": False, "error": "Odoo disabled"}
             
-        sender = message_data.get("sender", "Unknown")
-        content = message_data.get("content", "")
+        logger.info(f"OdooAgent: Syncing LinkedIn Lead from '{message_data.get('sender', 'Unknown')}'...")
+        return self.upsert_leads_bulk([self._linkedin_lead_item(message_data)])["results"][0]
+    
+    def create_leads_from_linkedin(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Sync LinkedIn messages to CRM leads in bulk (results in input order)
         
-        description = f"Source: LinkedIn Message\n\nContent:\n{content}"
+        One lead per sender: a preview seen before is skipped, a new preview
+        from a known sender is logged as a note on that sender's lead.
+        """
+        if not self.enabled:
+            return {"success": False, "error": "Odoo disabled"}
         
-        logger.info(f"OdooAgent: Creating LinkedIn Lead from '{sender}'...")
-        return self.skill.create_lead(
-            name=f"LinkedIn Inquiry: {sender}",
-            email_from="linkedin@placeholder.com", 
-            description=description
-        )
+        logger.info(f"OdooAgent: Syncing {len(messages)} LinkedIn Leads in bulk...")
+        return self.upsert_leads_bulk([self._linkedin_lead_item(msg) for msg in messages])
+    
+    def create_leads_bulk(self, records: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Create many leads from crm.lead field dicts (proxy to skill, no dedupe)"""
+        if not self.enabled: return {"success": False, "error": "Disabled"}
+        result = self.skill.create_leads_bulk(records)
+        if result.get("created"):
+            invalidate_leads_summary()
+        return result
+    
+    def upsert_lead(self, values: Dict[str, Any], source: str, sender: str = "",
+                    subject: str = "", message_id: str = None) -> Dict[str, Any]:
+        """Create or update one lead through the dedupe index (see upsert_leads_bulk)"""
+        if not self.enabled: return {"success": False, "error": "Disabled"}
+        return self.upsert_leads_bulk([{
+            "values": values, "source": source, "sender": sender,
+            "subject": subject, "message_id": message_id
+        }])["results"][0]
+    
+    def upsert_leads_bulk(self, items: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Create or update leads for inbound messages, skipping work already done.
+        
+        Each item has crm.lead `values` plus `source`, `sender`, `subject` and
+        an optional source `message_id`. Per item, using the local dedupe index:
+        - message already synced -> "skipped" (no RPC)
+        - known sender+subject thread -> "updated": the description is logged
+          as a note on the existing lead
+        - otherwise -> "created", all new leads in one bulk create
+        `results[i]` is {"success", "id", "action"} or {"success": False, "error"}.
+        Syncs in this process run one at a time.
+        """
+        if not self.enabled: return {"success": False, "error": "Disabled"}
+        
+        with _upsert_lock:
+            return self._upsert_leads_bulk(items)
+    
+    def _upsert_leads_bulk(self, items: List[Dict[str, Any]]) -> Dict[str, Any]:
+        index = get_lead_index(Config.LEAD_INDEX_PATH)
+        keys = [
+            lead_keys(item["source"], item.get("sender", ""), item.get("subject", ""), item.get("message_id"))
+            for item in items
+        ]
+        known = index.get_many(key for pair in keys for key in pair)
+        results: List[Dict[str, Any]] = [None] * len(items)
+        
+        to_note, to_create, followers, leaders = [], [], [], {}
+        for i, (message_key, thread_key) in enumerate(keys):
+            if message_key in known:
+                results[i] = {"success": True, "id": known[message_key], "action": "skipped"}
+            elif thread_key in known:
+                to_note.append((i, known[thread_key]))
+            elif thread_key in leaders:
+                # Same thread twice in this batch: one lead, the rest become notes
+                followers.append(i)
+            else:
+                leaders[thread_key] = i
+                to_create.append(i)
+        
+        for i, lead_id in to_note:
+            note = self._add_note(items[i], keys[i], lead_id, index)
+            if note is None:
+                # Lead was deleted in Odoo: forget it and create a fresh one
+                index.forget_lead(lead_id)
+                if keys[i][1] in leaders:
+                    followers.append(i)
+                else:
+                    leaders[keys[i][1]] = i
+                    to_create.append(i)
+            else:
+                results[i] = note
+        
+        if to_create:
+            created = self.skill.create_leads_bulk([items[i]["values"] for i in to_create])
+            pairs = []
+            for i, outcome in zip(to_create, created["results"]):
+                if outcome["success"]:
+                    outcome = {**outcome, "action": "created"}
+                    pairs.extend((key, outcome["id"]) for key in keys[i])
+                results[i] = outcome
+            index.put_many(pairs)
+            if created["created"]:
+                invalidate_leads_summary()
+        
+        for i in followers:
+            leader = results[leaders[keys[i][1]]]
+            if not leader["success"]:
+                results[i] = {"success": False, "error": leader["error"]}
+                continue
+            results[i] = self._add_note(items[i], keys[i], leader["id"], index) or {
+                "success": False, "error": f"Lead {leader['id']} not found"
+            }
+        
+        counts = {action: 0 for action in ("created", "updated", "skipped")}
+        for result in results:
+            if result["success"]:
+                counts[result["action"]] += 1
+        failed = sum(1 for r in results if not r["success"])
+        if counts["updated"] or counts["skipped"]:
+            logger.info(f"OdooAgent: Lead sync - {counts['created']} created, {counts['updated']} updated, "
+                        f"{counts['skipped']} already synced, {failed} failed")
+        return {"success": failed == 0, **counts, "failed": failed, "results": results}
+    
+    def _add_note(self, item: Dict[str, Any], keys: tuple, lead_id: int, index) -> Dict[str, Any]:
+        """Log an item on an existing lead; None if the lead no longer exists"""
+        res = self.skill.add_lead_note(lead_id, item["values"].get("description", ""))
+        if res.get("missing"):
+            return None
+        if not res.get("success"):
+            return {"success": False, "error": res.get("error")}
+        index.put([keys[0]], lead_id)
+        return {"success": True, "id": lead_id, "action": "updated"}
+    
+    def _linkedin_lead_item(self, message_data: Dict[str, Any]) -> Dict[str, Any]:
+        sender = message_data.get("sender", "Unknown")
+        return {
+            "values": self._linkedin_lead_values(message_data),
+            "source": "linkedin",
+            "sender": sender,
+            "subject": "LinkedIn Inquiry",
+            # Scraped previews have no ID: the same sender+preview is the same message
+            "message_id": content_id(sender, message_data.get("content", ""))
+        }
+    
+    def _linkedin_lead_values(self, message_data: Dict[str, Any]) -> Dict[str, Any]:
+        sender = message_data.get("sender", "Unknown")
+        content = message_data.get("content", "")
+        return {
+            "name": f"LinkedIn Inquiry: {sender}",
+            "email_from": "linkedin@placeholder.com",
+            "description": f"Source: LinkedIn Message\n\nContent:\n{content}"
+        }
         
     def create_lead(self, name: str, email: str, description: str) -> Dict[str, Any]:
         """Create a generic lead (proxy to skill)"""
         if not self.enabled: return {"success": False, "error": "Disabled"}
-        return self.skill.create_lead(name, email, description)
+        return self._created(self.skill.create_lead(name, email, description))
 
     def get_recent_leads(self, limit: int = 5) -> Dict[str, Any]:
         """Get recent leads (proxy to skill)"""
@@ -62,19 +240,25 @@ class OdooAgent:
         return self.skill.get_leads(limit)
         """Create a generic lead (proxy to skill)"""
         if not self.enabled: return {"success": False, "error": "Disabled"}
-        return self.skill.create_lead(name, email, description)
+        return self._created(self.skill.create_lead(name, email, description))
 
     def get_recent_leads(self, limit: int = 5) -> Dict[str, Any]:
         """Get recent leads (proxy to skill)"""
         if not self.enabled: return []
         return self.skill.get_leads(limit)
 
-    def get_recent_leads_summary(self) -> str:
-        """Get a text summary of recent leads for the chatbot"""
+    def _created(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Invalidate the cached leads summary after a successful create"""
+        if result.get("success"):
+            invalidate_leads_summary()
+        return result
+
+    def get_recent_leads_summary(self, raise_errors: bool = False) -> str:
+        """Get a text summary of recent leads for the chatbot (`raise_errors`: see OdooSkill.search_leads)"""
         if not self.enabled:
             return "Odoo Integration is disabled."
             
-        leads = self.skill.get_leads(limit=5)
+        leads = self.skill.get_leads(limit=5, raise_errors=raise_errors)
         if not leads:
             return "No recent leads found in Odoo."
             
@@ -2,7 +2,8 @@
 WhatsApp Agent
 """
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, List, Tuple
+from skills.whatsapp_skill.pacing import PacingPolicy
 from skills.whatsapp_skill.skill import WhatsAppSkill
 from src.utils.config import Config
 
@@ -18,7 +19,9 @@ class WhatsAppAgent:
         self.skill = WhatsAppSkill(
             enabled=Config.WHATSAPP_ENABLED, 
             headless=False, # Must match Watcher config to share session
-            session_dir=session_path
+            session_dir=session_path,
+            idle_timeout=Config.WHATSAPP_IDLE_TIMEOUT,
+            pacing=PacingPolicy.from_config()
         )
         
     def send_alert(self, message: str) -> Dict[str, Any]:
@@ -26,9 +29,30 @@ class WhatsAppAgent:
         admin_number = Config.ADMIN_WHATSAPP
         return self.skill.send_message(admin_number, message)
 
+    def send_alerts(self, messages: List[str]) -> Dict[str, Any]:
+        """Send several alerts to the admin in one paced batch"""
+        admin_number = Config.ADMIN_WHATSAPP
+        return self.skill.send_messages_bulk([(admin_number, message) for message in messages])
+
+    def send_digest_alert(self, emails: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Send one combined alert for several emails to the admin"""
+        if len(emails) == 1:
+            email = emails[0]
+            return self.send_alert(f"📧 New Important Email: {email['subject']}\nFrom: {email.get('sender', 'Unknown')}")
+        
+        lines = [f"📧 {len(emails)} New Important Emails"]
+        for email in emails:
+            marker = "🔴" if email.get('priority') == 'high' else "•"
+            lines.append(f"{marker} {email['subject']} ({email.get('sender', 'Unknown')})")
+        return self.send_alert("\n".join(lines))
+
     def send_message(self, to_number: str, message: str) -> Dict[str, Any]:
         """Send a message to any number"""
         return self.skill.send_message(to_number, message)
+
+    def send_messages_bulk(self, messages: List[Tuple[str, str]]) -> Dict[str, Any]:
+        """Send (number, message) pairs in one paced batch on the open session"""
+        return self.skill.send_messages_bulk(messages)
         
     def get_unread_messages(self, limit: int = 5, check_archived: bool = False) -> list:
         """Get unread messages, optionally filtered by config keywords"""
@@ -41,5 +65,6 @@ class WhatsAppAgent:
     def get_status(self) -> Dict[str, Any]:
         return {
             "name": "WhatsAppAgent",
-            "enabled": self.skill.enabled
+            "enabled": self.skill.enabled,
+            "session": self.skill.session.get_status() if self.skill.enabled else None
         }
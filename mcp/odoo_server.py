@@ -4,7 +4,7 @@ Model Context Protocol wrapper for Odoo CRM Skill
 """
 import logging
 from typing import Any, Dict, List
-from skills.odoo_skill.skill import OdooSkill
+from skills.odoo_skill.skill import OdooSkill, keyword_domain
 from src.utils.config import Config
 
 logger = logging.getLogger(__name__)
@@ -58,13 +58,23 @@ class OdooMCPServer:
             },
             {
                 "name": "search_leads",
-                "description": "Search for leads by keyword",
+                "description": "Search all CRM leads by keyword",
                 "inputSchema": {
                     "type": "object",
                     "properties": {
                         "keyword": {
                             "type": "string",
-                            "description": "Keyword to search in lead names"
+                            "description": "Keyword to search in lead name, contact, email or company"
+                        },
+                        "limit": {
+                            "type": "integer",
+                            "description": "Max number of leads to return",
+                            "default": 20
+                        },
+                        "offset": {
+                            "type": "integer",
+                            "description": "Number of matches to skip (use next_offset from the previous page)",
+                            "default": 0
                         }
                     },
                     "required": ["keyword"]
@@ -89,13 +99,16 @@ class OdooMCPServer:
             return {"success": True, "leads": leads}
 
         elif name == "search_leads":
-            # Assuming get_leads supports a domain or filter, otherwise we fetch and filter in python
-            # For simplicity, let's fetch more and filter here if the skill doesn't support search yet
-            # Ideally update skill to support search.
-            all_leads = self.skill.get_leads(limit=50) 
-            keyword = arguments.get("keyword", "").lower()
-            filtered = [l for l in all_leads if keyword in str(l.get('name', '')).lower()]
-            return {"success": True, "leads": filtered, "count": len(filtered)}
+            # Filtered on the server, so older leads match too
+            limit = arguments.get("limit", 20)
+            offset = arguments.get("offset", 0)
+            leads = self.skill.search_leads(
+                keyword_domain(arguments.get("keyword", "")), limit=limit, offset=offset
+            )
+            result = {"success": True, "leads": leads, "count": len(leads)}
+            if len(leads) == limit:
+                result["next_offset"] = offset + limit
+            return result
             
         else:
             return {"error": f"Unknown tool: {name}"}
@@ -6,6 +6,7 @@ import os
 import logging
 from typing import Any, Dict, List
 from src.utils.config import Config
+from skills.whatsapp_skill.pacing import PacingPolicy
 from skills.whatsapp_skill.skill import WhatsAppSkill
 
 logger = logging.getLogger(__name__)
@@ -22,7 +23,8 @@ class WhatsAppMCPServer:
         self.skill = WhatsAppSkill(
             enabled=Config.WHATSAPP_ENABLED,
             headless=False,  # Force Headed to match persisted session type
-            session_dir=session_path
+            session_dir=session_path,
+            pacing=PacingPolicy.from_config()
         )
         
     def list_tools(self) -> List[Dict[str, Any]]:
@@ -46,6 +48,28 @@ class WhatsAppMCPServer:
                     "required": ["number", "message"]
                 }
             },
+            {
+                "name": "send_messages_bulk",
+                "description": "Send several WhatsApp messages in one paced batch (returns a status per message)",
+                "inputSchema": {
+                    "type": "object",
+                    "properties": {
+                        "messages": {
+                            "type": "array",
+                            "items": {
+                                "type": "object",
+                                "properties": {
+                                    "number": {"type": "string"},
+                                    "message": {"type": "string"}
+                                },
+                                "required": ["number", "message"]
+                            },
+                            "description": "Messages to send, in order"
+                        }
+                    },
+                    "required": ["messages"]
+                }
+            },
             {
                 "name": "check_messages",
                 "description": "Check WhatsApp messages, optionally filtered by keywords",
@@ -78,6 +102,8 @@ class WhatsAppMCPServer:
         """Execute a tool"""
         if name == "send_message":
             return self._send_message(arguments["number"], arguments["message"])
+        elif name == "send_messages_bulk":
+            return self._send_messages_bulk(arguments["messages"])
         elif name == "check_messages":
             keywords = arguments.get("keywords", None)
             limit = arguments.get("limit", 20)
@@ -102,6 +128,21 @@ class WhatsAppMCPServer:
             logger.error(f"MCP Server: WhatsApp error: {e}")
             return {"success": False, "error": str(e)}
     
+    def _send_messages_bulk(self, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        """Send a batch of WhatsApp messages on one browser session"""
+        if not Config.WHATSAPP_ENABLED:
+             return {"success": False, "error": "WhatsApp integration is disabled in .env. Set WHATSAPP_ENABLED=true"}
+        
+        logger.info(f"MCP Server: Sending {len(messages)} WhatsApp message(s) in bulk")
+        
+        try:
+            result = self.skill.send_messages_bulk([(m["number"], m["message"]) for m in messages])
+            logger.info(f"MCP Server: Bulk result: {result['sent']} sent, {result['failed']} failed")
+            return result
+        except Exception as e:
+            logger.error(f"MCP Server: WhatsApp bulk error: {e}")
+            return {"success": False, "error": str(e)}
+    
     def _check_messages(self, keywords: List[str] = None, limit: int = 20) -> Dict[str, Any]:
         """Check WhatsApp messages using the actual skill"""
         if not Config.WHATSAPP_ENABLED:
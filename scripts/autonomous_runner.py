@@ -8,8 +8,10 @@ from concurrent.futures import ThreadPoolExecutor
 # Import Agents and Skills
 from agents.main_agent import MainAgent
 from skills.whatsapp_skill.skill import WhatsAppSkill
+from skills.whatsapp_skill.watcher import WhatsAppInboxWatcher, relevant_messages
 from skills.gmail_monitoring.gmail_monitoring import GmailMonitoringSkill
 from src.utils.config import Config
+from src.utils.keyword_matcher import KeywordMatcher
 
 # Configure Logging
 logging.basicConfig(
@@ -30,7 +32,8 @@ class AutonomousFTE:
     def __init__(self):
         self.main = MainAgent()
         # Initialize Skills directly for polling
-        self.whatsapp_skill = WhatsAppSkill(enabled=Config.WHATSAPP_ENABLED, headless=True) # Headless for deploy
+        self.whatsapp_skill = WhatsAppSkill(enabled=Config.WHATSAPP_ENABLED, headless=True, # Headless for deploy
+                                            idle_timeout=Config.WHATSAPP_IDLE_TIMEOUT)
         self.gmail_skill = GmailMonitoringSkill(
             Config.GMAIL_CREDENTIALS_PATH, 
             Config.GMAIL_TOKEN_PATH,
@@ -38,6 +41,12 @@ class AutonomousFTE:
         )
         self.gmail_authenticated = False
         
+        # Use a list of keywords from Config + 'Panaverse' explicit
+        self.whatsapp_keywords = Config.FILTER_KEYWORDS + ["Panaversity", "Panaverse", "PIAIC"]
+        self.whatsapp_matcher = KeywordMatcher({"relevant": self.whatsapp_keywords})
+        self.whatsapp_watcher = WhatsAppInboxWatcher(self.whatsapp_skill, self._on_whatsapp_events)
+        self.last_whatsapp_poll = 0.0
+        
         self.running = True
 
     def initialize(self):
@@ -50,29 +59,39 @@ class AutonomousFTE:
             logger.info("FTE: Gmail Monitoring Active.")
         else:
             logger.warning("FTE: Gmail Monitoring Failed.")
+        
+        # Push mode for WhatsApp: matches arrive as they render, polling becomes a fallback
+        if self.whatsapp_skill.enabled and Config.WHATSAPP_PUSH_ENABLED:
+            self.whatsapp_watcher.start()
+
+    def _on_whatsapp_events(self, events):
+        """Inbox watcher callback (runs on the watcher thread)"""
+        admin_chats = [Config.ADMIN_WHATSAPP, Config.ADMIN_WHATSAPP_CHAT]
+        for msg in relevant_messages(events, self.whatsapp_matcher, exclude_chats=admin_chats):
+            logger.info(f"FTE: Live WhatsApp Match: {msg.get('title')}")
+            self.main.process_trigger("whatsapp", msg)
 
     async def _poll_whatsapp(self):
         """Poll WhatsApp for Panaversity messages"""
         if not self.whatsapp_skill.enabled: return
+        # With the inbox watcher running, a full scan is only a periodic safety net
+        if self.whatsapp_watcher.active and \
+                time.time() - self.last_whatsapp_poll < Config.WHATSAPP_CHECK_INTERVAL * 60:
+            return
         
         logger.info("FTE: Checking WhatsApp for updates...")
+        self.last_whatsapp_poll = time.time()
         
-        # Running in thread because Playwright might be blocking or complex
-        # Note: WhatsAppSkill V2 handles its own loop logic internally usually, 
-        # but calling it from here inside an async loop needs care.
-        # check_messages is our V2 method
+        # Runs on the skill's resident browser session; this loop only awaits the result
+        result = await self.whatsapp_skill.check_messages_async(self.whatsapp_keywords)
         
-        # Use a list of keywords from Config + 'Panaverse' explicit
-        keywords = Config.FILTER_KEYWORDS + ["Panaversity", "Panaverse", "PIAIC"]
-        
-        # sync wrapper call
-        loop = asyncio.get_running_loop()
-        msgs = await loop.run_in_executor(None, self.whatsapp_skill.check_messages, keywords)
-        
-        if msgs and not isinstance(msgs[0], dict) or "error" not in msgs[0]:
-            # Found content
-            for msg in msgs:
-                if "error" in msg: continue
+        if not result.get("success"):
+            logger.warning(f"FTE: WhatsApp check failed: {result.get('error')}")
+        else:
+            for msg in result.get("messages", []):
+                # Our own last message (e.g. an alert) is not a trigger
+                if msg.get("outgoing"):
+                    continue
                 logger.info(f"FTE: Found WhatsApp Match: {msg.get('title')}")
                 # HOOK: Trigger Main Agent
                 self.main.process_trigger("whatsapp", msg)
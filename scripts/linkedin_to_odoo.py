@@ -11,8 +11,33 @@ from pathlib import Path
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
-from skills.odoo_skill.skill import OdooSkill
+from agents.odoo_agent import OdooAgent
 from src.utils.config import Config
+from src.utils.lead_index import content_id
+
+def build_lead_data(name: str, company: str = "", notes: str = "") -> dict:
+    """Build crm.lead field values for a LinkedIn contact"""
+    lead_data = {
+        "name": f"LinkedIn: {name}",
+        "contact_name": name,
+        "description": f"Source: LinkedIn Post Engagement\n{notes}",
+        "type": "opportunity",
+        "tag_ids": [(6, 0, [])],  # You can add tags here
+    }
+    
+    if company:
+        lead_data["partner_name"] = company
+    return lead_data
+
+def build_lead_item(name: str, company: str = "", notes: str = "") -> dict:
+    """Upsert item for OdooAgent: one lead per person+company, repeated entries are not duplicated"""
+    return {
+        "values": build_lead_data(name, company, notes),
+        "source": "linkedin_engagement",
+        "sender": name,
+        "subject": company,
+        "message_id": content_id(name, company, notes)
+    }
 
 def add_linkedin_lead_to_odoo(name: str, company: str = "", notes: str = ""):
     """
@@ -23,28 +48,17 @@ def add_linkedin_lead_to_odoo(name: str, company: str = "", notes: str = ""):
         company: Their company (optional)
         notes: Additional notes (e.g., "Liked post about AI", "Viewed profile")
     """
-    odoo = OdooSkill()
+    odoo = OdooAgent()
     
     if not odoo.enabled:
         print("❌ Odoo is not configured. Please check your .env file.")
         return False
     
-    # Create lead data
-    lead_data = {
-        "name": f"LinkedIn: {name}",
-        "contact_name": name,
-        "description": f"Source: LinkedIn Post Engagement\n{notes}",
-        "type": "opportunity",
-        "tag_ids": [(6, 0, [])],  # You can add tags here
-    }
-    
-    if company:
-        lead_data["partner_name"] = company
-    
-    result = odoo.create_lead(lead_data)
+    result = odoo.upsert_leads_bulk([build_lead_item(name, company, notes)])["results"][0]
     
     if result.get("success"):
-        print(f"✅ Added {name} to Odoo CRM (Lead ID: {result.get('id')})")
+        action = {"created": "Added", "updated": "Updated", "skipped": "Already in"}[result["action"]]
+        print(f"✅ {action} {name} in Odoo CRM (Lead ID: {result.get('id')})")
         return True
     else:
         print(f"❌ Failed to add {name}: {result.get('error')}")
@@ -96,16 +110,27 @@ def batch_mode(contacts_list):
         ]
         batch_mode(contacts)
     """
-    count = 0
-    for contact in contacts_list:
-        if add_linkedin_lead_to_odoo(
-            contact.get("name", ""),
-            contact.get("company", ""),
-            contact.get("notes", "")
-        ):
-            count += 1
+    odoo = OdooAgent()
+    
+    if not odoo.enabled:
+        print("❌ Odoo is not configured. Please check your .env file.")
+        return 0
+    
+    items = [
+        build_lead_item(contact.get("name", ""), contact.get("company", ""), contact.get("notes", ""))
+        for contact in contacts_list
+    ]
+    # Known contacts are skipped or updated; new ones go in one multi-record create per chunk
+    result = odoo.upsert_leads_bulk(items)
+    
+    for contact, outcome in zip(contacts_list, result["results"]):
+        if not outcome["success"]:
+            print(f"❌ Failed to add {contact.get('name', '')}: {outcome.get('error')}")
     
-    print(f"\n✅ Added {count}/{len(contacts_list)} contacts to Odoo CRM!")
+    count = result["created"]
+    print(f"\n✅ Added {count}/{len(contacts_list)} contacts to Odoo CRM! "
+          f"({result['updated']} updated, {result['skipped']} already there)")
+    return count
 
 if __name__ == "__main__":
     # Check if Odoo is configured
@@ -6,7 +6,9 @@ import sys
 # Adjust path
 sys.path.append(os.getcwd())
 
-from skills.odoo_skill.odoo_skill import OdooSkill
+from agents.odoo_agent import OdooAgent
+from skills.odoo_skill.skill import OdooSkill
+from src.utils.lead_index import content_id
 from skills.linkedin_skill.skill import LinkedInSkill
 
 logging.basicConfig(level=logging.INFO)
@@ -43,6 +45,9 @@ def run_lead_sync():
     
     # 4. Process Leads
     leads_created = 0
+    leads_updated = 0
+    leads_skipped = 0
+    items = []
     if messages:
         for msg in messages:
             sender = msg['sender']
@@ -51,25 +56,38 @@ def run_lead_sync():
             logger.info(f"Processing message from: {sender}")
             
             if odoo_available:
-                # Basic logic: Create lead for every new message (deduplication needed in real app)
-                lead_name = f"LinkedIn Inquiry: {sender}"
-                description = f"Message Content:\n{content}\n\nSource: LinkedIn Automation"
-                
-                res = odoo.create_lead(
-                    name=lead_name,
-                    email_from="linkedin@placeholder.com", # LinkedIn doesn't give email easily
-                    description=description
-                )
-                
-                if res.get("success"):
-                    logger.info(f"SUCCESS: Created Odoo Lead ID {res['id']}")
-                    leads_created += 1
-                else:
-                    logger.error(f"Failed to create lead: {res.get('error')}")
+                # One lead per sender; messages already synced are skipped via the dedupe index
+                items.append({
+                    "values": {
+                        "name": f"LinkedIn Inquiry: {sender}",
+                        "email_from": "linkedin@placeholder.com", # LinkedIn doesn't give email easily
+                        "description": f"Message Content:\n{content}\n\nSource: LinkedIn Automation"
+                    },
+                    "source": "linkedin",
+                    "sender": sender,
+                    "subject": "LinkedIn Inquiry",
+                    "message_id": content_id(sender, content)
+                })
             else:
                 logger.info(f"[Mock] Would create lead for {sender}: {content[:30]}...")
+    
+    # 5. Upsert all leads (new ones created with bulk calls, one RPC per chunk)
+    if items:
+        res = OdooAgent().upsert_leads_bulk(items)
+        for item, outcome in zip(items, res["results"]):
+            if not outcome["success"]:
+                logger.error(f"Failed to sync lead '{item['values']['name']}': {outcome.get('error')}")
+            elif outcome["action"] == "created":
+                logger.info(f"SUCCESS: Created Odoo Lead ID {outcome['id']}")
+                leads_created += 1
+            elif outcome["action"] == "updated":
+                logger.info(f"SUCCESS: Added message to Odoo Lead ID {outcome['id']}")
+                leads_updated += 1
+            else:
+                leads_skipped += 1
 
-    logger.info(f"Sync Complete. Total Leads Created: {leads_created}")
+    logger.info(f"Sync Complete. Leads Created: {leads_created}, Updated: {leads_updated}, "
+                f"Already Synced: {leads_skipped}")
 
 if __name__ == "__main__":
     run_lead_sync()
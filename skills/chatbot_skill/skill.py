@@ -2,13 +2,17 @@
 Chatbot Skill (Gemini Integration)
 """
 import logging
+import re
 import time
 import google.generativeai as genai
 # import nest_asyncio
-from typing import Dict, Any, Generator
+from typing import Dict, Any, Callable, Generator, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Upper bound on model -> tool -> model round trips in a single turn
+MAX_TOOL_ROUNDS = 8
+
 class ChatbotSkill:
     """Skill for AI generation using Gemini"""
     
@@ -53,86 +57,187 @@ class ChatbotSkill:
         """Start a new chat session"""
         if not self.model:
             raise ValueError("Gemini not configured")
-        # Ensure automatic function calling is enabled if tools present
-        return self.model.start_chat(history=history or [], enable_automatic_function_calling=True if self.tools else False)
+        # Tool calls are run by stream_events() so they can be interleaved with streamed text
+        return self.model.start_chat(history=history or [], enable_automatic_function_calling=False)
+    
+    def _tool_map(self) -> Dict[str, Callable]:
+        """Map function-declaration names (the callables' __name__) to the callables"""
+        return {tool.__name__: tool for tool in (self.tools or []) if callable(tool)}
+    
+    def _call_tool(self, tools: Dict[str, Callable], name: str, args: Dict[str, Any]) -> Any:
+        tool = tools.get(name)
+        if tool is None:
+            return f"Error: Unknown tool '{name}'"
+        try:
+            return tool(**args)
+        except Exception as e:
+            logger.error(f"ChatbotSkill: Tool {name} failed: {e}")
+            return f"Error: {str(e) or type(e).__name__}"
+    
+    def _retry_delay(self, error_str: str, attempt: int) -> float:
+        """Wait suggested by a 429 error message, else a linear backoff"""
+        wait_time = (attempt + 1) * 5
+        match = re.search(r"retry in (\d+\.?\d*)s", error_str)
+        if match:
+            wait_time = float(match.group(1)) + 1
+        return wait_time
+    
+    def stream_events(self, chat_session, message: Any, retries: int = 3,
+                      stream: bool = True, max_tool_rounds: int = MAX_TOOL_ROUNDS) -> Generator[Dict[str, Any], None, None]:
+        """
+        Send a message and yield response events as they arrive:
         
-    def generate_response(self, chat_session, message: str, retries: int = 3) -> str:
-        """Generate a response with retry logic"""
-        if not self.model:
-            return "Error: AI not configured."
-            
-        for attempt in range(retries):
-            try:
-                response = chat_session.send_message(message)
-                return response.text
-            except Exception as e:
-                error_str = str(e)
-                # Check for 404 (Not Found / Invalid Model) or 400 (Bad Request - typically model related if others work)
-                if "404" in error_str or "not found" in error_str.lower() or "400" in error_str:
-                     logger.warning(f"Model {self.model_name} failed with fatal error: {error_str}")
-                     if self._switch_to_fallback():
-                         # We need to restart the chat session with the new model
-                         # Note: History preservation is complex here as 'chat_session' object is tied to model.
-                         # SImple fallback: Start new session (or if caller handles session, this might be tricky).
-                         # For this skill: We rely on the caller to handle session management usually, 
-                         # but since we pass 'chat_session' in, we can't easily swap 'chat_session' IN PLACE.
-                         # Workaround for Phase 6: We inform error, but if we init checks passed...
-                         # Actually for 404, it usually happens on first call.
-                         # Let's try to notify user or handle it. 
-                         # Since this is a simple skill, we'll return error asking for retry which might trigger re-init?
-                         # Better: Re-raise or return specific error?
-                         return f"Error: Model {self.model_name} failed. Switched to fallback. Please retry."
-                
-                if "429" in error_str and attempt < retries - 1:
-                    # Attempt to extract suggested wait time from error message
-                    import re
-                    wait_time = (attempt + 1) * 5 # Base wait
-                    match = re.search(r"retry in (\d+\.?\d*)s", error_str)
-                    if match:
-                        wait_time = float(match.group(1)) + 1
-                    
-                    logger.warning(f"Rate limit hit, retrying in {wait_time}s... (Attempt {attempt+1}/{retries})")
-                    time.sleep(wait_time)
-                else:
-                    logger.error(f"Generate Response Error: {error_str}")
-                    return f"Error: {error_str}"
-        return "Error: Failed after retries"
+            {"type": "text", "content": str}
+            {"type": "tool_start", "name": str, "args": dict}
+            {"type": "tool_end", "name": str, "result": str}
+            {"type": "usage", "prompt_tokens": int, "response_tokens": int, "total_tokens": int}
+            {"type": "error", "content": str}
         
-    def stream_response(self, chat_session, message: str, retries: int = 3) -> Generator[str, None, None]:
-        """Stream a response with retry logic"""
+        Text is streamed as Gemini produces it. When the model asks for tools,
+        they are run here, their results are sent back, and streaming resumes
+        with the model's follow-up. A "usage" event (summed over all rounds)
+        is always the last event unless an error ends the turn.
+        
+        A turn that does not complete (error, too many tool rounds, or the
+        consumer closing the generator) is rewound: the session history goes
+        back to where the turn started, so a half-read response or an
+        unanswered function call cannot break the user's next turn.
+        """
         if not self.model:
-            yield "Error: AI not configured."
+            yield {"type": "error", "content": "Error: AI not configured."}
+            return
+        
+        try:
+            turn_history = list(chat_session.history)
+        except Exception as e:
+            # Broken by an earlier turn that could not be rewound: the caller must start a new session
+            logger.error(f"ChatbotSkill: Chat session unusable: {e}")
+            yield {"type": "error", "content": f"Error: {str(e) or type(e).__name__}"}
             return
+        
+        completed = False
+        try:
+            for event in self._turn_events(chat_session, message, retries, stream, max_tool_rounds):
+                if event["type"] == "usage":
+                    completed = True
+                yield event
+        finally:
+            if not completed:
+                self._rewind(chat_session, turn_history)
+    
+    def _rewind(self, chat_session, history: list):
+        """Restore a session's history (also clears a half-consumed response)"""
+        try:
+            chat_session.history = history
+        except Exception as e:
+            logger.warning(f"ChatbotSkill: Could not rewind chat session: {e}")
+    
+    def _turn_events(self, chat_session, content: Any, retries: int, stream: bool,
+                     max_tool_rounds: int) -> Generator[Dict[str, Any], None, None]:
+        """One turn's events (see stream_events); leaves rewinding to the caller"""
+        tools = self._tool_map()
+        usage = {"prompt_tokens": 0, "response_tokens": 0, "total_tokens": 0}
+        
+        for _ in range(max_tool_rounds + 1):
+            function_calls = []
+            last_usage = None
+            round_history = list(chat_session.history)
             
-        for attempt in range(retries):
-            try:
-                # Disable streaming if tools are present to avoid SDK error
-                do_stream = True if not self.tools else False
-                
-                response = chat_session.send_message(message, stream=do_stream)
-                
-                if do_stream:
-                    for chunk in response:
-                        if hasattr(chunk, 'text') and chunk.text:
-                            yield chunk.text
-                else:
-                    # If not streaming, yield the full text at once
-                    if response.text:
-                        yield response.text
-                return
-            except Exception as e:
-                if "429" in str(e) and attempt < retries - 1:
-                    import re
-                    wait_time = (attempt + 1) * 5
-                    match = re.search(r"retry in (\d+\.?\d*)s", str(e))
-                    if match:
-                        wait_time = float(match.group(1)) + 1
-                        
-                    logger.warning(f"Rate limit hit, retrying in {wait_time}s...")
-                    time.sleep(wait_time)
-                else:
-                    error_msg = str(e) or type(e).__name__
-                    logger.error(f"ChatbotSkill Stream Error: {error_msg}")
-                    yield f"Error: {error_msg}"
+            for attempt in range(retries):
+                started = False
+                try:
+                    response = chat_session.send_message(content, stream=stream)
+                    for chunk in (response if stream else [response]):
+                        if not chunk.candidates:
+                            continue
+                        for part in chunk.candidates[0].content.parts:
+                            if part.function_call.name:
+                                function_calls.append(part.function_call)
+                            elif part.text:
+                                started = True
+                                yield {"type": "text", "content": part.text}
+                        if chunk.usage_metadata:
+                            last_usage = chunk.usage_metadata
+                    break
+                except Exception as e:
+                    error_str = str(e) or type(e).__name__
+                    # 404 / 400 usually mean the model name is invalid: move to the fallback
+                    if "404" in error_str or "not found" in error_str.lower() or "400" in error_str:
+                        logger.warning(f"Model {self.model_name} failed with fatal error: {error_str}")
+                        if self._switch_to_fallback():
+                            # The session is bound to the old model; the caller must start a new one
+                            yield {"type": "error", "content": f"Error: Model {self.model_name} failed. Switched to fallback. Please retry."}
+                            return
+                    
+                    # Only retry if nothing was shown to the user yet
+                    if "429" in error_str and attempt < retries - 1 and not started and not function_calls:
+                        wait_time = self._retry_delay(error_str, attempt)
+                        logger.warning(f"Rate limit hit, retrying in {wait_time}s... (Attempt {attempt+1}/{retries})")
+                        time.sleep(wait_time)
+                        # Drop whatever part of the failed response the session recorded
+                        self._rewind(chat_session, round_history)
+                        continue
+                    
+                    logger.error(f"ChatbotSkill Stream Error: {error_str}")
+                    yield {"type": "error", "content": f"Error: {error_str}"}
                     return
-        yield "Error: Failed after retries"
+            
+            if last_usage is not None:
+                usage["prompt_tokens"] += last_usage.prompt_token_count
+                usage["response_tokens"] += last_usage.candidates_token_count
+                usage["total_tokens"] += last_usage.total_token_count
+            
+            if not function_calls:
+                yield {"type": "usage", **usage}
+                return
+            
+            # Run the requested tools and send all results back in one turn
+            response_parts = []
+            for call in function_calls:
+                args = dict(call.args)
+                yield {"type": "tool_start", "name": call.name, "args": args}
+                result = self._call_tool(tools, call.name, args)
+                yield {"type": "tool_end", "name": call.name, "result": str(result)}
+                response_parts.append(genai.protos.Part(
+                    function_response=genai.protos.FunctionResponse(
+                        name=call.name,
+                        response={"result": result if isinstance(result, (str, int, float, bool)) else str(result)}
+                    )
+                ))
+            content = genai.protos.Content(role="user", parts=response_parts)
+        
+        logger.error(f"ChatbotSkill: Gave up after {max_tool_rounds} tool rounds")
+        yield {"type": "error", "content": "Error: Too many tool calls in one turn"}
+    
+    def generate_response(self, chat_session, message: str, retries: int = 3) -> str:
+        """Generate a full response (tool calls resolved) with retry logic"""
+        text, _ = self.generate_response_with_usage(chat_session, message, retries)
+        return text
+    
+    def generate_response_with_usage(self, chat_session, message: str, retries: int = 3) -> Tuple[str, Dict[str, int]]:
+        """Like generate_response, also returning the token usage of the turn"""
+        result = self.complete_turn(chat_session, message, retries)
+        return result["error"] or result["text"], result["usage"]
+    
+    def complete_turn(self, chat_session, message: str, retries: int = 3) -> Dict[str, Any]:
+        """
+        Run a whole turn without streaming.
+        
+        Returns {"text", "usage", "error"}; `error` is the error message (None on
+        success), so callers can tell a failed turn from a reply.
+        """
+        parts, usage = [], {}
+        for event in self.stream_events(chat_session, message, retries=retries, stream=False):
+            if event["type"] == "text":
+                parts.append(event["content"])
+            elif event["type"] == "usage":
+                usage = {k: v for k, v in event.items() if k != "type"}
+            elif event["type"] == "error":
+                return {"text": "".join(parts), "usage": usage, "error": event["content"]}
+        return {"text": "".join(parts), "usage": usage, "error": None}
+        
+    def stream_response(self, chat_session, message: str, retries: int = 3) -> Generator[str, None, None]:
+        """Stream response text with retry logic (tool calls are run in between)"""
+        for event in self.stream_events(chat_session, message, retries=retries):
+            if event["type"] in ("text", "error"):
+                yield event["content"]
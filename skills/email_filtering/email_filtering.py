@@ -2,56 +2,76 @@
 Email Filtering Skill
 Provides keyword filtering and email categorization
 """
-from typing import List, Dict, Any
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+from src.utils.keyword_matcher import build_email_matcher, categorize_hits
+
+# Per-process filter used by categorize_batch workers (built once per worker)
+_worker_skill = None
+
+def _init_worker(keywords: List[str]):
+    global _worker_skill
+    _worker_skill = EmailFilteringSkill(keywords)
+
+def _categorize_chunk(pairs: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+    return [_worker_skill.categorize_email(subject, body) for subject, body in pairs]
 
 class EmailFilteringSkill:
     """Filter and categorize emails based on keywords"""
     
     def __init__(self, keywords: List[str]):
         self.keywords = [k.lower().strip() for k in keywords]
+        # One compiled matcher for relevance, quiz, deadline and priority keywords
+        self.matcher = build_email_matcher(self.keywords)
+    
+    def _scan(self, subject: str, body: str = "") -> Dict[str, List[str]]:
+        """Single pass over subject + body for all keyword groups"""
+        return self.matcher.scan(f"{subject} {body}")
     
     def is_relevant(self, subject: str, body: str = "") -> bool:
         """Check if email contains any filter keywords"""
-        text = f"{subject} {body}".lower()
-        return any(keyword in text for keyword in self.keywords)
+        return bool(self._scan(subject, body)["relevant"])
     
     def extract_keywords(self, subject: str, body: str = "") -> List[str]:
         """Extract matching keywords from email"""
-        text = f"{subject} {body}".lower()
-        return [kw for kw in self.keywords if kw in text]
+        return self._scan(subject, body)["relevant"]
     
     def detect_quiz_alert(self, subject: str, body: str = "") -> bool:
         """Detect if email is about a quiz or exam"""
-        quiz_keywords = ["quiz", "exam", "test", "assessment"]
-        text = f"{subject} {body}".lower()
-        return any(keyword in text for keyword in quiz_keywords)
+        return bool(self._scan(subject, body)["quiz"])
     
     def detect_deadline(self, subject: str, body: str = "") -> bool:
         """Detect if email mentions a deadline"""
-        deadline_keywords = ["deadline", "due date", "submit by", "submission"]
-        text = f"{subject} {body}".lower()
-        return any(keyword in text for keyword in deadline_keywords)
+        return bool(self._scan(subject, body)["deadline"])
     
     def categorize_email(self, subject: str, body: str = "") -> Dict[str, Any]:
         """Categorize email and extract metadata"""
-        return {
-            "is_relevant": self.is_relevant(subject, body),
-            "keywords": self.extract_keywords(subject, body),
-            "is_quiz": self.detect_quiz_alert(subject, body),
-            "has_deadline": self.detect_deadline(subject, body),
-            "priority": self._calculate_priority(subject, body)
-        }
+        return categorize_hits(self._scan(subject, body))
     
-    def _calculate_priority(self, subject: str, body: str = "") -> str:
-        """Calculate email priority"""
-        text = f"{subject} {body}".lower()
+    def categorize_batch(self, emails: List[Dict[str, Any]], processes: Optional[int] = None,
+                         chunk_size: int = 1000) -> List[Dict[str, Any]]:
+        """
+        Categorize a list of email dicts (with 'subject' and 'body') in one call.
+        
+        Reuses this skill's prebuilt matcher. For very large backfills, pass
+        `processes` to fan chunks of `chunk_size` emails out over a process pool.
         
-        high_priority = ["urgent", "quiz", "exam", "deadline", "today", "tomorrow"]
-        if any(keyword in text for keyword in high_priority):
-            return "high"
+        Returns:
+            One categorize_email() dict per email, in input order
+        """
+        pairs = [(email.get('subject', ''), email.get('body', '')) for email in emails]
         
-        medium_priority = ["assignment", "submission", "meeting"]
-        if any(keyword in text for keyword in medium_priority):
-            return "medium"
+        if not processes or processes <= 1 or len(pairs) <= chunk_size:
+            return [self.categorize_email(subject, body) for subject, body in pairs]
         
-        return "low"
+        chunks = [pairs[i:i + chunk_size] for i in range(0, len(pairs), chunk_size)]
+        results: List[Dict[str, Any]] = []
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                                 initargs=(self.keywords,)) as pool:
+            for chunk_result in pool.map(_categorize_chunk, chunks):
+                results.extend(chunk_result)
+        return results
+    
+    def _calculate_priority(self, subject: str, body: str = "") -> str:
+        """Calculate email priority"""
+        return categorize_hits(self._scan(subject, body))["priority"]
@@ -2,14 +2,131 @@
 Email Notification Skill - Copied from src/utils/notifications.py
 """
 import smtplib
+import threading
+import time
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from typing import Dict, Any
+from typing import Dict, Any, List
 from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
 
+class SMTPConnectionPool:
+    """
+    Pool of authenticated SMTP connections reused across sends.
+    
+    A connection is opened (connect + STARTTLS + LOGIN) only when no idle one
+    is available. Connections idle for more than `noop_after` seconds are
+    probed with NOOP before reuse, and a send that fails because the server
+    dropped the socket is retried once on a fresh connection.
+    """
+    
+    def __init__(self, smtp_server: str, smtp_port: int, smtp_username: str, smtp_password: str,
+                 max_size: int = 2, max_idle: float = 240, noop_after: float = 10,
+                 max_messages: int = 100, timeout: float = 30):
+        self.smtp_server = smtp_server
+        self.smtp_port = smtp_port
+        self.smtp_username = smtp_username
+        self.smtp_password = smtp_password
+        self.max_idle = max_idle
+        self.noop_after = noop_after
+        self.max_messages = max_messages
+        self.timeout = timeout
+        self.handshakes = 0
+        
+        self._idle: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+    
+    def _connect(self) -> Dict[str, Any]:
+        """Open and authenticate a new connection"""
+        server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=self.timeout)
+        try:
+            server.starttls()
+            server.login(self.smtp_username, self.smtp_password)
+        except Exception:
+            self._close_quietly(server)
+            raise
+        
+        self.handshakes += 1
+        logger.info(f"SMTP Pool: Opened connection to {self.smtp_server} (handshakes: {self.handshakes})")
+        return {"server": server, "last_used": time.monotonic(), "sent": 0}
+    
+    def _checkout(self) -> Dict[str, Any]:
+        """Take a live idle connection, or open a new one"""
+        while True:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                return self._connect()
+            
+            idle_for = time.monotonic() - conn["last_used"]
+            if idle_for > self.max_idle:
+                self._close_quietly(conn["server"])
+                continue
+            if idle_for > self.noop_after and not self._is_alive(conn["server"]):
+                logger.info("SMTP Pool: Stale connection detected, reconnecting")
+                self._close_quietly(conn["server"])
+                continue
+            return conn
+    
+    def _checkin(self, conn: Dict[str, Any]):
+        """Return a connection to the pool (or close it when it has sent enough)"""
+        conn["last_used"] = time.monotonic()
+        if conn["sent"] >= self.max_messages:
+            self._close_quietly(conn["server"])
+            return
+        with self._lock:
+            self._idle.append(conn)
+    
+    def _is_alive(self, server: smtplib.SMTP) -> bool:
+        try:
+            return server.noop()[0] == 250
+        except Exception:
+            return False
+    
+    def _close_quietly(self, server: smtplib.SMTP):
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+    
+    def send_message(self, msg: MIMEMultipart):
+        """Send a message on a pooled connection, reconnecting once if the socket died"""
+        with self._slots:
+            for attempt in range(2):
+                conn = self._checkout()
+                try:
+                    conn["server"].send_message(msg)
+                except smtplib.SMTPServerDisconnected as e:
+                    lost = e
+                except smtplib.SMTPException:
+                    # Protocol errors (e.g. recipient refused) leave the session usable
+                    self._checkin(conn)
+                    raise
+                except OSError as e:
+                    lost = e
+                else:
+                    conn["sent"] += 1
+                    self._checkin(conn)
+                    return
+                
+                self._close_quietly(conn["server"])
+                if attempt == 1:
+                    raise lost
+                logger.warning(f"SMTP Pool: Connection lost ({lost}), retrying on a new connection")
+    
+    def close(self):
+        """Close all idle connections"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            self._close_quietly(conn["server"])
+
 class EmailNotificationSkill:
     """Handle email notifications via SMTP"""
     
@@ -18,6 +135,7 @@ class EmailNotificationSkill:
         self.smtp_port = smtp_port
         self.smtp_username = smtp_username
         self.smtp_password = smtp_password
+        self.pool = SMTPConnectionPool(smtp_server, smtp_port, smtp_username, smtp_password)
     
     def send_email_notification(self, to_email: str, subject: str, body: str, html: bool = False) -> bool:
         """Send email notification via SMTP"""
@@ -32,10 +150,7 @@ class EmailNotificationSkill:
             else:
                 msg.attach(MIMEText(body, 'plain'))
             
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.smtp_username, self.smtp_password)
-                server.send_message(msg)
+            self.pool.send_message(msg)
             
             logger.info(f"Email sent successfully to {to_email}")
             return True
@@ -44,6 +159,10 @@ class EmailNotificationSkill:
             logger.error(f"Failed to send email to {to_email}: {str(e)}")
             return False
     
+    def close(self):
+        """Close pooled SMTP connections"""
+        self.pool.close()
+    
     def format_email_summary(self, email_data: Dict[str, Any]) -> str:
         """Format email data into readable summary"""
         subject = email_data.get('subject', 'No Subject')
@@ -73,8 +192,8 @@ Generated at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 """
         return summary
     
-    def format_email_summary_html(self, email_data: Dict[str, Any]) -> str:
-        """Format email data into HTML summary"""
+    def _format_email_card_html(self, email_data: Dict[str, Any]) -> str:
+        """Format one email as an HTML card (shared by single alerts and digests)"""
         subject = email_data.get('subject', 'No Subject')
         sender = email_data.get('sender', 'Unknown Sender')
         date = email_data.get('date', 'Unknown Date')
@@ -88,7 +207,21 @@ Generated at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
             'low': '#44ff44'
         }.get(priority, '#888888')
         
-        html = f"""
+        return f"""
+        <div class="content">
+            <p><strong>From:</strong> {sender}</p>
+            <p><strong>Subject:</strong> {subject}</p>
+            <p><strong>Date:</strong> {date}</p>
+            <p><strong>Priority:</strong> <span class="priority" style="background: {priority_color};">{priority.upper()}</span></p>
+            <p><strong>Keywords:</strong> <span class="keywords">{', '.join(keywords) if keywords else 'None'}</span></p>
+            <hr>
+            <p><strong>Preview:</strong></p>
+            <p>{snippet}</p>
+        </div>"""
+    
+    def _wrap_html(self, title: str, cards: str) -> str:
+        """Wrap email cards in the alert page layout"""
+        return f"""
 <!DOCTYPE html>
 <html>
 <head>
@@ -97,7 +230,7 @@ Generated at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
         .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
         .header {{ background: #4285f4; color: white; padding: 15px; border-radius: 5px; }}
         .content {{ background: #f5f5f5; padding: 20px; margin-top: 10px; border-radius: 5px; }}
-        .priority {{ display: inline-block; padding: 5px 10px; border-radius: 3px; color: white; background: {priority_color}; }}
+        .priority {{ display: inline-block; padding: 5px 10px; border-radius: 3px; color: white; }}
         .keywords {{ color: #4285f4; font-weight: bold; }}
         .footer {{ margin-top: 20px; font-size: 12px; color: #888; }}
     </style>
@@ -105,18 +238,8 @@ Generated at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 <body>
     <div class="container">
         <div class="header">
-            <h2>📧 New Panaversity Email Alert</h2>
-        </div>
-        <div class="content">
-            <p><strong>From:</strong> {sender}</p>
-            <p><strong>Subject:</strong> {subject}</p>
-            <p><strong>Date:</strong> {date}</p>
-            <p><strong>Priority:</strong> <span class="priority">{priority.upper()}</span></p>
-            <p><strong>Keywords:</strong> <span class="keywords">{', '.join(keywords) if keywords else 'None'}</span></p>
-            <hr>
-            <p><strong>Preview:</strong></p>
-            <p>{snippet}</p>
-        </div>
+            <h2>{title}</h2>
+        </div>{cards}
         <div class="footer">
             <p>Panaversity Student Assistant</p>
             <p>Generated at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
@@ -125,7 +248,17 @@ Generated at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 </body>
 </html>
 """
-        return html
+    
+    def format_email_summary_html(self, email_data: Dict[str, Any]) -> str:
+        """Format email data into HTML summary"""
+        return self._wrap_html("📧 New Panaversity Email Alert", self._format_email_card_html(email_data))
+    
+    def format_digest_html(self, emails: List[Dict[str, Any]]) -> str:
+        """Format several emails into one HTML digest, highest priority first"""
+        order = {'high': 0, 'medium': 1, 'low': 2}
+        ordered = sorted(emails, key=lambda e: order.get(e.get('priority', 'low'), 3))
+        cards = "".join(self._format_email_card_html(email) for email in ordered)
+        return self._wrap_html(f"📧 Panaversity Digest: {len(emails)} new email(s)", cards)
     
     def notify_new_email(self, admin_email: str, email_data: Dict[str, Any]) -> bool:
         """Send notification about new relevant email"""
@@ -133,3 +266,16 @@ Generated at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
         html_body = self.format_email_summary_html(email_data)
         
         return self.send_email_notification(admin_email, subject, html_body, html=True)
+    
+    def notify_digest(self, admin_email: str, emails: List[Dict[str, Any]]) -> bool:
+        """Send one notification covering several relevant emails"""
+        if len(emails) == 1:
+            return self.notify_new_email(admin_email, emails[0])
+        
+        high = sum(1 for e in emails if e.get('priority') == 'high')
+        subject = f"🎓 Panaversity Digest: {len(emails)} new emails"
+        if high:
+            subject += f" ({high} high priority)"
+        html_body = self.format_digest_html(emails)
+        
+        return self.send_email_notification(admin_email, subject, html_body, html=True)
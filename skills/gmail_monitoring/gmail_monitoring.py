@@ -3,9 +3,10 @@ Gmail Monitoring Skill
 Provides Gmail API integration for email monitoring
 """
 import os
+import json
 import pickle
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
@@ -14,20 +15,35 @@ from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 import base64
 from email.utils import parsedate_to_datetime
+from src.utils.config import Config
+from skills.email_filtering import EmailFilteringSkill
 
 logger = logging.getLogger(__name__)
 
 SCOPES = ['https://www.googleapis.com/auth/gmail.readonly']
 
+# Headers requested in the metadata-only stage of the two-phase fetch
+METADATA_HEADERS = ['Subject', 'From', 'Date']
+
 class GmailMonitoringSkill:
     """Gmail monitoring skill for fetching and filtering emails"""
     
-    def __init__(self, credentials_path: str, token_path: str, keywords: List[str]):
+    def __init__(self, credentials_path: str, token_path: str, keywords: List[str],
+                 sync_state_path: Optional[str] = None, incremental: Optional[bool] = None,
+                 batch_size: Optional[int] = None, two_phase: Optional[bool] = None):
         self.credentials_path = credentials_path
         self.token_path = token_path
         self.keywords = [k.lower().strip() for k in keywords]
+        self.filter_skill = EmailFilteringSkill(self.keywords)
         self.service = None
         self.last_check_time = None
+        # Incremental sync: remember the last Gmail historyId between polls
+        self.sync_state_path = sync_state_path or Config.GMAIL_SYNC_STATE_PATH
+        self.incremental = Config.GMAIL_INCREMENTAL_SYNC if incremental is None else incremental
+        # Gmail accepts at most 100 calls per batch request
+        self.batch_size = max(1, min(batch_size or Config.GMAIL_BATCH_SIZE, 100))
+        # Two-phase fetch: filter on metadata + snippet, download bodies only for candidates
+        self.two_phase = Config.GMAIL_TWO_PHASE_FETCH if two_phase is None else two_phase
     
     def authenticate(self) -> bool:
         """Authenticate with Gmail API"""
@@ -77,30 +93,20 @@ class GmailMonitoringSkill:
             logger.error(f"Gmail authentication failed: {str(e)}")
             return False
     
-    def fetch_unread_emails(self, max_results: int = 10) -> List[Dict[str, Any]]:
-        """Fetch unread emails from Gmail"""
+    def fetch_unread_emails(self, max_results: int = 10, fmt: str = 'full') -> List[Dict[str, Any]]:
+        """
+        Fetch unread emails from Gmail
+        
+        Args:
+            max_results: Maximum number of emails to fetch
+            fmt: 'full' for headers and body, 'metadata' for headers and snippet only
+        """
         if not self.service:
             logger.error("Gmail service not initialized")
             return []
         
         try:
-            results = self.service.users().messages().list(
-                userId='me',
-                q='is:unread',
-                maxResults=max_results
-            ).execute()
-            
-            messages = results.get('messages', [])
-            
-            if not messages:
-                return []
-            
-            emails = []
-            for msg in messages:
-                email_data = self._get_email_details(msg['id'])
-                if email_data:
-                    emails.append(email_data)
-            
+            emails = self._fetch_details(self._list_unread_ids(max_results), fmt)
             logger.info(f"Fetched {len(emails)} unread emails")
             return emails
         
@@ -108,15 +114,224 @@ class GmailMonitoringSkill:
             logger.error(f"Failed to fetch emails: {error}")
             return []
     
-    def _get_email_details(self, msg_id: str) -> Optional[Dict[str, Any]]:
+    def fetch_new_emails(self, max_results: int = 10, fmt: str = 'full') -> List[Dict[str, Any]]:
+        """
+        Fetch only unread emails added since the last poll (incremental sync).
+        
+        Uses the Gmail History API starting from the saved historyId. When no
+        historyId is saved yet, or Gmail reports it as expired, falls back to a
+        full resync bounded by max_results.
+        """
+        if not self.service:
+            logger.error("Gmail service not initialized")
+            return []
+        
+        try:
+            msg_ids, history_id = self._list_new_unread_ids(max_results)
+            emails = self._fetch_details(msg_ids, fmt)
+            
+            # Only advance the sync point once the new messages were fetched
+            if history_id:
+                self._save_history_id(history_id)
+            
+            logger.info(f"Fetched {len(emails)} new unread emails (incremental)")
+            return emails
+        
+        except HttpError as error:
+            logger.error(f"Failed to fetch new emails: {error}")
+            return []
+    
+    def _fetch_details(self, msg_ids: List[str], fmt: str = 'full') -> List[Dict[str, Any]]:
+        """Fetch details for a list of message IDs"""
+        if len(msg_ids) == 1:
+            email_data = self._get_email_details(msg_ids[0], fmt)
+            return [email_data] if email_data else []
+        return self._get_email_details_batch(msg_ids, fmt)
+    
+    def _fetch_candidate_bodies(self, emails: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Second stage of the two-phase fetch.
+        
+        `emails` hold only metadata and snippets. Full bodies are downloaded
+        only for candidates: emails whose subject or snippet match a keyword,
+        or that are ambiguous (sender matches a keyword, or there is no snippet
+        to judge by).
+        """
+        candidate_ids = []
+        
+        for email in emails:
+            snippet = email.get('snippet', '')
+            if (self.filter_skill.is_relevant(email.get('subject', ''), snippet)
+                    or self.filter_skill.is_relevant(email.get('sender', ''))
+                    or not snippet.strip()):
+                candidate_ids.append(email['id'])
+        
+        logger.info(f"Two-phase fetch: {len(candidate_ids)} of {len(emails)} emails need full bodies")
+        
+        if not candidate_ids:
+            return []
+        return self._fetch_details(candidate_ids, 'full')
+    
+    def _list_unread_ids(self, max_results: int) -> List[str]:
+        """List IDs of unread messages (full listing)"""
+        results = self.service.users().messages().list(
+            userId='me',
+            q='is:unread',
+            maxResults=max_results
+        ).execute()
+        
+        return [msg['id'] for msg in results.get('messages', [])]
+    
+    def _list_new_unread_ids(self, max_results: int) -> Tuple[List[str], Optional[str]]:
+        """
+        List IDs of unread messages added since the saved historyId.
+        
+        Returns:
+            (message IDs, historyId to save once they are processed)
+        """
+        start_history_id = self._load_history_id()
+        if not start_history_id:
+            logger.info("No saved Gmail historyId, running full resync")
+            return self._full_resync_ids(max_results)
+        
+        msg_ids = []
+        seen = set()
+        latest_history_id = start_history_id
+        page_token = None
+        
+        try:
+            while True:
+                request_args = {
+                    'userId': 'me',
+                    'startHistoryId': start_history_id,
+                    'historyTypes': ['messageAdded'],
+                    'labelId': 'UNREAD'
+                }
+                if page_token:
+                    request_args['pageToken'] = page_token
+                
+                response = self.service.users().history().list(**request_args).execute()
+                latest_history_id = response.get('historyId', latest_history_id)
+                
+                for record in response.get('history', []):
+                    for added in record.get('messagesAdded', []):
+                        message = added.get('message', {})
+                        msg_id = message.get('id')
+                        if msg_id and msg_id not in seen and 'UNREAD' in message.get('labelIds', []):
+                            seen.add(msg_id)
+                            msg_ids.append(msg_id)
+                
+                page_token = response.get('nextPageToken')
+                if not page_token:
+                    break
+        
+        except HttpError as error:
+            # 404 means the saved historyId is too old for Gmail to replay
+            if error.resp.status == 404:
+                logger.warning("Gmail historyId expired, running full resync")
+                return self._full_resync_ids(max_results)
+            raise
+        
+        return msg_ids, latest_history_id
+    
+    def _full_resync_ids(self, max_results: int) -> Tuple[List[str], Optional[str]]:
+        """Bounded full resync: current historyId plus up to max_results unread IDs"""
+        # Read the historyId first so nothing arriving during the listing is skipped
+        profile = self.service.users().getProfile(userId='me').execute()
+        return self._list_unread_ids(max_results), profile.get('historyId')
+    
+    def _load_history_id(self) -> Optional[str]:
+        """Load the last saved Gmail historyId"""
+        if not self.sync_state_path or not os.path.exists(self.sync_state_path):
+            return None
+        
+        try:
+            with open(self.sync_state_path, 'r') as f:
+                return json.load(f).get('history_id')
+        except Exception as e:
+            logger.warning(f"Failed to load Gmail sync state: {e}")
+            return None
+    
+    def _save_history_id(self, history_id: str):
+        """Persist the Gmail historyId for the next incremental sync"""
+        try:
+            with open(self.sync_state_path, 'w') as f:
+                json.dump({
+                    'history_id': str(history_id),
+                    'updated_at': datetime.now().isoformat()
+                }, f)
+        except Exception as e:
+            logger.warning(f"Failed to save Gmail sync state: {e}")
+    
+    def _get_email_details(self, msg_id: str, fmt: str = 'full') -> Optional[Dict[str, Any]]:
         """Get detailed information about an email"""
         try:
-            message = self.service.users().messages().get(
+            message = self._message_request(msg_id, fmt).execute()
+            
+            return self._parse_message(message)
+        
+        except Exception as e:
+            logger.error(f"Failed to get email details: {str(e)}")
+            return None
+    
+    def _get_email_details_batch(self, msg_ids: List[str], fmt: str = 'full') -> List[Dict[str, Any]]:
+        """
+        Get details for many emails using Gmail batch HTTP requests.
+        
+        Message IDs are grouped into batches of `batch_size`, so fetching N
+        messages costs about N / batch_size round trips. Results keep the order
+        of `msg_ids`; messages that fail inside a batch are retried one by one.
+        """
+        messages: Dict[str, Dict] = {}
+        failed: List[str] = []
+        
+        def on_response(request_id, response, exception):
+            if exception is not None:
+                failed.append(request_id)
+            else:
+                messages[request_id] = response
+        
+        for start in range(0, len(msg_ids), self.batch_size):
+            chunk = msg_ids[start:start + self.batch_size]
+            batch = self.service.new_batch_http_request(callback=on_response)
+            for msg_id in chunk:
+                batch.add(self._message_request(msg_id, fmt), request_id=msg_id)
+            
+            try:
+                batch.execute()
+            except Exception as e:
+                logger.error(f"Batch fetch failed: {str(e)}")
+                failed.extend(msg_id for msg_id in chunk if msg_id not in messages)
+        
+        if failed:
+            logger.warning(f"Retrying {len(failed)} message(s) individually")
+        
+        emails = []
+        for msg_id in msg_ids:
+            if msg_id in messages:
+                email_data = self._parse_message(messages[msg_id])
+            elif msg_id in failed:
+                email_data = self._get_email_details(msg_id, fmt)
+            else:
+                email_data = None
+            if email_data:
+                emails.append(email_data)
+        return emails
+    
+    def _message_request(self, msg_id: str, fmt: str = 'full'):
+        """Build a messages.get request in 'full' or 'metadata' format"""
+        if fmt == 'metadata':
+            return self.service.users().messages().get(
                 userId='me',
                 id=msg_id,
-                format='full'
-            ).execute()
-            
+                format='metadata',
+                metadataHeaders=METADATA_HEADERS
+            )
+        return self.service.users().messages().get(userId='me', id=msg_id, format='full')
+    
+    def _parse_message(self, message: Dict) -> Optional[Dict[str, Any]]:
+        """Convert a Gmail API message resource into an email dict"""
+        try:
             headers = message['payload']['headers']
             
             subject = next((h['value'] for h in headers if h['name'].lower() == 'subject'), 'No Subject')
@@ -132,7 +347,7 @@ class GmailMonitoringSkill:
             body = self._get_email_body(message)
             
             return {
-                'id': msg_id,
+                'id': message['id'],
                 'subject': subject,
                 'sender': sender,
                 'date': date,
@@ -141,7 +356,7 @@ class GmailMonitoringSkill:
             }
         
         except Exception as e:
-            logger.error(f"Failed to get email details: {str(e)}")
+            logger.error(f"Failed to parse email: {str(e)}")
             return None
     
     def _get_email_body(self, message: Dict) -> str:
@@ -165,17 +380,10 @@ class GmailMonitoringSkill:
     
     def filter_relevant_emails(self, emails: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Filter emails based on keywords"""
-        from skills.email_filtering import EmailFilteringSkill
-        
-        filter_skill = EmailFilteringSkill(self.keywords)
         relevant_emails = []
         
-        for email in emails:
-            subject = email.get('subject', '')
-            body = email.get('body', '')
-            
-            if filter_skill.is_relevant(subject, body):
-                category = filter_skill.categorize_email(subject, body)
+        for email, category in zip(emails, self.filter_skill.categorize_batch(emails)):
+            if category['is_relevant']:
                 email.update(category)
                 relevant_emails.append(email)
         
@@ -192,7 +400,14 @@ class GmailMonitoringSkill:
         """
         logger.info("Checking for new emails...")
         
-        emails = self.fetch_unread_emails()
+        fmt = 'metadata' if self.two_phase else 'full'
+        if self.incremental:
+            emails = self.fetch_new_emails(fmt=fmt)
+        else:
+            emails = self.fetch_unread_emails(fmt=fmt)
+        
+        if emails and self.two_phase:
+            emails = self._fetch_candidate_bodies(emails)
         
         if not emails:
             return []
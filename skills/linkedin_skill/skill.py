@@ -12,6 +12,7 @@ from typing import Dict, Any, List, Optional
 import nest_asyncio
 from playwright.async_api import async_playwright, Page, BrowserContext, Playwright
 from src.utils.config import Config
+from src.utils.waits import wait_for_condition, wait_for_gone, wait_for_url
 
 logger = logging.getLogger(__name__)
 
@@ -62,7 +63,7 @@ class LinkedInSkill:
             
             # 1. Login Check
             logger.info("LinkedIn Skill: Checking login...")
-            await page.wait_for_timeout(2000) # Give browser a moment to restore state
+            await page.wait_for_load_state("domcontentloaded") # Restored tab finished loading
             
             if "linkedin.com/feed" not in page.url:
                 await page.goto("https://www.linkedin.com/feed/", wait_until="domcontentloaded")
@@ -82,7 +83,6 @@ class LinkedInSkill:
                         # Navigate to login if not there
                         if "login" not in page.url and "checkpoint" not in page.url and "signup" not in page.url:
                             await page.goto("https://www.linkedin.com/login", wait_until="domcontentloaded")
-                            await page.wait_for_timeout(1000)
 
                         # Try multiple selectors for username
                         user_selectors = ['#username', 'input[name="session_key"]', '.login-email']
@@ -122,8 +122,8 @@ class LinkedInSkill:
                         except Exception as inner_e:
                             logger.error(f"LinkedIn Skill: Auto-login attempt failed: {inner_e}. Pausing for manual intervention...")
                             if not self.headless:
-                                # Give user 69s to fix it
-                                await page.wait_for_timeout(69000)
+                                # Give user up to 69s to fix it (continues as soon as the feed opens)
+                                await wait_for_url(page, "**/feed/**", timeout=69000)
                                 if "feed" in page.url:
                                      logger.info("LinkedIn Skill: User seemingly fixed login manually.")
                                 else:
@@ -259,7 +259,7 @@ class LinkedInSkill:
             
             # 1. Login Check (with auto-login fallback)
             logger.info("LinkedIn Skill: Checking login...")
-            await page.wait_for_timeout(2000)
+            await page.wait_for_load_state("domcontentloaded")
             
             if "linkedin.com/feed" not in page.url:
                 await page.goto("https://www.linkedin.com/feed/", wait_until="domcontentloaded")
@@ -275,7 +275,6 @@ class LinkedInSkill:
                          # Same manual intervention logic as scrape_leads
                          if "login" not in page.url and "checkpoint" not in page.url and "signup" not in page.url:
                             await page.goto("https://www.linkedin.com/login", wait_until="domcontentloaded")
-                            await page.wait_for_timeout(1000)
 
                          # Wait for login fields
                          try:
@@ -302,8 +301,8 @@ class LinkedInSkill:
                          except Exception as inner_e:
                             logger.error(f"LinkedIn Skill: Auto-login failed: {inner_e}. Pausing for manual intervention...")
                             if not self.headless:
-                                # Give user 69s to fix it
-                                await page.wait_for_timeout(69000)
+                                # Give user up to 69s to fix it (continues as soon as the feed opens)
+                                await wait_for_url(page, "**/feed/**", timeout=69000)
                                 if "feed" in page.url:
                                      logger.info("LinkedIn Skill: User seemingly fixed login manually.")
                                 else:
@@ -342,7 +341,11 @@ class LinkedInSkill:
             # Focus and type
             await page.click('.share-creation-state__text-editor .ql-editor')
             await page.keyboard.type(content)
-            await page.wait_for_timeout(2000)
+            # The Post button enables once the editor has registered the text
+            await wait_for_condition(
+                page, "() => { const b = document.querySelector('button.share-actions__primary-action'); return !!b && !b.disabled; }",
+                key="linkedin.post_enabled", default=5000
+            )
 
             # 4. Click Post
             logger.info("LinkedIn Skill: Clicking 'Post'...")
@@ -356,11 +359,15 @@ class LinkedInSkill:
                 # Try getting by text
                 await page.get_by_text("Post", exact=True).click()
             
-            await page.wait_for_timeout(5000) # Wait for post to process
+            # The composer closes once LinkedIn accepted the post
+            published = await wait_for_gone(page, '.share-creation-state__text-editor', timeout=15000,
+                                            key="linkedin.post_publish")
+            if not published:
+                logger.warning("LinkedIn Skill: Composer still open after posting; post may not be published yet.")
             
             await context.close()
             await playwright.stop()
-            return {"success": True}
+            return {"success": True, "status": "posted" if published else "pending"}
 
         except Exception as e:
             logger.error(f"LinkedIn Post Error: {e}")
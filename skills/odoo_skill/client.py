@@ -0,0 +1,181 @@
+"""
+Odoo Client - process-wide connection to the Odoo external API
+"""
+import itertools
+import logging
+import threading
+import xmlrpc.client
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Model methods that are safe to send twice (a retried `create` could duplicate a record)
+READ_METHODS = frozenset({"search_read", "read", "search", "search_count", "fields_get", "name_search"})
+
+
+class OdooRPCError(Exception):
+    """Error returned by the Odoo server (XML-RPC Fault or JSON-RPC error)"""
+
+
+class _KeepAliveTransport(xmlrpc.client.Transport):
+    """HTTP transport with a socket timeout (xmlrpc.client keeps the connection open between calls)"""
+
+    def __init__(self, timeout: float, **kwargs):
+        super().__init__(**kwargs)
+        self.timeout = timeout
+
+    def make_connection(self, host):
+        conn = super().make_connection(host)
+        conn.timeout = self.timeout
+        return conn
+
+
+class _KeepAliveSafeTransport(xmlrpc.client.SafeTransport):
+    """HTTPS variant of _KeepAliveTransport"""
+
+    def __init__(self, timeout: float, **kwargs):
+        super().__init__(**kwargs)
+        self.timeout = timeout
+
+    def make_connection(self, host):
+        conn = super().make_connection(host)
+        conn.timeout = self.timeout
+        return conn
+
+
+class OdooClient:
+    """
+    Authenticated Odoo client shared by every OdooSkill in the process.
+
+    - The UID from `authenticate()` is cached, so only the first caller pays
+      for the login round trip.
+    - Each thread keeps its own XML-RPC proxy (ServerProxy is not thread-safe)
+      whose transport reuses one keep-alive HTTP connection, instead of a new
+      TCP/TLS handshake per call.
+    - With protocol="jsonrpc" calls go to /jsonrpc through a per-thread
+      requests.Session, which skips XML (de)serialization.
+    """
+
+    def __init__(self, url: str, db: str, username: str, password: str,
+                 protocol: str = "xmlrpc", timeout: float = 30):
+        self.url = url.rstrip("/")
+        self.db = db
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.protocol = protocol
+
+        if protocol == "jsonrpc":
+            try:
+                import requests  # noqa: F401
+            except ImportError:
+                logger.warning("Odoo Client: requests not installed, falling back to XML-RPC")
+                self.protocol = "xmlrpc"
+        elif protocol != "xmlrpc":
+            raise ValueError(f"Unknown Odoo protocol '{protocol}' (expected 'xmlrpc' or 'jsonrpc')")
+
+        self.uid: Optional[int] = None
+        self._auth_lock = threading.Lock()
+        self._local = threading.local()
+        self._ids = itertools.count(1)
+        self.calls = 0
+
+    # ---- Public API --------------------------------------------------------
+
+    def authenticate(self, force: bool = False) -> Optional[int]:
+        """Log in once and cache the UID (returns None on invalid credentials)"""
+        if self.uid and not force:
+            return self.uid
+        with self._auth_lock:
+            if self.uid and not force:
+                return self.uid
+            if self.protocol == "jsonrpc":
+                uid = self._jsonrpc("common", "authenticate", [self.db, self.username, self.password, {}])
+            else:
+                uid = self._proxy("common").authenticate(self.db, self.username, self.password, {})
+                self.calls += 1
+            self.uid = uid or None
+            return self.uid
+
+    def execute_kw(self, model: str, method: str, args: List[Any],
+                   kwargs: Optional[Dict[str, Any]] = None) -> Any:
+        """Call a model method: one round trip once authenticated"""
+        if not self.uid and not self.authenticate():
+            raise OdooRPCError("Authentication failed")
+
+        params = [self.db, self.uid, self.password, model, method, args, kwargs or {}]
+        if self.protocol == "jsonrpc":
+            return self._jsonrpc("object", "execute_kw", params)
+
+        self.calls += 1
+        try:
+            return self._proxy("object").execute_kw(*params)
+        except xmlrpc.client.Fault as e:
+            raise OdooRPCError(e.faultString) from e
+
+    # ---- Transports --------------------------------------------------------
+
+    def _proxy(self, service: str) -> xmlrpc.client.ServerProxy:
+        proxies = getattr(self._local, "proxies", None)
+        if proxies is None:
+            proxies = self._local.proxies = {}
+        if service not in proxies:
+            transport_cls = _KeepAliveSafeTransport if self.url.startswith("https") else _KeepAliveTransport
+            proxies[service] = xmlrpc.client.ServerProxy(
+                f"{self.url}/xmlrpc/2/{service}",
+                transport=transport_cls(timeout=self.timeout),
+                allow_none=True
+            )
+        return proxies[service]
+
+    def _session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            import requests
+            session = self._local.session = requests.Session()
+        return session
+
+    def _jsonrpc(self, service: str, method: str, args: List[Any]) -> Any:
+        import requests
+
+        payload = {
+            "jsonrpc": "2.0",
+            "method": "call",
+            "params": {"service": service, "method": method, "args": args},
+            "id": next(self._ids)
+        }
+        # execute_kw args: db, uid, password, model, method, ...
+        retryable = service == "common" or (method == "execute_kw" and args[4] in READ_METHODS)
+        for attempt in (0, 1):
+            try:
+                self.calls += 1
+                response = self._session().post(f"{self.url}/jsonrpc", json=payload, timeout=self.timeout)
+                response.raise_for_status()
+                break
+            except requests.ConnectionError:
+                # Stale keep-alive socket: retry reads once on a fresh session. Writes are
+                # not resent, the server may already have applied them.
+                self._local.session = None
+                if attempt or not retryable:
+                    raise
+
+        body = response.json()
+        if body.get("error"):
+            error = body["error"]
+            message = error.get("data", {}).get("message") or error.get("message", "Unknown error")
+            raise OdooRPCError(message)
+        return body.get("result")
+
+
+_clients: Dict[tuple, OdooClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_odoo_client(url: str, db: str, username: str, password: str,
+                    protocol: str = "xmlrpc", timeout: float = 30) -> OdooClient:
+    """Return the shared client for these credentials"""
+    key = (url, db, username, password, protocol)
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = OdooClient(url, db, username, password, protocol=protocol, timeout=timeout)
+        return _clients[key]
@@ -1,13 +1,19 @@
 """
-Odoo Skill - XML-RPC Integration
+Odoo Skill - XML-RPC / JSON-RPC Integration
 """
 import logging
-import xmlrpc.client
-from typing import List, Dict, Any, Union
+from typing import List, Dict, Any, Iterator, Tuple, Union
 from src.utils.config import Config
+from .client import OdooRPCError, get_odoo_client
 
 logger = logging.getLogger(__name__)
 
+# Default crm.lead fields returned by lead searches
+LEAD_FIELDS = ['name', 'contact_name', 'email_from', 'description', 'stage_id']
+
+# Fields matched by keyword searches
+KEYWORD_FIELDS = ('name', 'contact_name', 'email_from', 'partner_name')
+
 class OdooSkill:
     """Skill to interact with Odoo ERP"""
     
@@ -16,10 +22,13 @@ class OdooSkill:
         self.db = Config.ODOO_DB
         self.username = Config.ODOO_USERNAME
         self.password = Config.ODOO_PASSWORD
-        self.common = None
-        self.models = None
-        self.uid = None
         self.enabled = bool(self.url and self.db and self.username and self.password)
+        # Shared across instances: login and HTTP connections are reused process-wide
+        self.client = get_odoo_client(
+            self.url, self.db, self.username, self.password,
+            protocol=Config.ODOO_PROTOCOL, timeout=Config.ODOO_TIMEOUT
+        ) if self.enabled else None
+        self.uid = self.client.uid if self.client else None
 
     def authenticate(self) -> bool:
         """Authenticate with Odoo"""
@@ -28,12 +37,12 @@ class OdooSkill:
             return False
             
         try:
-            self.common = xmlrpc.client.ServerProxy(f'{self.url}/xmlrpc/2/common')
-            self.uid = self.common.authenticate(self.db, self.username, self.password, {})
+            cached = bool(self.client.uid)
+            self.uid = self.client.authenticate()
             
             if self.uid:
-                self.models = xmlrpc.client.ServerProxy(f'{self.url}/xmlrpc/2/object')
-                logger.info(f"Odoo Skill: Authenticated successfully (UID: {self.uid})")
+                if not cached:
+                    logger.info(f"Odoo Skill: Authenticated successfully (UID: {self.uid})")
                 return True
             else:
                 logger.error("Odoo Skill: Authentication failed (Invalid credentials)")
@@ -49,8 +58,7 @@ class OdooSkill:
                 return {"success": False, "error": "Authentication failed"}
         
         try:
-            lead_id = self.models.execute_kw(
-                self.db, self.uid, self.password,
+            lead_id = self.client.execute_kw(
                 'crm.lead', 'create',
                 [{
                     'name': name,
@@ -65,29 +73,148 @@ class OdooSkill:
             logger.error(f"Odoo Skill: Failed to create lead: {e}")
             return {"success": False, "error": str(e)}
 
-    def get_leads(self, limit: int = 5) -> List[Dict[str, Any]]:
+    def create_leads_bulk(self, records: List[Dict[str, Any]], chunk_size: int = None) -> Dict[str, Any]:
+        """
+        Create many CRM Leads with one multi-record `create` per chunk.
+        
+        `records` are crm.lead field dicts ('type' defaults to 'lead'). If the
+        server rejects a chunk, its records are retried one by one so a single
+        bad record does not fail the others. A transport error (timeout, dropped
+        connection) fails the chunk without resending: Odoo may already have
+        committed it. `results[i]` reports record i as
+        {"success": True, "id": ...} or {"success": False, "error": ...}.
+        """
+        chunk_size = max(1, chunk_size or Config.ODOO_BULK_CHUNK_SIZE)
+        results: List[Dict[str, Any]] = [None] * len(records)
+        
+        if records and not self.uid and not self.authenticate():
+            results = [{"success": False, "error": "Authentication failed"} for _ in records]
+            return {"success": False, "created": 0, "failed": len(records), "results": results}
+        
+        for start in range(0, len(records), chunk_size):
+            chunk = [{'type': 'lead', **record} for record in records[start:start + chunk_size]]
+            try:
+                ids = self.client.execute_kw('crm.lead', 'create', [chunk])
+                if isinstance(ids, int):
+                    ids = [ids]
+                if len(ids) != len(chunk):
+                    raise ValueError(f"Odoo returned {len(ids)} ids for {len(chunk)} records")
+                for offset, lead_id in enumerate(ids):
+                    results[start + offset] = {"success": True, "id": lead_id}
+                logger.info(f"Odoo Skill: Created {len(ids)} Leads in one call")
+            except OdooRPCError as e:
+                logger.warning(f"Odoo Skill: Bulk create of {len(chunk)} Leads rejected ({e}), retrying one by one")
+                self._create_leads_one_by_one(chunk, start, results)
+            except Exception as e:
+                logger.error(f"Odoo Skill: Bulk create of {len(chunk)} Leads failed ({e}), not resending")
+                for offset in range(len(chunk)):
+                    results[start + offset] = {"success": False, "error": str(e)}
+        
+        created = sum(1 for r in results if r["success"])
+        return {
+            "success": created == len(records),
+            "created": created,
+            "failed": len(records) - created,
+            "results": results
+        }
+
+    def _create_leads_one_by_one(self, chunk: List[Dict[str, Any]], start: int,
+                                 results: List[Dict[str, Any]]):
+        """Per-record fallback for a rejected chunk; stops at the first transport error"""
+        for offset, values in enumerate(chunk):
+            try:
+                lead_id = self.client.execute_kw('crm.lead', 'create', [values])
+                results[start + offset] = {"success": True, "id": lead_id}
+            except OdooRPCError as record_error:
+                logger.error(f"Odoo Skill: Failed to create lead '{values.get('name')}': {record_error}")
+                results[start + offset] = {"success": False, "error": str(record_error)}
+            except Exception as e:
+                logger.error(f"Odoo Skill: Lead creation interrupted ({e})")
+                for rest in range(offset, len(chunk)):
+                    results[start + rest] = {"success": False, "error": str(e)}
+                return
+
+    def add_lead_note(self, lead_id: int, body: str) -> Dict[str, Any]:
+        """Log an internal note on a lead's chatter (used to update an existing lead)"""
+        if not self.uid:
+            if not self.authenticate():
+                return {"success": False, "error": "Authentication failed"}
+        
+        try:
+            message_id = self.client.execute_kw(
+                'crm.lead', 'message_post',
+                [[lead_id]],
+                {'body': body, 'message_type': 'comment', 'subtype_xmlid': 'mail.mt_note'}
+            )
+            logger.info(f"Odoo Skill: Added note to Lead ID {lead_id}")
+            return {"success": True, "id": lead_id, "message_id": message_id}
+        except Exception as e:
+            logger.error(f"Odoo Skill: Failed to add note to lead {lead_id}: {e}")
+            return {"success": False, "error": str(e), "missing": "does not exist" in str(e)}
+
+    def get_leads(self, limit: int = 5, raise_errors: bool = False) -> List[Dict[str, Any]]:
         """Get recent CRM leads"""
+        return self.search_leads(limit=limit, raise_errors=raise_errors)
+
+    def search_leads(self, domain: List[Any] = None, fields: List[str] = None, limit: int = 80,
+                     offset: int = 0, order: str = 'create_date desc',
+                     raise_errors: bool = False) -> List[Dict[str, Any]]:
+        """
+        Search CRM leads on the server with a single `search_read` call.
+        
+        `domain` is a regular Odoo domain (e.g. `keyword_domain("acme")` or
+        `[['type', '=', 'opportunity']]`), so matches come from the whole CRM
+        rather than a recent page. Returns [] on error, like `get_leads`,
+        unless `raise_errors` (then failures raise, so callers can tell an
+        outage from "no leads").
+        """
         if not self.uid:
-            if not self.authenticate(): return []
+            if not self.authenticate():
+                if raise_errors:
+                    raise OdooRPCError("Authentication failed")
+                return []
             
         try:
-            # Search for latest leads
-            ids = self.models.execute_kw(
-                self.db, self.uid, self.password,
-                'crm.lead', 'search',
-                [[]], # Empty domain = all records
-                {'limit': limit, 'order': 'create_date desc'}
+            return self.client.execute_kw(
+                'crm.lead', 'search_read',
+                [domain or []],
+                {'fields': fields or LEAD_FIELDS, 'limit': limit, 'offset': offset, 'order': order}
             )
-            
-            if ids:
-                records = self.models.execute_kw(
-                    self.db, self.uid, self.password,
-                    'crm.lead', 'read',
-                    [ids],
-                    {'fields': ['name', 'contact_name', 'email_from', 'description', 'stage_id']}
-                )
-                return records
-            return []
         except Exception as e:
-            logger.error(f"Odoo Skill: Failed to get leads: {e}")
+            logger.error(f"Odoo Skill: Failed to search leads: {e}")
+            if raise_errors:
+                raise
             return []
+
+    def iter_leads(self, domain: List[Any] = None, fields: List[str] = None,
+                   page_size: int = 200) -> Iterator[Dict[str, Any]]:
+        """
+        Yield every lead matching `domain`, newest first, one page per call.
+        
+        Pages are keyed on the last seen id (`id < cursor`) instead of an
+        offset, so each page is an index range scan and leads created while
+        iterating do not shift or repeat records. A failed page raises
+        (as search_leads with raise_errors=True) rather than looking like
+        the end of the data.
+        """
+        fields = list(fields or LEAD_FIELDS)
+        if 'id' not in fields:
+            fields.append('id')
+        cursor = None
+        while True:
+            page_domain = list(domain or [])
+            if cursor is not None:
+                page_domain.append(['id', '<', cursor])
+            page = self.search_leads(page_domain, fields, limit=page_size, order='id desc',
+                                     raise_errors=True)
+            yield from page
+            if len(page) < page_size:
+                return
+            cursor = page[-1]['id']
+
+
+def keyword_domain(keyword: str, fields: Tuple[str, ...] = KEYWORD_FIELDS) -> List[Any]:
+    """Domain matching leads whose `fields` contain `keyword` (case-insensitive)"""
+    conditions = [[field, 'ilike', keyword] for field in fields]
+    # Prefix notation: n conditions are OR-ed with n-1 leading '|' operators
+    return ['|'] * (len(conditions) - 1) + conditions
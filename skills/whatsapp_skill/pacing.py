@@ -0,0 +1,47 @@
+"""
+WhatsApp Pacing - spacing between messages of a bulk send
+WhatsApp restricts accounts that message many chats at machine speed.
+"""
+import random
+
+
+class PacingPolicy:
+    """
+    Delays between consecutive messages of one batch.
+
+    Waits `interval` seconds plus up to `jitter` random seconds between
+    messages, and `burst_pause` seconds instead after every `burst_size`
+    messages (0 disables bursts). The first message is never delayed.
+    """
+
+    def __init__(self, interval: float = 3.0, jitter: float = 2.0,
+                 burst_size: int = 10, burst_pause: float = 30.0):
+        self.interval = max(0.0, interval)
+        self.jitter = max(0.0, jitter)
+        self.burst_size = max(0, burst_size)
+        self.burst_pause = max(0.0, burst_pause)
+
+    def delay(self, sent: int) -> float:
+        """Seconds to wait before the next message once `sent` messages were sent (or attempted)"""
+        if sent <= 0:
+            return 0.0
+        if self.burst_size and sent % self.burst_size == 0:
+            base = self.burst_pause
+        else:
+            base = self.interval
+        return base + random.uniform(0, self.jitter) if self.jitter else base
+
+    @classmethod
+    def from_config(cls) -> "PacingPolicy":
+        """Policy from the WHATSAPP_SEND_* / WHATSAPP_BURST_* settings"""
+        from src.utils.config import Config
+        return cls(
+            interval=Config.WHATSAPP_SEND_INTERVAL,
+            jitter=Config.WHATSAPP_SEND_JITTER,
+            burst_size=Config.WHATSAPP_BURST_SIZE,
+            burst_pause=Config.WHATSAPP_BURST_PAUSE
+        )
+
+    def __repr__(self) -> str:
+        return (f"PacingPolicy(interval={self.interval}, jitter={self.jitter}, "
+                f"burst_size={self.burst_size}, burst_pause={self.burst_pause})")
@@ -0,0 +1,339 @@
+"""
+WhatsApp Session - resident, logged-in WhatsApp Web page
+Keeps one Playwright browser warm per session directory and runs
+operations on it one at a time through a command queue.
+"""
+import asyncio
+import atexit
+import concurrent.futures
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from playwright.async_api import async_playwright, Page, BrowserContext, Playwright
+
+logger = logging.getLogger(__name__)
+
+WHATSAPP_URL = "https://web.whatsapp.com"
+
+# Chat List OR Pane Side OR New Chat Button OR Search Box (Playwright OR logic)
+LOGIN_SELECTOR = ('#pane-side, [data-testid="chat-list"], div[aria-label="Chat list"], canvas, '
+                  '[data-testid="chat-list-search"], [data-icon="chat"]')
+
+# Seconds between health checks of an idle, pinned session
+PINNED_HEALTH_INTERVAL = 60
+
+Operation = Callable[[Page], Awaitable[Any]]
+
+
+class WhatsAppSessionError(Exception):
+    """The browser could not be started or WhatsApp Web is not logged in"""
+
+
+class WhatsAppSession:
+    """
+    One persistent-context browser with a logged-in WhatsApp Web page.
+
+    A daemon thread owns the event loop, Playwright and the page. Callers
+    submit operations (`async def op(page)`) from any thread or loop; a single
+    worker runs them in order, so the page never sees two operations at once.
+
+    - The browser is launched on the first operation and reused afterwards.
+    - Before each operation a cheap in-page probe checks the page is alive and
+      logged in; only a failed probe triggers re-login or a relaunch.
+    - After `idle_timeout` seconds without work the browser is closed, which
+      also releases the profile lock on `session_dir` for other processes,
+      unless the session is pinned (e.g. by the inbox watcher).
+    - Setup hooks (`add_setup_hook`) run on the page after every launch, so
+      in-page instrumentation survives relaunches.
+    """
+
+    def __init__(self, session_dir: str, headless: bool = False, idle_timeout: float = 600):
+        self.session_dir = os.path.abspath(session_dir)
+        self.headless = headless
+        self.idle_timeout = idle_timeout
+
+        self._playwright: Optional[Playwright] = None
+        self._context: Optional[BrowserContext] = None
+        self._page: Optional[Page] = None
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._thread: Optional[threading.Thread] = None
+        self._started = threading.Event()
+        self._lock = threading.Lock()
+
+        self._setup_hooks = []
+        self._pins = 0
+
+        self.launches = 0
+        self.operations = 0
+        self.last_used: Optional[float] = None
+
+    # ---- Public API --------------------------------------------------------
+
+    def submit(self, operation: Operation) -> concurrent.futures.Future:
+        """Queue an operation; the returned future resolves to its result"""
+        self._ensure_thread()
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, (operation, future))
+        return future
+
+    def run(self, operation: Operation, timeout: Optional[float] = None) -> Any:
+        """Run an operation and block until it finishes (for sync callers)"""
+        return self.submit(operation).result(timeout)
+
+    async def run_async(self, operation: Operation) -> Any:
+        """Run an operation from any event loop without blocking it"""
+        return await asyncio.wrap_future(self.submit(operation))
+
+    def add_setup_hook(self, hook: Operation) -> concurrent.futures.Future:
+        """
+        Run `hook(page)` now (launching the browser if needed) and again after
+        every relaunch. The returned future resolves once the first run is done.
+        """
+        async def install(page: Page):
+            self._setup_hooks.append(hook)
+            return await hook(page)
+        return self.submit(install)
+
+    def remove_setup_hook(self, hook: Operation):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(
+                lambda: self._setup_hooks.remove(hook) if hook in self._setup_hooks else None
+            )
+
+    def pin(self):
+        """Keep the browser open while idle (until the matching unpin)"""
+        with self._lock:
+            self._pins += 1
+
+    def unpin(self):
+        with self._lock:
+            self._pins = max(0, self._pins - 1)
+
+    def close(self, timeout: float = 30):
+        """Close the browser and stop the session thread"""
+        with self._lock:
+            if self._thread is None:
+                return
+            loop, thread = self._loop, self._thread
+            self._thread = None
+        loop.call_soon_threadsafe(self._queue.put_nowait, (None, None))
+        thread.join(timeout)
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "session_dir": self.session_dir,
+            "running": self._thread is not None,
+            "browser_open": self._page is not None,
+            "pinned": self._pins > 0,
+            "launches": self.launches,
+            "operations": self.operations
+        }
+
+    # ---- Session thread ----------------------------------------------------
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._started.clear()
+            self._thread = threading.Thread(target=self._run_loop, name="whatsapp-session", daemon=True)
+            self._thread.start()
+        self._started.wait()
+
+    def _run_loop(self):
+        # Playwright drives the browser through a subprocess: needs the Proactor loop on Windows
+        loop = asyncio.ProactorEventLoop() if sys.platform == "win32" else asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._started.set()
+        try:
+            loop.run_until_complete(self._worker())
+        finally:
+            loop.close()
+
+    async def _worker(self):
+        while True:
+            try:
+                timeout = None
+                if self._pins:
+                    # Pinned: wake up regularly to health-check the page nobody is using
+                    timeout = min(self.idle_timeout, PINNED_HEALTH_INTERVAL)
+                elif self._page is not None:
+                    timeout = self.idle_timeout
+                operation, future = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                if self._pins:
+                    try:
+                        await self._ensure_page()
+                    except Exception as e:
+                        logger.warning(f"WhatsApp Session: Pinned session unhealthy: {e}")
+                    continue
+                logger.info(f"WhatsApp Session: Idle for {self.idle_timeout:.0f}s, closing browser")
+                await self._cleanup()
+                continue
+
+            if operation is None:
+                await self._cleanup()
+                return
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            try:
+                page = await self._ensure_page()
+                result = await operation(page)
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+            finally:
+                self.operations += 1
+                self.last_used = time.time()
+
+    # ---- Browser lifecycle -------------------------------------------------
+
+    async def _ensure_page(self) -> Page:
+        """Return the resident page, re-logging in or relaunching only if the probe fails"""
+        if await self._healthy():
+            return self._page
+
+        if self._page is not None and not self._page.is_closed():
+            logger.info("WhatsApp Session: Page not ready, reloading WhatsApp Web...")
+            try:
+                await self._page.goto(WHATSAPP_URL, wait_until="domcontentloaded", timeout=60000)
+                if await self._wait_for_login(self._page):
+                    return self._page
+            except Exception as e:
+                logger.warning(f"WhatsApp Session: Reload failed: {e}")
+
+        await self._cleanup()
+        page = await self._launch()
+        if page is None:
+            raise WhatsAppSessionError("Failed to initialize browser or login")
+        return page
+
+    async def _healthy(self) -> bool:
+        if self._page is None or self._page.is_closed():
+            return False
+        try:
+            return await asyncio.wait_for(self._page.evaluate(
+                "() => location.host === 'web.whatsapp.com' && !!document.querySelector('#pane-side')"
+            ), 5)
+        except Exception:
+            return False
+
+    async def _launch(self) -> Optional[Page]:
+        """Start the browser and return a logged-in page, or None if failed"""
+        try:
+            self._playwright = await async_playwright().start()
+
+            self._context = await self._playwright.chromium.launch_persistent_context(
+                user_data_dir=self.session_dir,
+                headless=self.headless,
+                args=[
+                    "--disable-blink-features=AutomationControlled",
+                    "--no-sandbox",
+                    "--disable-setuid-sandbox",
+                    "--disable-infobars",
+                    "--window-size=1280,800"
+                ]
+            )
+            self.launches += 1
+
+            page = self._context.pages[0] if self._context.pages else await self._context.new_page()
+
+            if "web.whatsapp.com" not in page.url:
+                await page.goto(WHATSAPP_URL, wait_until="domcontentloaded", timeout=60000)
+
+            if not await self._wait_for_login(page):
+                await self._cleanup()
+                return None
+
+            logger.info(f"WhatsApp Session: Browser ready (launch #{self.launches})")
+            self._page = page
+            for hook in list(self._setup_hooks):
+                try:
+                    await hook(page)
+                except Exception as e:
+                    logger.warning(f"WhatsApp Session: Setup hook failed: {e}")
+            return page
+
+        except Exception as e:
+            logger.error(f"WhatsApp Session: Browser init error: {e}")
+            await self._cleanup()
+            return None
+
+    async def _wait_for_login(self, page: Page) -> bool:
+        """Wait until the chat list is visible (QR scan may be needed on first use)"""
+        logger.info("WhatsApp Session: Waiting for login (QR Scan might be needed)...")
+        try:
+            # Check for "Loading your chats" screen (often causes hangs)
+            try:
+                loading_msg = page.get_by_text("Loading your chats")
+                if await loading_msg.count() > 0:
+                    logger.info("WhatsApp Session: 'Loading your chats' screen detected. Waiting for it to finish...")
+                    await loading_msg.wait_for(state="detached", timeout=60000)
+            except Exception:
+                pass
+
+            await page.wait_for_selector(LOGIN_SELECTOR, timeout=60000, state='visible')
+            logger.info("WhatsApp Session: Login detected successfully!")
+            return True
+
+        except Exception as e:
+            logger.warning(f"WhatsApp Session: Login check timed out or failed: {e}")
+            try:
+                await page.screenshot(path="whatsapp_login_fail.png")
+            except Exception:
+                pass
+            return False
+
+    async def _cleanup(self):
+        """Close the browser (the session thread keeps running)"""
+        try:
+            if self._context:
+                await self._context.close()
+            if self._playwright:
+                await self._playwright.stop()
+        except Exception as e:
+            logger.warning(f"WhatsApp Session: Cleanup error: {e}")
+        finally:
+            self._page = None
+            self._context = None
+            self._playwright = None
+
+
+_sessions: Dict[str, WhatsAppSession] = {}
+_sessions_lock = threading.Lock()
+
+
+def get_whatsapp_session(session_dir: str, headless: bool = False, idle_timeout: float = 600) -> WhatsAppSession:
+    """
+    Return the process-wide session for a profile directory.
+
+    A Chromium profile can only be open once, so every WhatsAppSkill using the
+    same `session_dir` shares one session (the first caller's settings win).
+    """
+    key = os.path.abspath(session_dir)
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = _sessions[key] = WhatsAppSession(key, headless=headless, idle_timeout=idle_timeout)
+        elif session.headless != headless:
+            logger.warning(f"WhatsApp Session: Reusing {'headless' if session.headless else 'headed'} "
+                           f"session for {key} (requested headless={headless})")
+        return session
+
+
+@atexit.register
+def _close_sessions():
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+    for session in sessions:
+        session.close(timeout=10)
@@ -3,119 +3,182 @@ WhatsApp Skill Implementation (Playwright Edition) - V3.0 ASYNC REFACTOR
 Uses browser automation to send and read messages via WhatsApp Web.
 Fully async implementation with proper Windows event loop handling.
 """
-import logging
 import asyncio
-import sys
+import logging
 import os
+import re
 import time
-from typing import Dict, Any, List, Optional
-from playwright.async_api import async_playwright, Page, BrowserContext, Playwright
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+from urllib.parse import quote
+from playwright.async_api import Page
+from src.utils.waits import wait_for_any, wait_for_condition, wait_for_settled
+from .pacing import PacingPolicy
+from .session import WhatsAppSessionError, get_whatsapp_session
 
 # Configure Logging
 logger = logging.getLogger(__name__)
 
+# True once chat rows with a title have rendered
+CHAT_ROWS_READY_JS = """() => !!document.querySelector('div[role="row"] [dir="auto"][title], div[role="row"] div._ak8q span')"""
+
+# Chat composer and the popup WhatsApp shows for a number that is not on WhatsApp
+INPUT_SELECTOR = 'footer div[contenteditable="true"]'
+INVALID_NUMBER_SELECTOR = 'div[data-testid="popup-controls-ok"]'
+
+# True once the composer holds text (the pre-filled or typed message)
+INPUT_FILLED_JS = """(selector) => {
+    const input = document.querySelector(selector);
+    return !!input && input.textContent.trim().length > 0;
+}"""
+
+# True once the message left the composer and the last outgoing bubble no
+# longer shows the clock icon (i.e. the server accepted it)
+MESSAGE_SENT_JS = """(selector) => {
+    const input = document.querySelector(selector);
+    if (input && input.textContent.trim().length) return false;
+    const outgoing = document.querySelectorAll('div.message-out');
+    if (!outgoing.length) return false;
+    return !outgoing[outgoing.length - 1].querySelector('[data-icon="msg-time"]');
+}"""
+
+# True once the composer is empty again (WhatsApp took the message)
+INPUT_EMPTY_JS = """(selector) => {
+    const input = document.querySelector(selector);
+    return !!input && input.textContent.trim().length === 0;
+}"""
+
+# Opens a send link through WhatsApp's own link handling, which switches chats
+# in-app (no page load). Marks the document so a full reload can be detected.
+OPEN_CHAT_LINK_JS = """(url) => {
+    window.__waInAppNavigation = true;
+    const link = document.createElement('a');
+    link.href = url;
+    link.style.display = 'none';
+    (document.querySelector('#app') || document.body).appendChild(link);
+    link.click();
+    link.remove();
+}"""
+
+# True once the chat opened by a send link shows the pre-filled text (or WhatsApp
+# rejected the number). Waiting for the text, not the composer, also works when
+# the previous chat's composer is still on screen or the chat does not change.
+CHAT_PREFILLED_JS = """([input, popup, snippet]) => {
+    if (document.querySelector(popup)) return true;
+    const box = document.querySelector(input);
+    if (!box) return false;
+    const text = box.textContent.trim();
+    return snippet ? text.includes(snippet) : text.length > 0;
+}"""
+
+# Title of the open chat (matches the chat list row title)
+CHAT_TITLE_JS = """() => {
+    const el = document.querySelector('#main header span[title], #main header span[dir="auto"]');
+    return el ? ((el.getAttribute('title') || el.textContent || '').trim() || null) : null;
+}"""
+
+# Tick status of the latest message per chat title, read from the chat list:
+# "pending" (clock), "sent" (one tick), "delivered" (two ticks), "read", or
+# "unknown" when the row shows no tick (e.g. the last message was incoming)
+DELIVERY_STATUS_JS = """(titles) => {
+    const wanted = new Set(titles);
+    const statuses = {};
+    for (const row of document.querySelectorAll('#pane-side div[role="row"]')) {
+        const titleEl = row.querySelector('[dir="auto"][title]') || row.querySelector('div._ak8q span');
+        if (!titleEl) continue;
+        const title = (titleEl.getAttribute('title') || titleEl.textContent || '').trim();
+        if (!wanted.has(title) || title in statuses) continue;
+        const icon = row.querySelector('[data-icon$="-time"], [data-icon$="-dblcheck"], [data-icon$="-check"]');
+        if (!icon) { statuses[title] = 'unknown'; continue; }
+        const name = icon.getAttribute('data-icon');
+        const label = (icon.getAttribute('aria-label') || (icon.parentElement && icon.parentElement.getAttribute('aria-label')) || '').toLowerCase();
+        statuses[title] = name.endsWith('-time') ? 'pending'
+            : label.includes('read') ? 'read'
+            : name.endsWith('-dblcheck') ? 'delivered' : 'sent';
+    }
+    return statuses;
+}"""
+
+# Serializes one chat row (null for rows without a title). Shared by the scan and
+# the inbox watcher (watcher.py). `outgoing` is true when the last message is
+# our own (its preview carries a clock or sent/delivered/read ticks).
+CHAT_ROW_JS = """(row) => {
+    const TIME = /^(\\d{1,2}[:.]\\d{2}(\\s?[ap]\\.?m\\.?)?|yesterday|today|monday|tuesday|wednesday|thursday|friday|saturday|sunday|\\d{1,4}[\\/.-]\\d{1,2}[\\/.-]\\d{1,4})$/i;
+    const text = (el) => (el && el.textContent || '').trim();
+    const titleEl = row.querySelector('[dir="auto"][title]') || row.querySelector('div._ak8q span');
+    if (!titleEl) return null;
+    const previews = row.querySelectorAll('span[dir="auto"]');
+    const unreadEl = row.querySelector('[aria-label*="unread message"]');
+    const tick = row.querySelector('[data-icon$="-time"], [data-icon$="-check"], [data-icon$="-dblcheck"]');
+    let timestamp = '';
+    for (const el of row.querySelectorAll('div, span')) {
+        if (!el.childElementCount && TIME.test(text(el))) { timestamp = text(el); break; }
+    }
+    return {
+        title: text(titleEl) || titleEl.getAttribute('title') || '',
+        last_message: previews.length ? text(previews[previews.length - 1]) : '',
+        unread: unreadEl ? (text(unreadEl) || '1') : '0',
+        timestamp: timestamp,
+        outgoing: !!tick
+    };
+}"""
+
+# Serializes the first `limit` chat rows in one call: a locator per field would cost
+# one CDP round trip each (~5 per row).
+CHAT_ROWS_JS = """(limit) => {
+    const parseRow = %s;
+    const rows = [];
+    for (const row of document.querySelectorAll('div[role="row"]')) {
+        if (rows.length >= limit) break;
+        const chat = parseRow(row);
+        if (chat) rows.push(chat);
+    }
+    return rows;
+}""" % CHAT_ROW_JS
+
+
+def _is_phone_number(number: str) -> bool:
+    return number.replace("+", "").replace("-", "").replace(" ", "").strip().isdigit()
+
+
+def filter_chats(rows: List[Dict[str, Any]], keywords: List[str] = None) -> List[Dict[str, Any]]:
+    """Keep rows whose title or preview contains a keyword (all rows without keywords)"""
+    if not keywords:
+        return rows
+    results = []
+    for chat in rows:
+        title = chat["title"].lower()
+        preview = chat["last_message"].lower()
+        for k in keywords:
+            if k.lower() in title or k.lower() in preview:
+                results.append({**chat, "matched_keyword": k})
+                break
+    return results
+
 class WhatsAppSkill:
     """
     Skill to handle WhatsApp interactions using Playwright.
-    V3.0: Fully async, no sync wrappers, clean architecture.
+    V3.1: Operations run on a resident, logged-in page (see session.py)
+    instead of launching a browser per call.
+    V3.2: Chats are opened in-app (no page reload) and several messages can be
+    sent in one paced batch (send_messages_bulk).
     """
     
-    def __init__(self, enabled: bool = True, headless: bool = False, session_dir: str = "./whatsapp_session"):
+    def __init__(self, enabled: bool = True, headless: bool = False, session_dir: str = "./whatsapp_session",
+                 idle_timeout: float = 600, pacing: Optional[PacingPolicy] = None):
         self.enabled = enabled
         self.headless = headless
         self.session_dir = os.path.abspath(session_dir)
+        self.idle_timeout = idle_timeout
+        self.pacing = pacing or PacingPolicy()
         
         # Ensure session directory exists
         if not os.path.exists(self.session_dir):
             os.makedirs(self.session_dir, exist_ok=True)
-        
-        # Playwright instances (managed per operation)
-        self._playwright: Optional[Playwright] = None
-        self._context: Optional[BrowserContext] = None
 
-    async def _wait_for_login(self, page: Page) -> bool:
-        """
-        Waits for the user to be logged in. 
-        Uses a combined selector for efficiency (Playwright OR logic).
-        """
-        logger.info("WhatsApp Skill: Waiting for login (QR Scan might be needed)...")
-        
-        # Combined selector: Check for Chat List OR Pane Side OR New Chat Button OR Search Box
-        # This matches verify_whatsapp.py logic which was successful
-        login_selector = '#pane-side, [data-testid="chat-list"], div[aria-label="Chat list"], canvas, [data-testid="chat-list-search"], [data-icon="chat"]'
-        
-        try:
-            logger.info(f"WhatsApp Skill: Checking login with robust selector...")
-            
-            # Check for "Loading your chats" screen (often causes hangs)
-            try:
-                loading_msg = page.get_by_text("Loading your chats")
-                if await loading_msg.count() > 0:
-                     logger.info("WhatsApp Skill: 'Loading your chats' screen detected. Waiting for it to finish...")
-                     await loading_msg.wait_for(state="detached", timeout=60000)
-            except Exception:
-                pass
-            
-            # Wait up to 60s
-            await page.wait_for_selector(login_selector, timeout=60000, state='visible')
-            logger.info("WhatsApp Skill: Login detected successfully!")
-            return True
-            
-        except Exception as e:
-            logger.warning(f"WhatsApp Skill: Login check timed out or failed: {e}")
-            try:
-                await page.screenshot(path="whatsapp_login_fail.png")
-            except: 
-                pass
-            return False
-
-    async def _init_browser(self) -> Optional[Page]:
-        """Initialize browser and return page, or None if failed"""
-        try:
-            self._playwright = await async_playwright().start()
-            
-            self._context = await self._playwright.chromium.launch_persistent_context(
-                user_data_dir=self.session_dir,
-                headless=self.headless,
-                args=[
-                    "--disable-blink-features=AutomationControlled",
-                    "--no-sandbox",
-                    "--disable-setuid-sandbox",
-                    "--disable-infobars",
-                    "--window-size=1280,800"
-                ]
-                # user_agent removed to match verify_whatsapp.py default
-            )
-            
-            page = self._context.pages[0] if self._context.pages else await self._context.new_page()
-            
-            if "web.whatsapp.com" not in page.url:
-                # Increased timeout to 60 seconds
-                await page.goto("https://web.whatsapp.com", wait_until="domcontentloaded", timeout=60000)
-            
-            if not await self._wait_for_login(page):
-                await self._cleanup()
-                return None
-                
-            return page
-            
-        except Exception as e:
-            logger.error(f"WhatsApp Skill: Browser init error: {e}")
-            await self._cleanup()
-            return None
-
-    async def _cleanup(self):
-        """Clean up browser resources"""
-        try:
-            if self._context:
-                await self._context.close()
-            if self._playwright:
-                await self._playwright.stop()
-        except Exception as e:
-            logger.warning(f"Cleanup error: {e}")
-        finally:
-            self._context = None
-            self._playwright = None
+    @property
+    def session(self):
+        """Shared resident browser session for this profile (started on first use)"""
+        return get_whatsapp_session(self.session_dir, headless=self.headless, idle_timeout=self.idle_timeout)
 
     async def send_message_async(self, number: str, message: str) -> Dict[str, Any]:
         """
@@ -125,21 +188,65 @@ class WhatsAppSkill:
         if not self.enabled:
             return {"success": False, "error": "WhatsApp skill is disabled"}
         
-        page = await self._init_browser()
-        if not page:
-            return {"success": False, "error": "Failed to initialize browser or login"}
-        
         try:
-            is_number = number.replace("+", "").replace("-", "").strip().isdigit()
+            return await self.session.run_async(lambda page: self._send_on_page(page, number, message))
+        except WhatsAppSessionError as e:
+            return {"success": False, "error": str(e)}
+
+    async def _clear_search(self, page: Page):
+        """Empty the chat search box left over from a previous operation on the resident page"""
+        search_box = page.locator('div[contenteditable="true"][data-tab="3"]')
+        if await search_box.count() and (await search_box.first.text_content() or "").strip():
+            await search_box.first.click()
+            await page.keyboard.press("Control+A")
+            await page.keyboard.press("Backspace")
+
+    async def _open_chat_link(self, page: Page, send_url: str, message: str) -> Tuple[bool, str]:
+        """
+        Open a chat from a send link, in-app when WhatsApp handles the link and
+        by loading the URL otherwise. Returns (chat_ready, navigation) where
+        navigation is "in_app" or "reload".
+        """
+        # A word of the message identifies the pre-fill (emoji render as images, so skip them)
+        word = re.search(r"\w{3,}", message.split("\n")[0])
+        snippet = word.group(0) if word else ""
+        ready_args = [INPUT_SELECTOR, INVALID_NUMBER_SELECTOR, snippet]
+
+        await page.evaluate(OPEN_CHAT_LINK_JS, send_url)
+        if await wait_for_condition(page, CHAT_PREFILLED_JS, arg=ready_args,
+                                    key="whatsapp.chat_open_link", default=15000):
+            in_app = await page.evaluate("() => !!window.__waInAppNavigation")
+            return True, "in_app" if in_app else "reload"
+
+        logger.info("WhatsApp Skill: Link not handled in-app, loading send URL...")
+        await page.goto(send_url)
+        found = await wait_for_any(page, [INPUT_SELECTOR, INVALID_NUMBER_SELECTOR], timeout=30000,
+                                   key="whatsapp.chat_open")
+        return found is not None, "reload"
+
+    async def _send_on_page(self, page: Page, number: str, message: str,
+                            wait_for_delivery: bool = True) -> Dict[str, Any]:
+        """
+        Send one message on the resident page.
+
+        With `wait_for_delivery` the call waits for the server acknowledgement
+        ("sent" or "pending"); without it, it returns as soon as WhatsApp took
+        the message ("submitted") so a batch can move on to the next chat.
+        """
+        navigation = "search"
+        try:
+            await self._clear_search(page)
+            is_number = _is_phone_number(number)
             
             if is_number:
                 # Direct Navigation for Numbers
                 clean_number = number.replace("+", "").replace(" ", "").replace("-", "")
-                from urllib.parse import quote
                 encoded_message = quote(message)
                 send_url = f"https://web.whatsapp.com/send?phone={clean_number}&text={encoded_message}"
-                logger.info(f"WhatsApp Skill: Navigating to send message to {clean_number}...")
-                await page.goto(send_url)
+                logger.info(f"WhatsApp Skill: Opening chat with {clean_number}...")
+                chat_ready, navigation = await self._open_chat_link(page, send_url, message)
+                if not chat_ready:
+                    raise TimeoutError("Chat input did not appear in time (Contact not found?).")
             else:
                 # SMART SEARCH for Names
                 logger.info(f"WhatsApp Skill: Searching for contact/group '{number}'...")
@@ -165,9 +272,14 @@ class WhatsAppSkill:
                 
                 if search_box:
                     await search_box.click()
-                    await page.wait_for_timeout(500)
+                    before = await page.evaluate("() => document.querySelector('#pane-side')?.innerText || ''")
                     await page.keyboard.type(number)
-                    await page.wait_for_timeout(3000) # Wait for results
+                    # Wait for the list to start filtering, then for it to stop changing
+                    await wait_for_condition(
+                        page, "(before) => (document.querySelector('#pane-side')?.innerText || '') !== before",
+                        arg=before, key="whatsapp.search_filter", default=5000
+                    )
+                    await wait_for_settled(page, '#pane-side', key="whatsapp.search_results")
                     
                     # 2. Select Result (Avoiding Meta AI)
                     logger.info("WhatsApp Skill: analyzing search results...")
@@ -205,48 +317,48 @@ class WhatsAppSkill:
                 else:
                     return {"success": False, "error": "Could not find search box"}
 
-            # Wait for input box to appear (confirming chat open)
-            input_selector = 'footer div[contenteditable="true"]'
-            start_time = time.time()
-            found_input = False
-            
-            while time.time() - start_time < 30:
-                # Check for invalid number popup (only for phone numbers)
-                if is_number and await page.locator('div[data-testid="popup-controls-ok"]').is_visible():
-                    logger.warning("WhatsApp Skill: Invalid number detected.")
-                    await self._cleanup()
-                    return {"success": False, "error": "Invalid WhatsApp number."}
-                
-                if await page.locator(input_selector).is_visible():
-                    found_input = True
-                    break
-                await asyncio.sleep(1)
-            
-            if not found_input:
-                raise TimeoutError("Chat input did not appear in time (Contact not found?).")
+                # Wait for input box to appear (confirming chat open)
+                if await wait_for_any(page, [INPUT_SELECTOR], timeout=30000, key="whatsapp.chat_open") is None:
+                    raise TimeoutError("Chat input did not appear in time (Contact not found?).")
+
+            if is_number and await page.locator(INVALID_NUMBER_SELECTOR).count():
+                logger.warning("WhatsApp Skill: Invalid number detected.")
+                await page.locator(INVALID_NUMBER_SELECTOR).click()
+                return {"success": False, "status": "invalid", "error": "Invalid WhatsApp number.",
+                        "navigation": navigation}
             
             # Focus and send
+            input_selector = INPUT_SELECTOR
             await page.locator(input_selector).focus()
             
-            # If we used search, we still need to type the message
-            if not is_number:
+            # The URL pre-fills the message for numbers; search results still need it typed
+            # (as does a pre-fill WhatsApp dropped)
+            filled = is_number and await wait_for_condition(page, INPUT_FILLED_JS, arg=input_selector,
+                                                            key="whatsapp.input_filled")
+            if not filled:
                 for line in message.split('\n'):
                     await page.keyboard.type(line)
                     await page.keyboard.down("Shift")
                     await page.keyboard.press("Enter")
                     await page.keyboard.up("Shift")
-            else:
-                # Message is already in box from URL, just needs focus?
-                # Sometimes URL navigation pre-fills but doesn't send.
-                # Actually, URL param pre-fills it.
-                pass
-                
-            await page.wait_for_timeout(1000)
+                await wait_for_condition(page, INPUT_FILLED_JS, arg=input_selector, key="whatsapp.input_filled")
             await page.keyboard.press("Enter")
+            chat = await page.evaluate(CHAT_TITLE_JS)
             
             logger.info("WhatsApp Skill: Message submitted.")
-            await page.wait_for_timeout(3000)
-            return {"success": True, "status": "sent"}
+            if not wait_for_delivery:
+                taken = await wait_for_condition(page, INPUT_EMPTY_JS, arg=input_selector,
+                                                 key="whatsapp.submit", default=5000)
+                if not taken:
+                    return {"success": False, "status": "failed", "error": "Message stayed in the input box",
+                            "chat": chat, "navigation": navigation}
+                return {"success": True, "status": "submitted", "chat": chat, "navigation": navigation}
+
+            sent = await wait_for_condition(page, MESSAGE_SENT_JS, arg=input_selector,
+                                            key="whatsapp.delivery", default=15000)
+            if not sent:
+                logger.warning("WhatsApp Skill: Message still pending (no server acknowledgement yet).")
+            return {"success": True, "status": "sent" if sent else "pending", "chat": chat, "navigation": navigation}
             
         except Exception as e:
             logger.error(f"WhatsApp Skill: Send error: {e}")
@@ -254,9 +366,77 @@ class WhatsAppSkill:
                 await page.screenshot(path="whatsapp_error.png")
             except:
                 pass
-            return {"success": False, "error": str(e)}
-        finally:
-            await self._cleanup()
+            return {"success": False, "status": "failed", "error": str(e), "navigation": navigation}
+
+    def send_messages_bulk(self, messages: Sequence[Tuple[str, str]],
+                           pacing: Optional[PacingPolicy] = None) -> Dict[str, Any]:
+        """
+        Send several messages on the resident session, one chat after another.
+
+        `messages` is a list of (number or chat name, text). Each message is
+        its own session operation, so other callers can use the page during the
+        pacing pauses (`pacing` defaults to the skill's policy). Chats are
+        switched in-app; each message is only awaited until WhatsApp took it,
+        and the tick status of every chat is read from the chat list at the end.
+
+        Returns {"success", "sent", "failed", "results"}; results[i] belongs to
+        messages[i] and has "status" "read", "delivered", "sent", "pending",
+        "submitted" (no tick seen), "invalid" or "failed".
+        """
+        messages = list(messages)
+        if not self.enabled:
+            return {"success": False, "error": "WhatsApp skill is disabled", "sent": 0,
+                    "failed": len(messages), "results": []}
+        pacing = pacing or self.pacing
+
+        results: List[Dict[str, Any]] = []
+        sent = 0
+        for index, (number, text) in enumerate(messages):
+            # Failed attempts count too: WhatsApp saw them
+            delay = pacing.delay(index)
+            if delay:
+                time.sleep(delay)
+            try:
+                result = self.session.run(
+                    lambda page, number=number, text=text: self._send_on_page(page, number, text,
+                                                                              wait_for_delivery=False)
+                )
+            except WhatsAppSessionError as e:
+                # No browser: the rest of the batch cannot go out either
+                for rest_number, _ in messages[index:]:
+                    results.append({"number": rest_number, "success": False, "status": "failed", "error": str(e)})
+                break
+            results.append({"number": number, **result})
+            if result.get("success"):
+                sent += 1
+
+        chats = list({r["chat"] for r in results if r.get("success") and r.get("chat")})
+        if chats:
+            try:
+                statuses = self.session.run(lambda page: self._delivery_statuses(page, chats))
+            except WhatsAppSessionError as e:
+                logger.warning(f"WhatsApp Skill: Could not read delivery status: {e}")
+                statuses = {}
+            for result in results:
+                if result.get("success") and statuses.get(result.get("chat"), "unknown") != "unknown":
+                    result["status"] = statuses[result["chat"]]
+
+        failed = len(results) - sent
+        logger.info(f"WhatsApp Skill: Bulk send finished: {sent} sent, {failed} failed")
+        return {"success": failed == 0, "sent": sent, "failed": failed, "results": results}
+
+    async def send_messages_bulk_async(self, messages: Sequence[Tuple[str, str]],
+                                       pacing: Optional[PacingPolicy] = None) -> Dict[str, Any]:
+        """Async version of send_messages_bulk (runs on a worker thread, not blocking the loop)"""
+        return await asyncio.to_thread(self.send_messages_bulk, messages, pacing)
+
+    async def _delivery_statuses(self, page: Page, chats: List[str]) -> Dict[str, str]:
+        """Tick status per chat title, after giving clocks a moment to turn into ticks"""
+        await wait_for_condition(
+            page, "(titles) => !Object.values((%s)(titles)).includes('pending')" % DELIVERY_STATUS_JS,
+            arg=chats, key="whatsapp.bulk_delivery", default=15000
+        )
+        return await page.evaluate(DELIVERY_STATUS_JS, chats)
 
     async def check_messages_async(
         self, 
@@ -271,71 +451,33 @@ class WhatsAppSkill:
         if not self.enabled:
             return {"success": False, "error": "WhatsApp skill is disabled", "messages": []}
         
-        page = await self._init_browser()
-        if not page:
-            return {"success": False, "error": "Failed to initialize browser or login", "messages": []}
-        
+        try:
+            return await self.session.run_async(
+                lambda page: self._scan_on_page(page, keywords, check_archived, limit)
+            )
+        except WhatsAppSessionError as e:
+            return {"success": False, "error": str(e), "messages": []}
+
+    async def _scan_on_page(self, page: Page, keywords: List[str], check_archived: bool,
+                            limit: int) -> Dict[str, Any]:
+        """Scan the chat list (and optionally Archived) on the resident page"""
         messages_found = []
         
         try:
             logger.info("WhatsApp Skill: Logged in, starting scan...")
+            await self._clear_search(page)
             
             # Helper to parse visible chats
             async def parse_chats():
-                # Give it more time to load all chats, especially for large histories
+                # Wait for rendered rows (not a fixed delay), then read them all in one round trip
                 logger.info("WhatsApp Skill: Waiting for chat rows to load...")
                 try:
-                    await page.wait_for_selector('div[role="row"]', timeout=30000)
-                except:
+                    await page.wait_for_function(CHAT_ROWS_READY_JS, timeout=30000)
+                except Exception:
                     logger.warning("WhatsApp Skill: Timeout waiting for chat rows. List might be empty or DOM changed.")
                 
-                # Extra buffer for rendering
-                await page.wait_for_timeout(5000) 
-                
-                rows = await page.locator('div[role="row"]').all()
-                results = []
-                for row in rows[:limit]:
-                    try:
-                        # Get Title
-                        title_el = row.locator('[dir="auto"][title]')
-                        if not await title_el.count():
-                            # Sometimes title doesn't have [title] attr, just text
-                            title_el = row.locator('div._ak8q span') # Generic class fallback? Risky.
-                            if not await title_el.count():
-                                continue
-
-                        title = await title_el.first.text_content()
-                        
-                        # Get Last Message preview
-                        preview_el = row.locator('span[dir="auto"]').last
-                        preview = await preview_el.text_content() if await preview_el.count() else ""
-                        
-                        # Check unread badge
-                        unread_el = row.locator('[aria-label*="unread message"]')
-                        unread_count = await unread_el.text_content() if await unread_el.count() else "0"
-                        
-                        chat_data = {
-                            "title": title,
-                            "last_message": preview,
-                            "unread": unread_count
-                        }
-
-                        # Filter by keyword if provided
-                        if keywords:
-                            match = False
-                            for k in keywords:
-                                if k.lower() in title.lower() or k.lower() in preview.lower():
-                                    match = True
-                                    chat_data['matched_keyword'] = k
-                                    break
-                            if match:
-                                results.append(chat_data)
-                        else:
-                            results.append(chat_data)
-                            
-                    except Exception as e:
-                        continue  # Skip buggy row
-                return results
+                rows = await page.evaluate(CHAT_ROWS_JS, limit)
+                return filter_chats(rows, keywords)
 
             # 1. Scroll ID 'pane-side' to trigger lazy loading
             logger.info("WhatsApp Skill: Scrolling chat list to load messages...")
@@ -343,10 +485,13 @@ class WhatsAppSkill:
                 # Find the scrollable pane
                 pane = page.locator('#pane-side')
                 if await pane.count() > 0:
+                     # The page is reused between scans: start from the top
+                     await pane.evaluate("element => element.scrollTop = 0")
                      # Scroll down a few times
                      for _ in range(3):
                         await pane.evaluate("element => element.scrollTop += 500")
-                        await page.wait_for_timeout(1000)
+                        # Lazy-loaded rows render in bursts: continue once the list is quiet
+                        await wait_for_settled(page, '#pane-side', key="whatsapp.scroll_load")
             except Exception as e:
                 logger.warning(f"WhatsApp Skill: Scroll failed: {e}")
 
@@ -361,7 +506,8 @@ class WhatsAppSkill:
                     if await archived_btn.is_visible():
                         logger.info("WhatsApp Skill: Found 'Archived' text, clicking...")
                         await archived_btn.click()
-                        await page.wait_for_timeout(1000)
+                        await wait_for_any(page, ['[data-icon="back"]', 'button[aria-label="Back"]'],
+                                           key="whatsapp.archived_open")
                         
                         archived_chats = await parse_chats()
                         for c in archived_chats:
@@ -375,7 +521,7 @@ class WhatsAppSkill:
                         else:
                             # If back button not found, try reloading to root
                             await page.goto("https://web.whatsapp.com")
-                            await page.wait_for_timeout(2000)
+                            await wait_for_any(page, ['#pane-side'], key="whatsapp.reload", default=30000)
                     else:
                         logger.warning("WhatsApp Skill: 'Archived' text not visible.")
                         
@@ -392,8 +538,6 @@ class WhatsAppSkill:
         except Exception as e:
             logger.error(f"WhatsApp Scan Error: {e}")
             return {"success": False, "error": str(e), "messages": []}
-        finally:
-            await self._cleanup()
 
     # ========================================
     # SYNC WRAPPERS (for backward compatibility)
@@ -402,45 +546,38 @@ class WhatsAppSkill:
     def send_message(self, number: str, message: str) -> Dict[str, Any]:
         """
         Synchronous wrapper for send_message_async.
-        Use this from non-async code.
+        Use this from non-async code (blocks until the session has sent it).
         """
-        return self._run_async(self.send_message_async(number, message))
+        if not self.enabled:
+            return {"success": False, "error": "WhatsApp skill is disabled"}
+        try:
+            return self.session.run(lambda page: self._send_on_page(page, number, message))
+        except WhatsAppSessionError as e:
+            return {"success": False, "error": str(e)}
     
     def check_messages(
         self, 
         keywords: List[str] = None, 
         check_archived: bool = True, 
         limit: int = 20
-    ) -> List[Dict[str, Any]]:
+    ) -> Dict[str, Any]:
         """
         Synchronous wrapper for check_messages_async.
         Use this from non-async code.
         """
-        return self._run_async(self.check_messages_async(keywords, check_archived, limit))
-    
-    def _run_async(self, coro):
-        """
-        Helper to run async code from sync context.
-        Handles Windows event loop properly.
-        """
-        if sys.platform == 'win32':
-            # Set Windows-specific event loop policy
-            asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
-        
+        if not self.enabled:
+            return {"success": False, "error": "WhatsApp skill is disabled", "messages": []}
         try:
-            # Try to get existing loop
-            loop = asyncio.get_running_loop()
-            # If we're already in an async context, we can't use asyncio.run()
-            # This should not happen with proper architecture, but handle it
-            logger.warning("WhatsApp Skill: Called sync method from async context. Use async methods instead!")
-            # Create new loop in thread
-            import concurrent.futures
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                future = executor.submit(asyncio.run, coro)
-                return future.result()
-        except RuntimeError:
-            # No running loop, we can use asyncio.run()
-            return asyncio.run(coro)
+            return self.session.run(lambda page: self._scan_on_page(page, keywords, check_archived, limit))
+        except WhatsAppSessionError as e:
+            return {"success": False, "error": str(e), "messages": []}
+
+    def get_status(self) -> Dict[str, Any]:
+        return {"enabled": self.enabled, **self.session.get_status()}
+
+    def close(self):
+        """Close the shared browser session for this profile"""
+        self.session.close()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,209 @@
+"""
+WhatsApp Inbox Watcher - push-mode detection of new messages
+A MutationObserver on #pane-side inside the resident WhatsApp Web page reports
+chat-list changes to Python as they render, instead of re-scraping on a timer.
+"""
+import logging
+import queue
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from playwright.async_api import Page
+
+from src.utils.keyword_matcher import KeywordMatcher
+from .skill import CHAT_ROW_JS, WhatsAppSkill
+
+logger = logging.getLogger(__name__)
+
+BINDING_NAME = "__waInboxEvent"
+
+# Installed as an init script (so it comes back after reloads) and evaluated once
+# in the current document. Mutations are debounced, rows re-parsed and diffed
+# against the last seen state per chat title; only changes are sent to Python.
+# The first pass after a page load only records the baseline. Rows whose last
+# message is our own (e.g. an alert we just sent) are recorded but not reported.
+OBSERVER_JS = """(() => {
+    if (window.__waInboxWatcher) return;
+    window.__waInboxWatcher = true;
+    const parseRow = %s;
+    const seen = new Map();
+    let pane = null, observer = null, timer = null, primed = false;
+
+    const collect = () => {
+        timer = null;
+        if (!pane) return;
+        const events = [];
+        for (const row of pane.querySelectorAll('div[role="row"]')) {
+            const chat = parseRow(row);
+            if (!chat) continue;
+            const prev = seen.get(chat.title);
+            seen.set(chat.title, chat);
+            if (!primed || chat.outgoing) continue;
+            if (prev) {
+                if (prev.last_message !== chat.last_message) {
+                    events.push(Object.assign({type: 'new_message'}, chat));
+                } else if (prev.unread !== chat.unread) {
+                    events.push(Object.assign({type: 'unread_change', previous_unread: prev.unread}, chat));
+                }
+            } else if ((parseInt(chat.unread, 10) || 0) > 0) {
+                // A chat we had not seen (scrolled in or new) that has unread messages
+                events.push(Object.assign({type: 'new_message'}, chat));
+            }
+        }
+        primed = true;
+        if (events.length && window.%s) window.%s(events);
+    };
+    const schedule = () => { if (!timer) timer = setTimeout(collect, 150); };
+
+    // WhatsApp re-renders #pane-side (login, view switches): re-attach when it changes
+    const attach = () => {
+        const current = document.querySelector('#pane-side');
+        if (current === pane) return;
+        if (observer) observer.disconnect();
+        pane = current;
+        if (!pane) return;
+        observer = new MutationObserver(schedule);
+        observer.observe(pane, {
+            childList: true, subtree: true, characterData: true,
+            attributes: true, attributeFilter: ['aria-label', 'title']
+        });
+        schedule();
+    };
+    setInterval(attach, 2000);
+    attach();
+})()""" % (CHAT_ROW_JS, BINDING_NAME, BINDING_NAME)
+
+
+class WhatsAppInboxWatcher:
+    """
+    Streams chat-list events from the skill's resident WhatsApp page.
+
+    Each event is a chat row dict (`title`, `last_message`, `unread`,
+    `timestamp`) with a `type` of "new_message" or "unread_change".
+    `on_events(events)` runs on a dedicated thread, never on the browser
+    session's loop, so it may block or call back into the skill. While the
+    watcher runs, the session is pinned (kept open and health-checked) and
+    the observer is re-installed after every browser relaunch.
+    """
+
+    def __init__(self, skill: WhatsAppSkill, on_events: Callable[[List[Dict[str, Any]]], None]):
+        self.skill = skill
+        self.on_events = on_events
+        self.events_received = 0
+        self.last_event_at: Optional[float] = None
+
+        self._queue: "queue.Queue[Optional[List[Dict[str, Any]]]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._installed = False
+
+    @property
+    def active(self) -> bool:
+        """True while the observer is installed on an open browser page"""
+        return self._installed and self.skill.session.get_status()["browser_open"]
+
+    def start(self, timeout: float = 180) -> bool:
+        """Install the observer (launching the browser if needed); False if that failed"""
+        if not self.skill.enabled:
+            return False
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._deliver, name="whatsapp-inbox-watcher", daemon=True)
+            self._thread.start()
+
+        session = self.skill.session
+        session.pin()
+        self._installed = True
+        try:
+            session.add_setup_hook(self._install).result(timeout)
+            logger.info("WhatsApp Watcher: Inbox observer installed (push mode)")
+            return True
+        except Exception as e:
+            self._installed = False
+            session.unpin()
+            logger.warning(f"WhatsApp Watcher: Could not install inbox observer: {e}")
+            return False
+
+    def stop(self):
+        if self._installed:
+            self.skill.session.remove_setup_hook(self._install)
+            self.skill.session.unpin()
+            self._installed = False
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(10)
+            self._thread = None
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "events_received": self.events_received,
+            "last_event_at": self.last_event_at
+        }
+
+    async def _install(self, page: Page):
+        # Runs on the session loop: the binding only enqueues, delivery happens on our thread
+        try:
+            await page.context.expose_binding(BINDING_NAME, self._on_binding)
+        except Exception as e:
+            # Already exposed on this context (e.g. watcher restarted without a relaunch)
+            logger.debug(f"WhatsApp Watcher: expose_binding skipped: {e}")
+        await page.context.add_init_script(OBSERVER_JS)
+        await page.evaluate(OBSERVER_JS)
+
+    def _on_binding(self, source, events: List[Dict[str, Any]]):
+        if self._installed:
+            self._queue.put(events)
+
+    def _deliver(self):
+        while True:
+            events = self._queue.get()
+            if events is None:
+                return
+            self.events_received += len(events)
+            self.last_event_at = time.time()
+            try:
+                self.on_events(events)
+            except Exception as e:
+                logger.error(f"WhatsApp Watcher: Event handler failed: {e}")
+
+
+def _chat_key(title: str) -> str:
+    """Comparable form of a chat title: digits only for phone numbers, casefolded otherwise"""
+    digits = re.sub(r"\D", "", title or "")
+    if digits and not re.sub(r"[\d\s+()-]", "", title):
+        return digits
+    return " ".join((title or "").split()).casefold()
+
+
+def relevant_messages(events: List[Dict[str, Any]], matcher: KeywordMatcher,
+                      group: str = "relevant", exclude_chats: Iterable[str] = ()) -> List[Dict[str, Any]]:
+    """
+    Turn watcher events into chat dicts shaped like check_messages() results.
+
+    Keeps new messages (and unread counts that went up, e.g. a repeated
+    identical preview) whose title or preview matches a keyword of `group`;
+    `matched_keyword` is the first hit in the group's keyword order.
+    Our own messages and the chats in `exclude_chats` (titles or phone
+    numbers, e.g. the admin chat that receives our alerts) are skipped, so
+    an alert quoting a keyword cannot trigger another alert.
+    """
+    excluded = {_chat_key(chat) for chat in exclude_chats if chat}
+    results = []
+    for event in events:
+        if event.get("outgoing") or _chat_key(event["title"]) in excluded:
+            continue
+        if event["type"] == "unread_change":
+            try:
+                if int(event["unread"]) <= int(event.get("previous_unread") or 0):
+                    continue
+            except ValueError:
+                continue
+        hits = matcher.scan(f"{event['title']}\n{event['last_message']}")[group]
+        if not hits:
+            continue
+        chat = {key: value for key, value in event.items() if key not in ("type", "previous_unread", "outgoing")}
+        chat["matched_keyword"] = hits[0]
+        chat["source"] = "live"
+        results.append(chat)
+    return results
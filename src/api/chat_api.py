@@ -14,11 +14,13 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.responses import HTMLResponse, FileResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import List, Dict
+from typing import List, Dict, Optional
 import json
 from datetime import datetime
 import asyncio
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import nest_asyncio
 import logging
 
@@ -39,6 +41,7 @@ if os.name == 'nt':
 
 from agents.chat_agent import ChatAgent
 from agents.main_agent import MainAgent
+from src.utils.config import Config
 
 
 # Initialize FastAPI app
@@ -61,10 +64,42 @@ app.add_middleware(
 public_dir = Path(__file__).parent.parent.parent / "public"
 app.mount("/static", StaticFiles(directory=str(public_dir)), name="static")
 
-# Initialize agents
+# Initialize agents (cheap: tool backends and the Gemini model are built on first use)
 chat_agent = ChatAgent()
 main_agent = MainAgent()
 
+class ChatSlots:
+    """
+    Admission counter for chat requests.
+    
+    try_acquire() checks and takes a slot in one step, with no await in
+    between, so two requests arriving together cannot both pass a "free"
+    check for the last slot. Only used from the event loop thread.
+    """
+    
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_use = 0
+    
+    def try_acquire(self) -> bool:
+        """Take a slot if one is free; False means the caller should answer busy"""
+        if self.in_use >= self.limit:
+            return False
+        self.in_use += 1
+        return True
+    
+    def release(self):
+        self.in_use = max(0, self.in_use - 1)
+
+
+# Gemini calls (and the browser tools they may trigger) are blocking, so they run
+# on a bounded thread pool instead of the event loop. At most CHAT_MAX_CONCURRENCY
+# running + CHAT_MAX_PENDING queued requests are admitted; beyond that the API
+# answers "busy" right away instead of piling up work.
+chat_executor = ThreadPoolExecutor(max_workers=Config.CHAT_MAX_CONCURRENCY, thread_name_prefix="chat")
+chat_slots = ChatSlots(Config.CHAT_MAX_CONCURRENCY + Config.CHAT_MAX_PENDING)
+BUSY_MESSAGE = "The assistant is handling too many requests right now. Please try again in a moment."
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize agents on startup"""
@@ -75,6 +110,19 @@ async def startup_event():
         loop = asyncio.get_running_loop()
         loop.run_in_executor(None, main_agent.initialize)
         logger.info("API: Main Agent initialization started in background")
+        
+        # Build the Gemini model now, off the event loop, so the first chat is not slower
+        loop.run_in_executor(chat_executor, chat_agent.warm_up)
+        
+        # Start keeping the Odoo leads summary warm for chat context
+        from agents.odoo_agent import get_leads_summary_cache
+        loop.run_in_executor(None, get_leads_summary_cache)
+        
+        # Index history files written before the store existed (today is indexed live)
+        loop.run_in_executor(
+            None, main_agent.history_store.backfill,
+            str(main_agent.chat_history_dir), datetime.now().strftime("%Y-%m-%d")
+        )
     except Exception as e:
         logger.error(f"API: Failed to start agent initialization: {e}")
 
@@ -121,8 +169,20 @@ async def chat(message: ChatMessage, request: Request):
     Returns:
         ChatResponse with AI response
     """
+    if not chat_slots.try_acquire():
+        logger.warning("API: Chat capacity reached, rejecting request")
+        return ChatResponse(
+            response=BUSY_MESSAGE,
+            timestamp=datetime.now().isoformat(),
+            status="busy"
+        )
+    
     try:
-        result = chat_agent.chat(message.message, message.user_id)
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(chat_executor, chat_agent.chat, message.message, message.user_id)
+        finally:
+            chat_slots.release()
         
         # Capture metadata
         client_ip = request.client.host if request.client else "unknown"
@@ -185,14 +245,46 @@ async def websocket_chat(websocket: WebSocket):
                 "status": "started"
             })
             
-            # Stream response
-            full_response = ""
-            async for chunk in async_stream_chat(user_message, user_id):
-                full_response += chunk
+            if not chat_slots.try_acquire():
                 await websocket.send_json({
-                    "type": "chunk",
-                    "content": chunk
+                    "type": "error",
+                    "status": "busy",
+                    "message": BUSY_MESSAGE
                 })
+                continue
+            
+            # Stream response: text chunks interleaved with tool call events
+            full_response = ""
+            tokens_used = 0
+            tools_used = []
+            # Closed explicitly so a client disconnect stops the producer before the slot is freed
+            stream = async_stream_chat(user_message, user_id)
+            try:
+                async for event in stream:
+                    if event["type"] in ("text", "error"):
+                        full_response += event["content"]
+                        await websocket.send_json({
+                            "type": "chunk",
+                            "content": event["content"]
+                        })
+                    elif event["type"] == "tool_start":
+                        tools_used.append(event["name"])
+                        await websocket.send_json({
+                            "type": "tool_start",
+                            "name": event["name"],
+                            "args": event["args"]
+                        })
+                    elif event["type"] == "tool_end":
+                        await websocket.send_json({
+                            "type": "tool_end",
+                            "name": event["name"],
+                            "result": event["result"][:500]
+                        })
+                    elif event["type"] == "usage":
+                        tokens_used = event["total_tokens"]
+            finally:
+                await stream.aclose()
+                chat_slots.release()
             
             # Send completion
             await websocket.send_json({
@@ -215,7 +307,9 @@ async def websocket_chat(websocket: WebSocket):
                     "ip_address": client_ip,
                     "user_agent": user_agent,
                     "prompt": user_message,
-                    "response": full_response
+                    "response": full_response,
+                    "tools_used": tools_used,
+                    "tokens_used": tokens_used
                 }
             })
             
@@ -229,9 +323,38 @@ async def websocket_chat(websocket: WebSocket):
 
 
 async def async_stream_chat(user_message: str, user_id: str):
-    """Async wrapper for streaming chat"""
-    for chunk in chat_agent.stream_chat(user_message, user_id):
-        yield chunk
+    """
+    Async wrapper for streaming chat events: the blocking generator runs on the chat pool.
+    
+    The caller holds a chat slot and must close the generator (aclose) before releasing it.
+    """
+    loop = asyncio.get_running_loop()
+    chunks: asyncio.Queue = asyncio.Queue()
+    done = object()
+    cancelled = threading.Event()
+    
+    def produce():
+        events = chat_agent.stream_chat_events(user_message, user_id)
+        try:
+            for chunk in events:
+                if cancelled.is_set():
+                    break
+                loop.call_soon_threadsafe(chunks.put_nowait, chunk)
+        finally:
+            # Closing rewinds an unfinished turn (see ChatbotSkill.stream_events)
+            events.close()
+            loop.call_soon_threadsafe(chunks.put_nowait, done)
+    
+    future = loop.run_in_executor(chat_executor, produce)
+    try:
+        while True:
+            chunk = await chunks.get()
+            if chunk is done:
+                break
+            yield chunk
+    finally:
+        cancelled.set()
+        await future
 
 
 @app.get("/api/status")
@@ -245,28 +368,55 @@ async def get_status():
 
 
 @app.post("/api/clear-history")
-async def clear_history():
-    """Clear chat conversation history"""
-    chat_agent.clear_history()
+async def clear_history(user_id: str = "default"):
+    """Clear a user's chat conversation history"""
+    chat_agent.clear_history(user_id)
     return {"status": "success", "message": "Chat history cleared"}
 
 
 @app.get("/api/conversation")
-async def get_conversation():
-    """Get current conversation history"""
+async def get_conversation(user_id: str = "default"):
+    """Get a user's conversation history"""
+    conversation = chat_agent.get_conversation_history(user_id)
     return {
-        "conversation": chat_agent.get_conversation_history(),
-        "length": len(chat_agent.get_conversation_history())
+        "conversation": conversation,
+        "length": len(conversation)
     }
 
 
+@app.get("/api/history")
+async def get_history(user_id: Optional[str] = None, task: Optional[str] = None,
+                      status: Optional[str] = None, start: Optional[str] = None,
+                      end: Optional[str] = None, limit: int = 50, offset: int = 0):
+    """
+    Query logged history (chat turns, email checks, triggers), newest first
+    
+    Args:
+        user_id, task, status: exact-match filters
+        start, end: ISO date or datetime bounds (inclusive)
+        limit, offset: page size (max 500) and position
+    """
+    def query():
+        # Make sure entries still in the write buffer are visible (file writes
+        # and SQLite inserts: kept off the event loop like the query itself)
+        main_agent.history_log.flush()
+        return main_agent.history_store.query(
+            user_id=user_id, task=task, status=status,
+            start=start, end=end, limit=limit, offset=offset
+        )
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, query)
+
+
 async def log_to_chat_history(entry: Dict):
     """Log entry to chat_history"""
     try:
         # Use MainAgent's logging method
         main_agent._log_to_chat_history(
             task_name=entry["task"],
-            data=entry["data"]
+            data=entry["data"],
+            status=entry.get("status")
         )
     except Exception as e:
         print(f"Error logging to chat history: {e}")
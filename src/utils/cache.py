@@ -0,0 +1,107 @@
+"""
+Caching helpers for Panaversity Student Assistant
+"""
+import logging
+import threading
+import time
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class RefreshingCache:
+    """
+    Single cached value that is refreshed in the background.
+
+    `get()` never waits for the loader: it returns the cached value (even if
+    older than `ttl`, in which case a refresh is started) or `default` while
+    the first load is still running. Only one refresh runs at a time. With
+    `start()` a daemon thread also refreshes every `refresh_interval`
+    seconds so readers keep hitting a warm value.
+    """
+
+    def __init__(self, loader: Callable[[], Any], ttl: float = 300,
+                 refresh_interval: Optional[float] = None, name: str = "cache"):
+        self.loader = loader
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval or ttl * 0.8
+        self.name = name
+
+        self._value: Any = None
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._retry_after = 0.0
+        self._generation = 0
+        self._loaded = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def get(self, default: Any = None, wait: float = 0) -> Any:
+        """Return the cached value; optionally wait up to `wait` seconds for a cold load"""
+        now = time.monotonic()
+        with self._lock:
+            stale = self._loaded_at is None or now - self._loaded_at > self.ttl
+            stale = stale and now >= self._retry_after
+        if stale:
+            self.refresh()
+        if self._loaded_at is None:
+            if wait <= 0 or not self._loaded.wait(wait):
+                return default
+        return self._value
+
+    def refresh(self, blocking: bool = False):
+        """Reload the value (in a background thread unless `blocking`)"""
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        if blocking:
+            self._load()
+        else:
+            threading.Thread(target=self._load, name=f"{self.name}-refresh", daemon=True).start()
+
+    def invalidate(self):
+        """Mark the value stale and reload it in the background"""
+        with self._lock:
+            if self._loaded_at is not None:
+                self._loaded_at = 0.0
+            self._retry_after = 0.0
+            self._generation += 1
+        self.refresh()
+
+    def start(self):
+        """Start periodic background refresh (idempotent)"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._refresh_loop, name=f"{self.name}-warm", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _load(self):
+        with self._lock:
+            generation = self._generation
+        try:
+            value = self.loader()
+            with self._lock:
+                self._value = value
+                # Invalidated mid-load: serve it, but reload on the next get()
+                self._loaded_at = time.monotonic() if generation == self._generation else 0.0
+            self._loaded.set()
+        except Exception as e:
+            # Keep serving the previous value and back off before the next attempt
+            with self._lock:
+                self._retry_after = time.monotonic() + min(60.0, self.ttl)
+            logger.warning(f"RefreshingCache[{self.name}]: Refresh failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def _refresh_loop(self):
+        while not self._stop.is_set():
+            self.refresh(blocking=True)
+            self._stop.wait(self.refresh_interval)
@@ -0,0 +1,187 @@
+"""
+Per-user chat sessions for Panaversity Student Assistant
+Bounded in-memory cache of Gemini chat sessions with disk persistence
+"""
+import atexit
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List
+
+logger = logging.getLogger(__name__)
+
+
+class ChatSessionState:
+    """One user's resident chat state"""
+
+    def __init__(self, user_id: str, chat_session: Any, history: List[Dict[str, Any]]):
+        self.user_id = user_id
+        self.chat_session = chat_session
+        self.history = history
+        self.lock = threading.RLock()
+        self.active = 0
+        self.last_used = time.monotonic()
+        # Prompt size Gemini reported for the last turn (0 until known)
+        self.prompt_tokens = 0
+        # Model `chat_session` talks to (None until the first turn)
+        self.model_name = None
+
+    def size_bytes(self) -> int:
+        """Rough memory footprint: turn text is held twice (our log + Gemini history)"""
+        return 2 * sum(len(turn.get("content", "")) for turn in self.history) + 1024
+
+
+class ChatSessionManager:
+    """
+    LRU/TTL-bounded cache of per-user chat sessions.
+
+    At most `max_sessions` sessions and about `max_memory_bytes` of history
+    stay resident; sessions idle for `ttl_seconds` are dropped first, then the
+    least recently used ones. Evicted sessions are written to
+    `persist_dir/<user>.json` and rebuilt on the user's next message by
+    calling `session_factory(history)`, which must return a new chat session
+    primed with that history.
+    """
+
+    def __init__(self, session_factory: Callable[[List[Dict[str, Any]]], Any],
+                 persist_dir: str = "History/sessions", max_sessions: int = 200,
+                 ttl_seconds: float = 3600, max_memory_bytes: int = 64 * 1024 * 1024):
+        self.session_factory = session_factory
+        self.persist_dir = Path(persist_dir)
+        self.persist_dir.mkdir(parents=True, exist_ok=True)
+        self.max_sessions = max(1, max_sessions)
+        self.ttl_seconds = ttl_seconds
+        self.max_memory_bytes = max_memory_bytes
+
+        self._sessions: "OrderedDict[str, ChatSessionState]" = OrderedDict()
+        self._lock = threading.Lock()
+        atexit.register(self.persist_all)
+
+    @contextmanager
+    def session(self, user_id: str) -> Iterator[ChatSessionState]:
+        """Check out a user's session; it is locked and cannot be evicted while held"""
+        with self._lock:
+            state = self._sessions.get(user_id)
+            if state is None:
+                state = self._load(user_id)
+                self._sessions[user_id] = state
+            self._sessions.move_to_end(user_id)
+            state.active += 1
+
+        try:
+            with state.lock:
+                if state.chat_session is None:
+                    state.chat_session = self.session_factory(state.history)
+                yield state
+        finally:
+            with self._lock:
+                state.active -= 1
+                state.last_used = time.monotonic()
+                self._evict()
+
+    def get_history(self, user_id: str) -> List[Dict[str, Any]]:
+        """Conversation turns for a user (resident or persisted)"""
+        with self._lock:
+            state = self._sessions.get(user_id)
+            if state is not None:
+                return list(state.history)
+        return self._read(user_id)
+
+    def clear(self, user_id: str):
+        """Drop a user's session from memory and disk"""
+        with self._lock:
+            state = self._sessions.pop(user_id, None)
+        if state is not None:
+            with state.lock:
+                state.history = []
+                state.chat_session = None
+        try:
+            self._path(user_id).unlink()
+        except FileNotFoundError:
+            pass
+
+    def persist_all(self):
+        """Write every resident session to disk (called at exit)"""
+        with self._lock:
+            states = list(self._sessions.values())
+        for state in states:
+            self._persist(state)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "resident_sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "memory_bytes": sum(s.size_bytes() for s in self._sessions.values()),
+                "max_memory_bytes": self.max_memory_bytes
+            }
+
+    def _evict(self):
+        """Drop expired, then least recently used, idle sessions (caller holds self._lock)"""
+        now = time.monotonic()
+        for user_id, state in list(self._sessions.items()):
+            if not state.active and now - state.last_used > self.ttl_seconds:
+                self._drop(user_id)
+
+        memory = sum(s.size_bytes() for s in self._sessions.values())
+        for user_id, state in list(self._sessions.items()):
+            if len(self._sessions) <= self.max_sessions and memory <= self.max_memory_bytes:
+                break
+            if state.active:
+                continue
+            memory -= state.size_bytes()
+            self._drop(user_id)
+
+    def _drop(self, user_id: str):
+        state = self._sessions.pop(user_id)
+        self._persist(state)
+        logger.info(f"ChatSessionManager: Evicted session for '{user_id}' ({len(state.history)} turns)")
+
+    def _load(self, user_id: str) -> ChatSessionState:
+        history = self._read(user_id)
+        if history:
+            logger.info(f"ChatSessionManager: Rehydrating session for '{user_id}' ({len(history)} turns)")
+        # The Gemini session itself is created lazily under the state lock
+        return ChatSessionState(user_id, None, history)
+
+    def _read(self, user_id: str) -> List[Dict[str, Any]]:
+        path = self._path(user_id)
+        if not path.exists():
+            return []
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f).get("history", [])
+        except (OSError, ValueError) as e:
+            logger.warning(f"ChatSessionManager: Could not read session file {path.name}: {e}")
+            return []
+
+    def _persist(self, state: ChatSessionState):
+        if not state.history:
+            return
+        path = self._path(state.user_id)
+        tmp_path = path.with_suffix(".tmp")
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({
+                    "user_id": state.user_id,
+                    "saved_at": datetime.now().isoformat(),
+                    "history": state.history
+                }, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.error(f"ChatSessionManager: Failed to persist session for '{state.user_id}': {e}")
+
+    def _path(self, user_id: str) -> Path:
+        safe = re.sub(r"[^A-Za-z0-9_.-]", "_", user_id)[:64]
+        if safe != user_id:
+            # Keep distinct IDs distinct after sanitizing
+            safe += "_" + hashlib.sha1(user_id.encode("utf-8")).hexdigest()[:8]
+        return self.persist_dir / f"{safe}.json"
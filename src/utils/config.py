@@ -15,10 +15,15 @@ class Config:
     GMAIL_ADDRESS = os.getenv("GMAIL_ADDRESS", "exellencelinks@gmail.com")
     GMAIL_CREDENTIALS_PATH = os.getenv("GMAIL_CREDENTIALS_PATH", "credentials.json")
     GMAIL_TOKEN_PATH = os.getenv("GMAIL_TOKEN_PATH", "token.json")
+    GMAIL_SYNC_STATE_PATH = os.getenv("GMAIL_SYNC_STATE_PATH", "gmail_sync_state.json")
+    GMAIL_INCREMENTAL_SYNC = os.getenv("GMAIL_INCREMENTAL_SYNC", "true").lower() == "true"
+    GMAIL_BATCH_SIZE = int(os.getenv("GMAIL_BATCH_SIZE", "50"))
+    GMAIL_TWO_PHASE_FETCH = os.getenv("GMAIL_TWO_PHASE_FETCH", "true").lower() == "true"
     
     # Admin Notifications
     ADMIN_EMAIL = os.getenv("ADMIN_EMAIL", "khansarwar1@hotmail.com")
     ADMIN_WHATSAPP = os.getenv("ADMIN_WHATSAPP", "+923244279017")
+    ADMIN_WHATSAPP_CHAT = os.getenv("ADMIN_WHATSAPP_CHAT", "")  # chat title if the admin number is a saved contact
     
     # SMTP Configuration
     SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com")
@@ -28,6 +33,13 @@ class Config:
     
     # Feature Flags
     WHATSAPP_ENABLED = os.getenv("WHATSAPP_ENABLED", "false").lower() == "true"
+    WHATSAPP_IDLE_TIMEOUT = int(os.getenv("WHATSAPP_IDLE_TIMEOUT", "600"))  # seconds before the resident browser closes
+    WHATSAPP_PUSH_ENABLED = os.getenv("WHATSAPP_PUSH_ENABLED", "true").lower() == "true"  # in-page inbox watcher
+    # Pacing of bulk sends (seconds): interval + random jitter between messages, longer pause per burst
+    WHATSAPP_SEND_INTERVAL = float(os.getenv("WHATSAPP_SEND_INTERVAL", "3"))
+    WHATSAPP_SEND_JITTER = float(os.getenv("WHATSAPP_SEND_JITTER", "2"))
+    WHATSAPP_BURST_SIZE = int(os.getenv("WHATSAPP_BURST_SIZE", "10"))
+    WHATSAPP_BURST_PAUSE = float(os.getenv("WHATSAPP_BURST_PAUSE", "30"))
     LINKEDIN_ENABLED = os.getenv("LINKEDIN_ENABLED", "false").lower() == "true"
     
     # LinkedIn Configuration
@@ -47,12 +59,45 @@ class Config:
     ODOO_DB = os.getenv("ODOO_DB", "")
     ODOO_USERNAME = os.getenv("ODOO_USERNAME", "")
     ODOO_PASSWORD = os.getenv("ODOO_PASSWORD", "")
+    ODOO_PROTOCOL = os.getenv("ODOO_PROTOCOL", "xmlrpc")  # xmlrpc | jsonrpc
+    ODOO_TIMEOUT = int(os.getenv("ODOO_TIMEOUT", "30"))
+    ODOO_BULK_CHUNK_SIZE = int(os.getenv("ODOO_BULK_CHUNK_SIZE", "100"))  # records per bulk create call
+    ODOO_LEADS_CACHE_TTL = int(os.getenv("ODOO_LEADS_CACHE_TTL", "300"))  # seconds; chat lead context
+    LEAD_INDEX_PATH = os.getenv("LEAD_INDEX_PATH", "data/lead_index.db")  # synced message -> lead ID map
     
     # Check Intervals (in minutes)
     EMAIL_CHECK_INTERVAL = int(os.getenv("EMAIL_CHECK_INTERVAL", "15"))
     WHATSAPP_CHECK_INTERVAL = int(os.getenv("WHATSAPP_CHECK_INTERVAL", "60"))
     LINKEDIN_CHECK_INTERVAL = int(os.getenv("LINKEDIN_CHECK_INTERVAL", "60"))
     
+    # Notification Dispatch Queue
+    DISPATCH_MAX_RETRIES = int(os.getenv("DISPATCH_MAX_RETRIES", "3"))
+    DISPATCH_BACKOFF_SECONDS = float(os.getenv("DISPATCH_BACKOFF_SECONDS", "30"))
+    
+    # Digest Mode (coalesce alerts into one email/WhatsApp message per window)
+    DIGEST_ENABLED = os.getenv("DIGEST_ENABLED", "false").lower() == "true"
+    DIGEST_WINDOW_SECONDS = int(os.getenv("DIGEST_WINDOW_SECONDS", "300"))
+    DIGEST_MAX_ITEMS = int(os.getenv("DIGEST_MAX_ITEMS", "10"))
+    
+    # Chat History Log
+    HISTORY_FSYNC = os.getenv("HISTORY_FSYNC", "interval")  # always | interval | never
+    HISTORY_FLUSH_INTERVAL = float(os.getenv("HISTORY_FLUSH_INTERVAL", "1.0"))
+    HISTORY_DB_PATH = os.getenv("HISTORY_DB_PATH", "History/chat_history.db")
+    
+    # Chat API Concurrency
+    CHAT_MAX_CONCURRENCY = int(os.getenv("CHAT_MAX_CONCURRENCY", "4"))  # Gemini calls running at once
+    CHAT_MAX_PENDING = int(os.getenv("CHAT_MAX_PENDING", "16"))  # queued before answering "busy"
+    
+    # Chat Sessions (one per user_id; evicted sessions are saved and reloaded on demand)
+    CHAT_SESSION_DIR = os.getenv("CHAT_SESSION_DIR", "History/sessions")
+    CHAT_MAX_SESSIONS = int(os.getenv("CHAT_MAX_SESSIONS", "200"))
+    CHAT_SESSION_TTL = int(os.getenv("CHAT_SESSION_TTL", "3600"))  # seconds idle before eviction
+    CHAT_SESSION_MEMORY_MB = int(os.getenv("CHAT_SESSION_MEMORY_MB", "64"))
+    
+    # Chat Context Compaction (older turns are summarized past the budget)
+    CHAT_CONTEXT_TOKEN_BUDGET = int(os.getenv("CHAT_CONTEXT_TOKEN_BUDGET", "32000"))
+    CHAT_KEEP_RECENT_TURNS = int(os.getenv("CHAT_KEEP_RECENT_TURNS", "8"))  # messages kept verbatim
+    
     # Keywords for filtering
     FILTER_KEYWORDS = os.getenv("FILTER_KEYWORDS", "Panversity,PIAIC,Quiz,Assignment,Exam,Deadline").split(",")
     
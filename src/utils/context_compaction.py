@@ -0,0 +1,74 @@
+"""
+Conversation compaction for Panaversity Student Assistant
+Keeps chat context under a token budget by summarizing older turns
+"""
+import re
+from typing import Any, Dict, List, Tuple
+
+# Marker on the synthetic turn pair that carries the summary of compacted turns
+SUMMARY_HEADER = "[Summary of earlier conversation]"
+SUMMARY_ACK = "Understood, I have the earlier context."
+
+# Characters per token used for estimates (close enough for English prose with Gemini)
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def history_tokens(turns: List[Dict[str, Any]]) -> int:
+    return sum(estimate_tokens(turn.get("content", "")) for turn in turns)
+
+
+def _first_sentence(text: str, max_chars: int) -> str:
+    text = " ".join(text.split())
+    match = re.match(r"(.+?[.!?])(\s|$)", text)
+    sentence = match.group(1) if match else text
+    if len(sentence) > max_chars:
+        sentence = sentence[:max_chars - 3].rstrip() + "..."
+    return sentence
+
+
+def compact_history(turns: List[Dict[str, Any]], keep_recent: int = 6,
+                    summary_tokens: int = 1000, line_chars: int = 200) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Replace all but the last `keep_recent` turns with an extractive summary.
+
+    Each older turn is reduced to its first sentence (at most `line_chars`
+    characters). The summary becomes a user/assistant turn pair at the front
+    of the history, so roles keep alternating and the system prompt (sent
+    with the first user turn) stays in place. An existing summary pair is
+    folded into the new one; when the summary exceeds `summary_tokens` the
+    oldest lines go first.
+
+    Returns the new turn list and the number of turns that were compacted.
+    """
+    keep_recent = max(2, keep_recent - keep_recent % 2)
+    if len(turns) <= keep_recent:
+        return turns, 0
+
+    old, recent = turns[:-keep_recent], turns[-keep_recent:]
+
+    lines: List[str] = []
+    compacted = 0
+    for turn in old:
+        if turn.get("compacted"):
+            if turn["role"] == "user":
+                lines.extend(line for line in turn["content"].splitlines()[1:] if line.strip())
+            continue
+        speaker = "User" if turn["role"] == "user" else "Assistant"
+        lines.append(f"- {speaker}: {_first_sentence(turn.get('content', ''), line_chars)}")
+        compacted += 1
+
+    while len(lines) > 1 and estimate_tokens("\n".join(lines)) > summary_tokens:
+        lines.pop(0)
+
+    timestamp = recent[0].get("timestamp", "")
+    summary_pair = [
+        {"role": "user", "content": "\n".join([SUMMARY_HEADER] + lines),
+         "timestamp": timestamp, "compacted": True},
+        {"role": "assistant", "content": SUMMARY_ACK,
+         "timestamp": timestamp, "compacted": True},
+    ]
+    return summary_pair + recent, compacted
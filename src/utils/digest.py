@@ -0,0 +1,145 @@
+"""
+Alert digest aggregation for Panaversity Student Assistant
+Coalesces bursts of email alerts into one notification per window
+"""
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class DigestAggregator:
+    """
+    Buffer alerts and hand them to `flush_callback` as one batch.
+
+    The buffer is flushed when the first buffered item is `window_seconds` old,
+    when it holds `max_items` items, or immediately when a high-priority item
+    arrives (that item is included in the flushed batch).
+
+    With `buffer_path` set, every buffered item is also appended to that JSONL
+    file, which is rewritten once a batch has been handed to the callback.
+    `recover()` sends items left there by a crash. Items are written but not
+    fsynced, so only an OS crash or power loss can lose them.
+    """
+
+    def __init__(self, flush_callback: Callable[[List[Dict[str, Any]]], Any],
+                 window_seconds: float = 300, max_items: int = 10,
+                 flush_priorities: Optional[List[str]] = None,
+                 buffer_path: Optional[str] = None):
+        self.flush_callback = flush_callback
+        self.window_seconds = window_seconds
+        self.max_items = max(1, max_items)
+        self.flush_priorities = set(flush_priorities if flush_priorities is not None else ["high"])
+        self.buffer_path = Path(buffer_path) if buffer_path else None
+        if self.buffer_path:
+            self.buffer_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._items: List[Dict[str, Any]] = []
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+
+    def recover(self) -> int:
+        """Send items buffered by a previous run (they are overdue). Returns the count."""
+        if not self.buffer_path or not self.buffer_path.exists():
+            return 0
+
+        items = []
+        with open(self.buffer_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    items.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A line cut off by the crash
+                    logger.warning("DigestAggregator: Skipping unreadable buffered item")
+
+        with self._lock:
+            self._items = items + self._items
+        if items:
+            logger.info(f"DigestAggregator: Recovered {len(items)} buffered item(s)")
+            self.flush()
+        return len(items)
+
+    def add(self, item: Dict[str, Any]):
+        """Buffer one alert, flushing if a size or priority threshold is hit"""
+        with self._lock:
+            self._items.append(item)
+            self._append_to_buffer(item)
+            urgent = item.get("priority") in self.flush_priorities
+            full = len(self._items) >= self.max_items
+
+            if not urgent and not full:
+                self._start_timer()
+                return
+
+            batch = self._take()
+
+        reason = "high-priority item" if urgent else f"{len(batch)} items"
+        logger.info(f"DigestAggregator: Flushing digest ({reason})")
+        self._emit(batch)
+
+    def flush(self):
+        """Emit whatever is buffered now (no-op when empty)"""
+        with self._lock:
+            batch = self._take()
+        if batch:
+            logger.info(f"DigestAggregator: Flushing digest of {len(batch)} item(s)")
+            self._emit(batch)
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._items)
+
+    def _take(self) -> List[Dict[str, Any]]:
+        """Detach the buffer and cancel the window timer (caller holds the lock)"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._items = self._items, []
+        return batch
+
+    def _emit(self, batch: List[Dict[str, Any]]):
+        try:
+            self.flush_callback(batch)
+        except Exception as e:
+            logger.error(f"DigestAggregator: Flush callback failed: {e}")
+            # Keep the batch (still in the buffer file) for the next flush
+            with self._lock:
+                self._items = batch + self._items
+                self._start_timer()
+            return
+        with self._lock:
+            self._rewrite_buffer()
+
+    def _start_timer(self):
+        """Start the window timer unless it is running (caller holds the lock)"""
+        if self._timer is None:
+            self._timer = threading.Timer(self.window_seconds, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _append_to_buffer(self, item: Dict[str, Any]):
+        """Caller holds the lock"""
+        if not self.buffer_path:
+            return
+        try:
+            with open(self.buffer_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(item, default=str) + "\n")
+        except OSError as e:
+            logger.error(f"DigestAggregator: Could not persist buffered item: {e}")
+
+    def _rewrite_buffer(self):
+        """Replace the buffer file with the items still buffered (caller holds the lock)"""
+        if not self.buffer_path:
+            return
+        tmp_path = self.buffer_path.with_suffix(".tmp")
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for item in self._items:
+                    f.write(json.dumps(item, default=str) + "\n")
+            os.replace(tmp_path, self.buffer_path)
+        except OSError as e:
+            logger.error(f"DigestAggregator: Could not rewrite digest buffer: {e}")
@@ -0,0 +1,212 @@
+"""
+Durable in-process dispatch queue for Panaversity Student Assistant
+Runs notification work (SMTP, WhatsApp, Odoo) on per-channel worker pools
+"""
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class DispatchQueue:
+    """
+    Job queue with one bounded worker pool per channel.
+
+    Every job is written to `queue_dir` as a JSON file when enqueued and removed
+    once its handler succeeds, so jobs left over from a crash are picked up
+    again by the next `start()`. Failed jobs are retried with exponential
+    backoff; after `max_retries` they are appended to the dead-letter file.
+    """
+
+    def __init__(self, queue_dir: str = "data/vault/Queue",
+                 dead_letter_path: str = "data/vault/dead_letter.jsonl"):
+        self.queue_dir = Path(queue_dir)
+        self.dead_letter_path = Path(dead_letter_path)
+        self.queue_dir.mkdir(parents=True, exist_ok=True)
+        self.dead_letter_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.channels: Dict[str, Dict[str, Any]] = {}
+        self.running = False
+        self._threads = []
+        self._pending = 0
+        self._pending_cond = threading.Condition()
+        self._dead_letter_lock = threading.Lock()
+
+    def register(self, channel: str, handler: Callable[[Dict[str, Any]], Any],
+                 workers: int = 1, max_retries: int = 3, backoff: float = 30.0):
+        """
+        Register a channel handler.
+
+        The handler receives the job payload and returns True or a dict with
+        "success": True on success. Anything else (or an exception) is a failure.
+        A failed result dict may carry "retry_payload": the payload to retry
+        with instead of the original (e.g. only the part that failed).
+        `workers` bounds how many jobs of this channel run concurrently.
+        """
+        self.channels[channel] = {
+            "handler": handler,
+            "workers": max(1, workers),
+            "max_retries": max_retries,
+            "backoff": backoff,
+            "queue": queue.Queue()
+        }
+
+    def start(self):
+        """Start worker threads and recover jobs persisted by a previous run"""
+        if self.running:
+            return
+        self.running = True
+
+        for channel, spec in self.channels.items():
+            for i in range(spec["workers"]):
+                thread = threading.Thread(
+                    target=self._worker, args=(channel,),
+                    name=f"dispatch-{channel}-{i}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+        recovered = self._recover()
+        logger.info(f"DispatchQueue: Started {len(self._threads)} worker(s), recovered {recovered} job(s)")
+
+    def stop(self, timeout: float = 5.0):
+        """Stop workers; unfinished jobs stay on disk for the next start()"""
+        self.running = False
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+
+    def enqueue(self, channel: str, payload: Dict[str, Any]) -> str:
+        """Persist a job and hand it to the channel's workers. Returns the job ID."""
+        if channel not in self.channels:
+            raise ValueError(f"Unknown dispatch channel: {channel}")
+
+        job = {
+            "id": f"{int(time.time() * 1000)}_{uuid.uuid4().hex[:8]}",
+            "channel": channel,
+            "payload": payload,
+            "attempts": 0,
+            "created": datetime.now().isoformat()
+        }
+        self._persist(job)
+        self._submit(job)
+        return job["id"]
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued job has finished. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._pending_cond:
+            while self._pending > 0:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._pending_cond.wait(remaining)
+        return True
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "pending": self._pending,
+            "channels": {name: spec["workers"] for name, spec in self.channels.items()}
+        }
+
+    def _submit(self, job: Dict[str, Any]):
+        with self._pending_cond:
+            self._pending += 1
+        self.channels[job["channel"]]["queue"].put(job)
+
+    def _finish(self):
+        with self._pending_cond:
+            self._pending -= 1
+            self._pending_cond.notify_all()
+
+    def _worker(self, channel: str):
+        spec = self.channels[channel]
+        while self.running:
+            try:
+                job = spec["queue"].get(timeout=1)
+            except queue.Empty:
+                continue
+
+            error = None
+            try:
+                result = spec["handler"](job["payload"])
+                success = result.get("success", False) if isinstance(result, dict) else bool(result)
+                if not success and isinstance(result, dict):
+                    error = result.get("error")
+                    if result.get("retry_payload") is not None:
+                        job["payload"] = result["retry_payload"]
+            except Exception as e:
+                success = False
+                error = str(e)
+
+            if success:
+                self._remove(job)
+                self._finish()
+                continue
+
+            job["attempts"] += 1
+            job["last_error"] = error or "handler reported failure"
+
+            if job["attempts"] > spec["max_retries"]:
+                logger.error(f"DispatchQueue: [{channel}] job {job['id']} failed permanently: {job['last_error']}")
+                self._dead_letter(job)
+                self._finish()
+                continue
+
+            delay = spec["backoff"] * (2 ** (job["attempts"] - 1))
+            logger.warning(
+                f"DispatchQueue: [{channel}] job {job['id']} failed "
+                f"(attempt {job['attempts']}/{spec['max_retries']}), retrying in {delay:.0f}s"
+            )
+            self._persist(job)
+            timer = threading.Timer(delay, spec["queue"].put, args=(job,))
+            timer.daemon = True
+            timer.start()
+
+    def _job_path(self, job: Dict[str, Any]) -> Path:
+        return self.queue_dir / f"{job['id']}.json"
+
+    def _persist(self, job: Dict[str, Any]):
+        path = self._job_path(job)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(job, f)
+        os.replace(tmp_path, path)
+
+    def _remove(self, job: Dict[str, Any]):
+        try:
+            self._job_path(job).unlink()
+        except FileNotFoundError:
+            pass
+
+    def _dead_letter(self, job: Dict[str, Any]):
+        job["dead_lettered"] = datetime.now().isoformat()
+        with self._dead_letter_lock:
+            with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(job) + "\n")
+        self._remove(job)
+
+    def _recover(self) -> int:
+        """Re-submit jobs persisted by a previous run"""
+        recovered = 0
+        for path in sorted(self.queue_dir.glob("*.json")):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    job = json.load(f)
+            except Exception as e:
+                logger.warning(f"DispatchQueue: Skipping unreadable job file {path.name}: {e}")
+                continue
+
+            if job.get("channel") in self.channels:
+                self._submit(job)
+                recovered += 1
+        return recovered
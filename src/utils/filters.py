@@ -2,58 +2,40 @@
 Keyword filtering utilities for Panaversity Student Assistant
 """
 from typing import List, Dict, Any
-import re
+from src.utils.keyword_matcher import build_email_matcher, categorize_hits
 
 class EmailFilter:
     """Filter and categorize emails based on keywords"""
     
     def __init__(self, keywords: List[str]):
         self.keywords = [k.lower().strip() for k in keywords]
+        # One compiled matcher for relevance, quiz, deadline and priority keywords
+        self.matcher = build_email_matcher(self.keywords)
+    
+    def _scan(self, subject: str, body: str = "") -> Dict[str, List[str]]:
+        """Single pass over subject + body for all keyword groups"""
+        return self.matcher.scan(f"{subject} {body}")
     
     def is_relevant(self, subject: str, body: str = "") -> bool:
         """Check if email contains any of the filter keywords"""
-        text = f"{subject} {body}".lower()
-        return any(keyword in text for keyword in self.keywords)
+        return bool(self._scan(subject, body)["relevant"])
     
     def extract_keywords(self, subject: str, body: str = "") -> List[str]:
         """Extract matching keywords from email"""
-        text = f"{subject} {body}".lower()
-        return [kw for kw in self.keywords if kw in text]
+        return self._scan(subject, body)["relevant"]
     
     def detect_quiz_alert(self, subject: str, body: str = "") -> bool:
         """Detect if email is about a quiz or exam"""
-        quiz_keywords = ["quiz", "exam", "test", "assessment"]
-        text = f"{subject} {body}".lower()
-        return any(keyword in text for keyword in quiz_keywords)
+        return bool(self._scan(subject, body)["quiz"])
     
     def detect_deadline(self, subject: str, body: str = "") -> bool:
         """Detect if email mentions a deadline"""
-        deadline_keywords = ["deadline", "due date", "submit by", "submission"]
-        text = f"{subject} {body}".lower()
-        return any(keyword in text for keyword in deadline_keywords)
+        return bool(self._scan(subject, body)["deadline"])
     
     def categorize_email(self, subject: str, body: str = "") -> Dict[str, Any]:
         """Categorize email and extract metadata"""
-        return {
-            "is_relevant": self.is_relevant(subject, body),
-            "keywords": self.extract_keywords(subject, body),
-            "is_quiz": self.detect_quiz_alert(subject, body),
-            "has_deadline": self.detect_deadline(subject, body),
-            "priority": self._calculate_priority(subject, body)
-        }
+        return categorize_hits(self._scan(subject, body))
     
     def _calculate_priority(self, subject: str, body: str = "") -> str:
         """Calculate email priority (high, medium, low)"""
-        text = f"{subject} {body}".lower()
-        
-        # High priority indicators
-        high_priority = ["urgent", "quiz", "exam", "deadline", "today", "tomorrow"]
-        if any(keyword in text for keyword in high_priority):
-            return "high"
-        
-        # Medium priority indicators
-        medium_priority = ["assignment", "submission", "meeting"]
-        if any(keyword in text for keyword in medium_priority):
-            return "medium"
-        
-        return "low"
+        return categorize_hits(self._scan(subject, body))["priority"]
@@ -0,0 +1,199 @@
+"""
+Append-only chat history log for Panaversity Student Assistant
+Writes one JSON object per line to History/chat_history/YYYY-MM-DD.jsonl
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+FSYNC_POLICIES = ("always", "interval", "never")
+
+
+class HistoryLog:
+    """
+    Buffered, append-only JSONL writer for daily history files.
+
+    `append()` only queues the entry; a background thread writes the buffer
+    every `flush_interval` seconds. Each flush is a single `write()` per file
+    on a descriptor opened with O_APPEND, so concurrent writers (threads or
+    other processes) never interleave partial lines or overwrite each other.
+
+    fsync policy:
+      - "always":   write and fsync synchronously inside append()
+      - "interval": background flush, fsync after every flush (default)
+      - "never":    background flush, leave syncing to the OS
+
+    When a `store` (ChatHistoryStore) is given, every flushed batch is also
+    indexed there.
+    """
+
+    def __init__(self, log_dir: str = "History/chat_history", fsync: str = "interval",
+                 flush_interval: float = 1.0, store=None):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy '{fsync}', expected one of {FSYNC_POLICIES}")
+
+        self.log_dir = Path(log_dir)
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self.fsync = fsync
+        self.flush_interval = flush_interval
+        self.store = store
+
+        self._buffer: List[tuple] = []
+        self._buffer_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+
+        if fsync != "always":
+            self._thread = threading.Thread(target=self._flush_loop, name="history-log", daemon=True)
+            self._thread.start()
+        atexit.register(self.close)
+
+    def append(self, entry: Dict[str, Any]):
+        """Queue one entry for today's file"""
+        date_str = datetime.now().strftime("%Y-%m-%d")
+        line = json.dumps(entry, ensure_ascii=False, default=str) + "\n"
+
+        with self._buffer_lock:
+            self._buffer.append((date_str, line, entry))
+
+        if self.fsync == "always" or self._closed:
+            self.flush()
+
+    def flush(self):
+        """Write all buffered entries now (returns once they are on disk)"""
+        # Held across the swap so a concurrent flush cannot return before
+        # entries taken by another flush are written
+        with self._write_lock:
+            with self._buffer_lock:
+                pending, self._buffer = self._buffer, []
+            if not pending:
+                return
+
+            by_date: Dict[str, List[tuple]] = {}
+            for date_str, line, entry in pending:
+                by_date.setdefault(date_str, []).append((line, entry))
+
+            for date_str, items in by_date.items():
+                try:
+                    self._write(self.log_dir / f"{date_str}.jsonl",
+                                "".join(line for line, _ in items).encode("utf-8"))
+                except OSError as e:
+                    logger.error(f"HistoryLog: Failed to write {len(items)} entr(ies) for {date_str}: {e}")
+                    continue
+
+                if self.store is not None:
+                    try:
+                        self.store.index_day(str(self.log_dir), date_str, [entry for _, entry in items])
+                    except Exception as e:
+                        # The JSONL file is the source of truth; the index can be rebuilt
+                        logger.error(f"HistoryLog: Failed to index entries for {date_str}: {e}")
+
+    def close(self):
+        """Stop the background thread and flush what is left"""
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.flush()
+
+    def _write(self, path: Path, data: bytes):
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            view = memoryview(data)
+            while view:
+                written = os.write(fd, view)
+                view = view[written:]
+            if self.fsync != "never":
+                os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def _flush_loop(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self.flush()
+
+    # ---- Reading ---------------------------------------------------------
+
+    def read_day(self, date_str: str) -> List[Dict[str, Any]]:
+        """Return all entries for one day (YYYY-MM-DD), including legacy .json files"""
+        self.flush()
+        return read_history_day(self.log_dir, date_str)
+
+    def iter_entries(self, start_date: Optional[str] = None,
+                     end_date: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Yield entries day by day between two YYYY-MM-DD dates (inclusive)"""
+        self.flush()
+        yield from iter_history(self.log_dir, start_date, end_date)
+
+
+def read_history_day(log_dir: Path, date_str: str) -> List[Dict[str, Any]]:
+    """
+    Read one day of history.
+
+    Older days were stored as a single JSON array (YYYY-MM-DD.json); newer
+    ones are JSONL (YYYY-MM-DD.jsonl). A day may have both if it spans the
+    switch, in which case the legacy entries come first.
+    """
+    log_dir = Path(log_dir)
+    entries: List[Dict[str, Any]] = []
+
+    legacy_file = log_dir / f"{date_str}.json"
+    if legacy_file.exists():
+        try:
+            with open(legacy_file, "r", encoding="utf-8") as f:
+                entries.extend(json.load(f))
+        except (OSError, ValueError) as e:
+            logger.warning(f"HistoryLog: Could not read legacy file {legacy_file.name}: {e}")
+
+    jsonl_file = log_dir / f"{date_str}.jsonl"
+    if jsonl_file.exists():
+        with open(jsonl_file, "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    # A torn final line after a crash; everything before it is intact
+                    logger.warning(f"HistoryLog: Skipping malformed line {line_no} in {jsonl_file.name}")
+    return entries
+
+
+def iter_history(log_dir: Path, start_date: Optional[str] = None,
+                 end_date: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Yield entries from every daily file (JSON or JSONL) in date order"""
+    log_dir = Path(log_dir)
+    dates = sorted({path.stem for path in log_dir.glob("????-??-??.json*")})
+    for date_str in dates:
+        if start_date and date_str < start_date:
+            continue
+        if end_date and date_str > end_date:
+            continue
+        yield from read_history_day(log_dir, date_str)
+
+
+_logs: Dict[str, HistoryLog] = {}
+_logs_lock = threading.Lock()
+
+
+def get_history_log(log_dir: str = "History/chat_history", fsync: str = "interval",
+                    flush_interval: float = 1.0, store=None) -> HistoryLog:
+    """Return the process-wide writer for a directory (one flush thread per directory)"""
+    key = str(Path(log_dir).resolve())
+    with _logs_lock:
+        if key not in _logs:
+            _logs[key] = HistoryLog(log_dir, fsync=fsync, flush_interval=flush_interval, store=store)
+        return _logs[key]
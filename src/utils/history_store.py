@@ -0,0 +1,210 @@
+"""
+Indexed chat history store for Panaversity Student Assistant
+SQLite copy of the History/chat_history logs for fast filtered queries
+"""
+import json
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.utils.history_log import read_history_day
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    task TEXT,
+    status TEXT,
+    user_id TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_timestamp ON entries (timestamp);
+CREATE INDEX IF NOT EXISTS idx_entries_user ON entries (user_id, timestamp);
+CREATE INDEX IF NOT EXISTS idx_entries_task ON entries (task, timestamp);
+CREATE INDEX IF NOT EXISTS idx_entries_status ON entries (status, timestamp);
+CREATE TABLE IF NOT EXISTS imported_files (
+    name TEXT PRIMARY KEY,
+    entries INTEGER NOT NULL
+);
+"""
+
+
+class ChatHistoryStore:
+    """
+    SQLite store for history entries, indexed by timestamp, user_id, task and status.
+
+    The JSONL files stay the source of truth; the store is an index that
+    HistoryLog fills on every flush and `backfill()` fills from older files.
+    """
+
+    def __init__(self, db_path: str = "History/chat_history.db"):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+
+    def insert_many(self, entries: Iterable[Dict[str, Any]]) -> int:
+        """Index a batch of history entries in one transaction"""
+        rows = [self._row(entry) for entry in entries]
+        if not rows:
+            return 0
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO entries (timestamp, task, status, user_id, data) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+        return len(rows)
+
+    def insert(self, entry: Dict[str, Any]):
+        self.insert_many([entry])
+
+    def query(self, user_id: Optional[str] = None, task: Optional[str] = None,
+              status: Optional[str] = None, start: Optional[str] = None,
+              end: Optional[str] = None, limit: int = 50, offset: int = 0) -> Dict[str, Any]:
+        """
+        Return one page of entries, newest first.
+
+        `start` / `end` are ISO dates or datetimes; a date-only `end` includes
+        that whole day. The result carries the total match count and the
+        offset of the next page (None on the last page).
+        """
+        clauses, params = [], []
+        for column, value in (("user_id", user_id), ("task", task), ("status", status)):
+            if value:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if start:
+            clauses.append("timestamp >= ?")
+            params.append(start)
+        if end:
+            clauses.append("timestamp <= ?")
+            params.append(end + "T23:59:59.999999" if len(end) == 10 else end)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        limit = max(1, min(limit, 500))
+        offset = max(0, offset)
+
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM entries {where}", params).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT id, data FROM entries {where} ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            ).fetchall()
+
+        entries = []
+        for row in rows:
+            entry = json.loads(row["data"])
+            entry["id"] = row["id"]
+            entries.append(entry)
+
+        next_offset = offset + len(entries)
+        return {
+            "entries": entries,
+            "total": total,
+            "limit": limit,
+            "offset": offset,
+            "next_offset": next_offset if next_offset < total else None
+        }
+
+    def backfill(self, log_dir: str = "History/chat_history", skip_date: Optional[str] = None) -> int:
+        """
+        Import daily history files that are not in the store yet.
+
+        Files are imported once and remembered by name. `skip_date` leaves one
+        day (normally today, which HistoryLog indexes via index_day) alone.
+        """
+        log_dir = Path(log_dir)
+        with self._lock:
+            done = {row[0] for row in self._conn.execute("SELECT name FROM imported_files")}
+
+        imported = 0
+        for date_str in sorted({path.stem for path in log_dir.glob("????-??-??.json*")}):
+            if date_str == skip_date or date_str in done:
+                continue
+            entries = read_history_day(log_dir, date_str)
+            rows = [self._row(entry) for entry in entries]
+            with self._lock, self._conn:
+                # HistoryLog may have indexed this day (index_day) since `done` was read
+                if self._conn.execute("SELECT 1 FROM imported_files WHERE name = ?", (date_str,)).fetchone():
+                    continue
+                self._conn.executemany(
+                    "INSERT INTO entries (timestamp, task, status, user_id, data) VALUES (?, ?, ?, ?, ?)",
+                    rows
+                )
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO imported_files (name, entries) VALUES (?, ?)", (date_str, len(rows))
+                )
+            imported += len(rows)
+
+        if imported:
+            logger.info(f"ChatHistoryStore: Backfilled {imported} entr(ies) from {log_dir}")
+        return imported
+
+    def index_day(self, log_dir: str, date_str: str, entries: List[Dict[str, Any]]) -> int:
+        """
+        Index entries just appended to a day's file.
+
+        The first time a day is seen, the whole file is imported instead (it
+        already contains `entries`), so lines written before the store existed
+        are not missed.
+        """
+        with self._lock, self._conn:
+            seen = self._conn.execute(
+                "SELECT 1 FROM imported_files WHERE name = ?", (date_str,)
+            ).fetchone()
+            if not seen:
+                entries = read_history_day(Path(log_dir), date_str)
+            rows = [self._row(entry) for entry in entries]
+            self._conn.executemany(
+                "INSERT INTO entries (timestamp, task, status, user_id, data) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.execute(
+                "INSERT INTO imported_files (name, entries) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET entries = entries + excluded.entries",
+                (date_str, len(rows))
+            )
+        return len(rows)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _row(entry: Dict[str, Any]) -> tuple:
+        data = entry.get("data")
+        user_id = entry.get("user_id")
+        if user_id is None and isinstance(data, dict):
+            user_id = data.get("user_id")
+        status = entry.get("status")
+        if status is None and isinstance(data, dict):
+            status = data.get("status")
+        return (
+            entry.get("timestamp", ""),
+            entry.get("task"),
+            status,
+            user_id,
+            json.dumps(entry, ensure_ascii=False, default=str)
+        )
+
+
+_stores: Dict[str, ChatHistoryStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_history_store(db_path: str = "History/chat_history.db") -> ChatHistoryStore:
+    """Return the process-wide store for a database file"""
+    key = str(Path(db_path).resolve())
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = ChatHistoryStore(db_path)
+        return _stores[key]
@@ -0,0 +1,126 @@
+"""
+Multi-pattern keyword matching for Panaversity Student Assistant
+"""
+import re
+from typing import Dict, Iterable, List, Set, Any, Optional
+
+# Category keyword lists shared by EmailFilteringSkill and EmailFilter
+QUIZ_KEYWORDS = ["quiz", "exam", "test", "assessment"]
+DEADLINE_KEYWORDS = ["deadline", "due date", "submit by", "submission"]
+HIGH_PRIORITY_KEYWORDS = ["urgent", "quiz", "exam", "deadline", "today", "tomorrow"]
+MEDIUM_PRIORITY_KEYWORDS = ["assignment", "submission", "meeting"]
+
+# Above this many distinct keywords the compiled trie regex beats per-keyword scans
+REGEX_MIN_TERMS = 200
+
+
+class KeywordMatcher:
+    """
+    Match several named keyword groups against a text in a single scan.
+
+    The text is lowercased once and every distinct keyword is looked up once,
+    no matter how many groups share it. For large keyword sets (REGEX_MIN_TERMS
+    or more) all keywords are compiled into a single trie-shaped regex instead,
+    so a scan costs one pass over the text regardless of the keyword count.
+    Matching is case-insensitive substring matching, i.e. the same result as
+    `keyword in text.lower()` per keyword.
+    """
+
+    def __init__(self, groups: Dict[str, Iterable[str]], use_regex: Optional[bool] = None):
+        self.groups: Dict[str, List[str]] = {
+            name: [k.lower().strip() for k in keywords]
+            for name, keywords in groups.items()
+        }
+
+        terms = {term for keywords in self.groups.values() for term in keywords if term}
+        self._terms = sorted(terms)
+        # An empty keyword matches every text (same as `"" in text`)
+        self._always: Set[str] = {""} if any("" in kws for kws in self.groups.values()) else set()
+
+        # A hit on a term implies a hit on every term it contains ("quizzes" -> "quiz")
+        self._implied: Dict[str, Set[str]] = {
+            term: {other for other in terms if other in term} for term in terms
+        }
+        if use_regex is None:
+            use_regex = len(terms) >= REGEX_MIN_TERMS
+        # Lookahead so overlapping keywords starting at every position are seen
+        self._pattern = re.compile(f"(?=({_trie_pattern(terms)}))") if terms and use_regex else None
+
+    def find(self, text: str) -> Set[str]:
+        """Return the set of keywords (from any group) found in text"""
+        found = set(self._always)
+        text = text.lower()
+        if self._pattern is None:
+            found.update(term for term in self._terms if term in text)
+            return found
+
+        for match in self._pattern.finditer(text):
+            term = match.group(1)
+            if term not in found:
+                found |= self._implied[term]
+        return found
+
+    def scan(self, text: str) -> Dict[str, List[str]]:
+        """Return the matching keywords of every group, in each group's keyword order"""
+        found = self.find(text)
+        return {
+            name: [kw for kw in keywords if kw in found]
+            for name, keywords in self.groups.items()
+        }
+
+
+def _trie_pattern(terms: Iterable[str]) -> str:
+    """Build a regex alternation factored as a trie (longest match first)"""
+    trie: Dict[str, Any] = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[""] = True
+    return _node_pattern(trie)
+
+
+def _node_pattern(node: Dict[str, Any]) -> str:
+    is_end = "" in node
+    branches = [
+        re.escape(char) + _node_pattern(child)
+        for char, child in sorted(node.items())
+        if char != ""
+    ]
+    if not branches:
+        return ""
+    if len(branches) == 1 and not is_end:
+        return branches[0]
+
+    pattern = "(?:" + "|".join(branches) + ")"
+    # Greedy optional suffix: prefer the longer keyword at the same position
+    return pattern + "?" if is_end else pattern
+
+
+def build_email_matcher(keywords: List[str]) -> KeywordMatcher:
+    """Matcher covering relevance keywords plus all email category keyword lists"""
+    return KeywordMatcher({
+        "relevant": keywords,
+        "quiz": QUIZ_KEYWORDS,
+        "deadline": DEADLINE_KEYWORDS,
+        "high": HIGH_PRIORITY_KEYWORDS,
+        "medium": MEDIUM_PRIORITY_KEYWORDS,
+    })
+
+
+def categorize_hits(hits: Dict[str, List[str]]) -> Dict[str, Any]:
+    """Turn email matcher hits into the categorization dict used across the app"""
+    if hits["high"]:
+        priority = "high"
+    elif hits["medium"]:
+        priority = "medium"
+    else:
+        priority = "low"
+
+    return {
+        "is_relevant": bool(hits["relevant"]),
+        "keywords": hits["relevant"],
+        "is_quiz": bool(hits["quiz"]),
+        "has_deadline": bool(hits["deadline"]),
+        "priority": priority
+    }
@@ -0,0 +1,145 @@
+"""
+Lead dedupe index for Panaversity Student Assistant
+Maps source messages and sender+subject threads to the Odoo leads created for them
+"""
+import hashlib
+import logging
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS lead_keys (
+    key TEXT PRIMARY KEY,
+    lead_id INTEGER NOT NULL,
+    source TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_lead_keys_lead ON lead_keys (lead_id);
+"""
+
+# Reply/forward prefixes ignored when comparing subjects ("Re: Fwd: Hello" == "hello")
+_SUBJECT_PREFIX = re.compile(r"^\s*((re|fw|fwd|aw|sv)\s*(\[\d+\])?\s*:\s*)+", re.IGNORECASE)
+_EMAIL_ADDRESS = re.compile(r"<([^<>@\s]+@[^<>\s]+)>")
+
+
+def normalize_sender(sender: str) -> str:
+    """'Jane Doe <Jane@Example.com>' -> 'jane@example.com'; other senders are case/space-folded"""
+    match = _EMAIL_ADDRESS.search(sender or "")
+    if match:
+        return match.group(1).lower()
+    return " ".join((sender or "").split()).lower()
+
+
+def normalize_subject(subject: str) -> str:
+    return " ".join(_SUBJECT_PREFIX.sub("", subject or "").split()).lower()
+
+
+def lead_keys(source: str, sender: str, subject: str,
+              message_id: Optional[str] = None) -> Tuple[Optional[str], str]:
+    """
+    Dedupe keys for one inbound message.
+
+    Returns (message_key, thread_key): `message_key` identifies this exact
+    message (None without a source ID), `thread_key` is a hash of the
+    normalized sender and subject, shared by every message of a conversation.
+    """
+    message_key = f"msg:{source}:{message_id}" if message_id else None
+    digest = hashlib.sha1(
+        f"{normalize_sender(sender)}\n{normalize_subject(subject)}".encode("utf-8")
+    ).hexdigest()
+    return message_key, f"thread:{source}:{digest}"
+
+
+def content_id(*parts: str) -> str:
+    """Stable ID for sources that expose none (e.g. scraped previews): hash of the content"""
+    return hashlib.sha1("\n".join(" ".join((p or "").split()) for p in parts).encode("utf-8")).hexdigest()[:16]
+
+
+class LeadDedupeIndex:
+    """
+    SQLite map of dedupe keys to Odoo lead IDs.
+
+    Lookups are local, so messages that were already synced cost no RPC.
+    The index only remembers leads created through it; if a lead is deleted
+    in Odoo the caller re-creates it and calls `put()` again.
+    """
+
+    def __init__(self, db_path: str = "data/lead_index.db"):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+
+    def get(self, key: Optional[str]) -> Optional[int]:
+        if not key:
+            return None
+        with self._lock:
+            row = self._conn.execute("SELECT lead_id FROM lead_keys WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, int]:
+        """Look up many keys in one query"""
+        keys = list({key for key in keys if key})
+        found: Dict[str, int] = {}
+        with self._lock:
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, lead_id FROM lead_keys WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                found.update(rows)
+        return found
+
+    def put(self, keys: Iterable[Optional[str]], lead_id: int, source: Optional[str] = None):
+        self.put_many([(key, lead_id) for key in keys], source)
+
+    def put_many(self, pairs: Iterable[Tuple[Optional[str], int]], source: Optional[str] = None):
+        """Map (key, lead_id) pairs in one transaction (existing keys are re-pointed)"""
+        now = datetime.now().isoformat()
+        rows = [(key, lead_id, source, now, now) for key, lead_id in pairs if key]
+        if not rows:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO lead_keys (key, lead_id, source, created_at, updated_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET lead_id = excluded.lead_id, updated_at = excluded.updated_at",
+                rows
+            )
+
+    def forget_lead(self, lead_id: int):
+        """Drop every key pointing at a lead (e.g. after it was deleted in Odoo)"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM lead_keys WHERE lead_id = ?", (lead_id,))
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM lead_keys").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_indexes: Dict[str, LeadDedupeIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_lead_index(db_path: str = "data/lead_index.db") -> LeadDedupeIndex:
+    """Return the process-wide index for a database file"""
+    key = str(Path(db_path).resolve())
+    with _indexes_lock:
+        if key not in _indexes:
+            _indexes[key] = LeadDedupeIndex(db_path)
+        return _indexes[key]
@@ -0,0 +1,203 @@
+"""
+Condition-based waits for Playwright skills
+Wait on concrete DOM/URL/network conditions instead of fixed sleeps, with
+timeouts learned per condition from how long it actually took before.
+"""
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveTimeouts:
+    """
+    Per-key timeout budget learned from observed wait durations.
+
+    Uses the TCP retransmission-timer estimator: a smoothed duration plus four
+    times its smoothed deviation, clamped to [floor, ceiling]. A wait that
+    times out doubles the key's estimate, so a page that got slower earns a
+    larger budget next time instead of failing repeatedly. Keys without
+    history get `default` (or the caller's default).
+    """
+
+    def __init__(self, default: float = 10000, floor: float = 1000, ceiling: float = 60000):
+        self.default = default
+        self.floor = floor
+        self.ceiling = ceiling
+        self._stats: Dict[str, List[float]] = {}  # key -> [smoothed, deviation, samples]
+        self._lock = threading.Lock()
+
+    def timeout(self, key: Optional[str], default: Optional[float] = None) -> float:
+        """Budget in milliseconds for the next wait on `key`"""
+        with self._lock:
+            stats = self._stats.get(key) if key else None
+        if not stats:
+            return default if default is not None else self.default
+        smoothed, deviation, _ = stats
+        return max(self.floor, min(self.ceiling, smoothed + 4 * deviation))
+
+    def record(self, key: Optional[str], elapsed_ms: float):
+        if not key:
+            return
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                self._stats[key] = [elapsed_ms, elapsed_ms / 2, 1]
+                return
+            smoothed, deviation, samples = stats
+            deviation = 0.75 * deviation + 0.25 * abs(smoothed - elapsed_ms)
+            smoothed = 0.875 * smoothed + 0.125 * elapsed_ms
+            self._stats[key] = [smoothed, deviation, samples + 1]
+
+    def record_timeout(self, key: Optional[str], budget_ms: float):
+        if not key:
+            return
+        with self._lock:
+            stats = self._stats.get(key)
+            doubled = min(self.ceiling, budget_ms * 2)
+            if stats is None:
+                self._stats[key] = [doubled, doubled / 4, 0]
+            else:
+                stats[0] = max(stats[0], doubled / 2)
+                stats[1] = max(stats[1], doubled / 8)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            keys = list(self._stats)
+        return {
+            key: {"timeout_ms": round(self.timeout(key)), "samples": self._stats[key][2]}
+            for key in keys
+        }
+
+
+# Shared by every skill in the process so what one operation learns benefits the next
+timeouts = AdaptiveTimeouts()
+
+
+class _Timer:
+    """Times one wait and feeds the result into `timeouts`"""
+
+    def __init__(self, key: Optional[str], timeout: Optional[float], default: float):
+        self.key = key
+        self.budget = timeout if timeout is not None else timeouts.timeout(key, default)
+        self.started = time.monotonic()
+
+    def done(self):
+        timeouts.record(self.key, (time.monotonic() - self.started) * 1000)
+
+    def timed_out(self):
+        timeouts.record_timeout(self.key, self.budget)
+        logger.debug(f"Waits: '{self.key}' not met within {self.budget:.0f}ms")
+
+
+async def wait_for_any(page, selectors: Sequence[str], timeout: Optional[float] = None,
+                       key: Optional[str] = None, state: str = "visible",
+                       default: float = 10000) -> Optional[str]:
+    """
+    Wait until one of `selectors` reaches `state`; return the first one that
+    did (in list order), or None on timeout. One combined selector is polled,
+    so this costs a single wait regardless of how many alternatives there are.
+    """
+    timer = _Timer(key, timeout, default)
+    try:
+        await page.wait_for_selector(", ".join(selectors), timeout=timer.budget, state=state)
+    except Exception:
+        timer.timed_out()
+        return None
+    timer.done()
+    for selector in selectors:
+        try:
+            if await page.locator(selector).count():
+                return selector
+        except Exception:
+            continue
+    return selectors[0]
+
+
+async def wait_for_gone(page, selector: str, timeout: Optional[float] = None,
+                        key: Optional[str] = None, default: float = 10000) -> bool:
+    """Wait until `selector` is detached or hidden (e.g. a modal closing)"""
+    timer = _Timer(key, timeout, default)
+    try:
+        await page.wait_for_selector(selector, timeout=timer.budget, state="hidden")
+    except Exception:
+        timer.timed_out()
+        return False
+    timer.done()
+    return True
+
+
+async def wait_for_condition(page, expression: str, arg: Any = None, timeout: Optional[float] = None,
+                             key: Optional[str] = None, default: float = 10000) -> bool:
+    """Wait until a JS predicate (`(arg) => bool`) is truthy; False on timeout"""
+    timer = _Timer(key, timeout, default)
+    try:
+        await page.wait_for_function(expression, arg=arg, timeout=timer.budget)
+    except Exception:
+        timer.timed_out()
+        return False
+    timer.done()
+    return True
+
+
+# Resolves true once `selector` has had no DOM mutations for `quiet` ms (or does
+# not exist), false if it is still changing after `limit` ms
+_SETTLED_JS = """([selector, quiet, limit]) => new Promise(resolve => {
+    const target = document.querySelector(selector);
+    if (!target) return resolve(true);
+    const finish = (result) => { observer.disconnect(); clearTimeout(timer); clearTimeout(deadline); resolve(result); };
+    let timer = setTimeout(() => finish(true), quiet);
+    const deadline = setTimeout(() => finish(false), limit);
+    const observer = new MutationObserver(() => {
+        clearTimeout(timer);
+        timer = setTimeout(() => finish(true), quiet);
+    });
+    observer.observe(target, {childList: true, subtree: true, characterData: true});
+})"""
+
+
+async def wait_for_settled(page, selector: str, quiet: float = 300, timeout: Optional[float] = None,
+                           key: Optional[str] = None, default: float = 5000) -> bool:
+    """
+    Wait until the element matching `selector` stops changing for `quiet` ms
+    (e.g. search results or a lazily loaded list finished rendering).
+    The whole wait is one in-page promise, not a polling loop.
+    """
+    timer = _Timer(key, timeout, default)
+    try:
+        settled = await page.evaluate(_SETTLED_JS, [selector, quiet, max(timer.budget, quiet)])
+    except Exception:
+        settled = False
+    if not settled:
+        timer.timed_out()
+        return False
+    timer.done()
+    return True
+
+
+async def wait_for_url(page, pattern: Any, timeout: Optional[float] = None,
+                       key: Optional[str] = None, default: float = 30000) -> bool:
+    """Wait until the page URL matches a glob, regex or predicate; False on timeout"""
+    timer = _Timer(key, timeout, default)
+    try:
+        await page.wait_for_url(pattern, timeout=timer.budget, wait_until="commit")
+    except Exception:
+        timer.timed_out()
+        return False
+    timer.done()
+    return True
+
+
+async def wait_for_network_idle(page, timeout: Optional[float] = None,
+                                key: Optional[str] = None, default: float = 5000) -> bool:
+    """Wait until no network requests for 500 ms; False on timeout (long-polling pages never idle)"""
+    timer = _Timer(key, timeout, default)
+    try:
+        await page.wait_for_load_state("networkidle", timeout=timer.budget)
+    except Exception:
+        timer.timed_out()
+        return False
+    timer.done()
+    return True
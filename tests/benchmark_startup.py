@@ -0,0 +1,83 @@
+"""
+API Server Startup Benchmark
+Measures cold import time of the chat API and checks that heavy tool backends
+(Playwright, Gmail API client, Gemini SDK) are not imported until first use.
+
+Usage: python tests/benchmark_startup.py [runs] [budget_seconds]
+"""
+import subprocess
+import statistics
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+
+RUNS = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+BUDGET_SECONDS = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+
+# Modules that must stay unimported after `import src.api.chat_api`
+HEAVY_MODULES = [
+    "playwright",
+    "googleapiclient",
+    "google.generativeai",
+    "agents.email_agent",
+    "agents.whatsapp_agent",
+    "agents.linkedin_agent",
+]
+
+# Each run is a fresh interpreter so nothing is cached between measurements
+PROBE = f"""
+import sys, time, json
+sys.path.insert(0, {str(project_root)!r})
+start = time.perf_counter()
+import src.api.chat_api as api
+import_seconds = time.perf_counter() - start
+
+start = time.perf_counter()
+api.chat_agent.get_status()
+api.main_agent.get_status()
+ready_seconds = time.perf_counter() - start
+
+heavy = [m for m in {HEAVY_MODULES!r} if m in sys.modules]
+print(json.dumps({{"import": import_seconds, "ready": ready_seconds, "heavy": heavy}}))
+"""
+
+
+def run_once() -> dict:
+    import json
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=str(project_root), capture_output=True, text=True, timeout=120
+    )
+    if result.returncode != 0:
+        print(result.stderr)
+        raise RuntimeError("chat_api import failed")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+print("=" * 70)
+print("PANAVERSITY ASSISTANT - API STARTUP BENCHMARK")
+print("=" * 70)
+
+samples = [run_once() for _ in range(RUNS)]
+import_times = [s["import"] for s in samples]
+ready_times = [s["import"] + s["ready"] for s in samples]
+heavy = sorted({m for s in samples for m in s["heavy"]})
+
+print(f"Runs:             {RUNS}")
+print(f"Import (median):  {statistics.median(import_times) * 1000:.0f} ms "
+      f"(min {min(import_times) * 1000:.0f} / max {max(import_times) * 1000:.0f})")
+print(f"Ready (median):   {statistics.median(ready_times) * 1000:.0f} ms")
+print(f"Heavy modules:    {', '.join(heavy) if heavy else 'none'}")
+
+failed = False
+if heavy:
+    print(f"  [FAIL] Imported at startup: {', '.join(heavy)}")
+    failed = True
+if statistics.median(ready_times) > BUDGET_SECONDS:
+    print(f"  [FAIL] Median time-to-ready above {BUDGET_SECONDS:.1f}s budget")
+    failed = True
+
+if failed:
+    sys.exit(1)
+print("  [OK] Startup within budget")
@@ -64,35 +64,48 @@ async def run_stress_test():
     print("[INIT] Completed. Starting Transmission Loop...")
     print("-" * 60)
 
-    # EXECUTION LOOP (10 Iterations)
+    # WHATSAPP: one paced batch per approach, all on the same open browser session
     # ---------------------------------------------------------
+    wa_batches = {1: [], 2: [], 3: []}
     for i in range(1, 11):
-        print(f"\n📢 --- ITERATION {i}/10 ---")
-        
-        # Rotational Approach: 1=Skill, 2=Agent, 3=MCP
         mode = (i % 3)
         if mode == 0: mode = 3
-        
-        # --- WHATSAPP ---
-        wa_msg = f"Stress Test Msg {i}/10 [Mode: {mode}] - PANA-AI"
+        wa_batches[mode].append((wa_target, f"Stress Test Msg {i}/10 [Mode: {mode}] - PANA-AI"))
+
+    for mode, batch in wa_batches.items():
+        print(f"\n📢 --- WHATSAPP BATCH [Mode: {mode}] ({len(batch)} messages) ---")
         try:
             if mode == 1:
-                print(f"   [WhatsApp][Skill] Sending: '{wa_msg}'")
-                res = await wa_skill.send_message_async(wa_target, wa_msg)
+                print("   [WhatsApp][Skill] Sending batch...")
+                res = await wa_skill.send_messages_bulk_async(batch)
             elif mode == 2:
-                print(f"   [WhatsApp][Agent] Sending: '{wa_msg}'")
-                res = wa_agent.send_message(wa_target, wa_msg)
+                print("   [WhatsApp][Agent] Sending batch...")
+                res = wa_agent.send_messages_bulk(batch)
             else: # mode 3
-                print(f"   [WhatsApp][MCP]   Sending: '{wa_msg}'")
-                res = wa_mcp.call_tool("send_message", {"number": wa_target, "message": wa_msg})
-            
-            if res.get("success") or res.get("status") == "sent":
-                print("   ✅ Delivered")
-            else:
+                print("   [WhatsApp][MCP]   Sending batch...")
+                res = wa_mcp.call_tool("send_messages_bulk", {
+                    "messages": [{"number": number, "message": msg} for number, msg in batch]
+                })
+
+            if not res.get("results"):
                 print(f"   ❌ Failed: {res}")
+            for (_, wa_msg), item in zip(batch, res.get("results", [])):
+                if item.get("success"):
+                    print(f"   ✅ {item.get('status')}: '{wa_msg}'")
+                else:
+                    print(f"   ❌ Failed: '{wa_msg}' - {item.get('error')}")
         except Exception as e:
             print(f"   ❌ Exception: {e}")
 
+    # EXECUTION LOOP (10 Iterations)
+    # ---------------------------------------------------------
+    for i in range(1, 11):
+        print(f"\n📢 --- ITERATION {i}/10 ---")
+        
+        # Rotational Approach: 1=Skill, 2=Agent, 3=MCP
+        mode = (i % 3)
+        if mode == 0: mode = 3
+        
         # --- EMAIL ---
         email_subj = f"PanaServer Stress Test {i}/10 [Mode: {mode}]"
         email_body = f"This is automated verification message {i} of 10.\nMode: {mode}\nTimestamp: {os.times()}"
@@ -0,0 +1,76 @@
+"""
+Tests for the dispatch queue's retry handling (no SMTP or browser needed)
+"""
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.utils.dispatch_queue import DispatchQueue
+
+
+def make_queue(tmp_path):
+    return DispatchQueue(queue_dir=str(tmp_path / "Queue"),
+                         dead_letter_path=str(tmp_path / "dead_letter.jsonl"))
+
+
+def test_partial_failure_retries_only_the_retry_payload(tmp_path):
+    dispatcher = make_queue(tmp_path)
+    calls = []
+
+    def handler(payload):
+        calls.append(list(payload["emails"]))
+        if len(calls) == 1:
+            # First attempt: "b" did not go out
+            return {"success": False, "error": "1 of 2 failed", "retry_payload": {"emails": ["b"]}}
+        return {"success": True}
+
+    dispatcher.register("whatsapp_alert", handler, max_retries=3, backoff=0)
+    dispatcher.start()
+    try:
+        dispatcher.enqueue("whatsapp_alert", {"emails": ["a", "b"]})
+        assert dispatcher.join(timeout=10)
+    finally:
+        dispatcher.stop()
+
+    assert calls == [["a", "b"], ["b"]]
+    assert list((tmp_path / "Queue").glob("*.json")) == []
+
+
+def test_retry_payload_is_persisted_for_recovery(tmp_path):
+    dispatcher = make_queue(tmp_path)
+    dispatcher.register("whatsapp_alert",
+                        lambda payload: {"success": False, "retry_payload": {"emails": ["b"]}},
+                        max_retries=3, backoff=60)
+    dispatcher.start()
+    try:
+        dispatcher.enqueue("whatsapp_alert", {"emails": ["a", "b"]})
+        dispatcher.join(timeout=2)  # Stays pending: the retry is a minute away
+    finally:
+        dispatcher.stop()
+
+    # A restart would resend only the alert that failed
+    [job_file] = (tmp_path / "Queue").glob("*.json")
+    job = json.loads(job_file.read_text(encoding="utf-8"))
+    assert job["payload"] == {"emails": ["b"]}
+    assert job["attempts"] == 1
+
+
+def test_failure_without_retry_payload_keeps_the_original(tmp_path):
+    dispatcher = make_queue(tmp_path)
+    calls = []
+
+    def handler(payload):
+        calls.append(payload)
+        return len(calls) > 1
+
+    dispatcher.register("email_alert", handler, max_retries=3, backoff=0)
+    dispatcher.start()
+    try:
+        dispatcher.enqueue("email_alert", {"subject": "PIAIC"})
+        assert dispatcher.join(timeout=10)
+    finally:
+        dispatcher.stop()
+
+    assert calls == [{"subject": "PIAIC"}, {"subject": "PIAIC"}]
@@ -0,0 +1,36 @@
+"""
+Tests for the WhatsApp inbox watcher's event filtering (no browser needed)
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.utils.keyword_matcher import KeywordMatcher
+from skills.whatsapp_skill.watcher import relevant_messages
+
+MATCHER = KeywordMatcher({"relevant": ["piaic"]})
+
+
+def event(title, last_message, outgoing=False, type="new_message", unread="1"):
+    return {"type": type, "title": title, "last_message": last_message,
+            "unread": unread, "timestamp": "10:42", "outgoing": outgoing}
+
+
+def test_incoming_match_is_reported():
+    matches = relevant_messages([event("Ali", "PIAIC class moved")], MATCHER)
+    assert len(matches) == 1
+    assert matches[0]["matched_keyword"] == "piaic"
+    assert matches[0]["source"] == "live"
+    assert "outgoing" not in matches[0]
+
+
+def test_outgoing_row_is_not_a_match():
+    # Our own alert quoting the keyword must not trigger another alert
+    alert = event("Ali", "🔔 System Trigger: Trigger from whatsapp: {\"title\": \"PIAIC\"}", outgoing=True)
+    assert relevant_messages([alert], MATCHER) == []
+
+
+def test_admin_chat_is_excluded():
+    events = [event("+92 324 4279017", "PIAIC question"), event("Admin", "PIAIC question")]
+    assert relevant_messages(events, MATCHER, exclude_chats=["+923244279017", "admin"]) == []
@@ -10,6 +10,7 @@ from datetime import datetime
 from typing import List, Dict, Any
 
 from src.utils.config import Config
+from src.utils.keyword_matcher import KeywordMatcher
 from agents.email_agent import EmailAgent
 
 import os # Added os import
@@ -56,16 +57,27 @@ class WatcherSystem:
             self.whatsapp_skill = WhatsAppSkill(
                 enabled=True,
                 headless=False, 
-                session_dir=session_path
+                session_dir=session_path,
+                idle_timeout=self.config.WHATSAPP_IDLE_TIMEOUT
             )
+            
+            # Push mode: new messages are reported by the page itself; polling stays as a fallback
+            self.whatsapp_watcher = None
+            self.whatsapp_matcher = KeywordMatcher({"relevant": self.config.FILTER_KEYWORDS})
+            self.last_whatsapp_poll = 0.0
+            if self.config.WHATSAPP_PUSH_ENABLED:
+                from skills.whatsapp_skill.watcher import WhatsAppInboxWatcher
+                self.whatsapp_watcher = WhatsAppInboxWatcher(self.whatsapp_skill, self.on_whatsapp_events)
 
     def run(self):
         logger.info("Starting Watcher System...")
         time.sleep(2) # Give user time to read logs
+        if self.whatsapp_enabled and self.whatsapp_watcher:
+            self.whatsapp_watcher.start()
         while True:
             try:
                 self.check_email()
-                if self.whatsapp_enabled:
+                if self.whatsapp_enabled and self.whatsapp_poll_due():
                      self.check_whatsapp()
                 
                 # Check Odoo (Sync tasks/leads)
@@ -115,9 +127,24 @@ subject: {email.get('subject')}
         # but we could poll for 'Assigned' tasks here.
         pass
 
+    def whatsapp_poll_due(self) -> bool:
+        """Poll every loop without push mode, otherwise only every WHATSAPP_CHECK_INTERVAL minutes"""
+        if not (self.whatsapp_watcher and self.whatsapp_watcher.active):
+            return True
+        return time.time() - self.last_whatsapp_poll >= self.config.WHATSAPP_CHECK_INTERVAL * 60
+
+    def on_whatsapp_events(self, events: List[Dict[str, Any]]):
+        """Push-mode callback: write a task for every new message matching the filter keywords"""
+        from skills.whatsapp_skill.watcher import relevant_messages
+        admin_chats = [self.config.ADMIN_WHATSAPP, self.config.ADMIN_WHATSAPP_CHAT]
+        for msg in relevant_messages(events, self.whatsapp_matcher, exclude_chats=admin_chats):
+            logger.info(f"Live WhatsApp message from {msg['title']} (keyword: {msg['matched_keyword']})")
+            self.write_whatsapp_task(msg)
+
     def check_whatsapp(self):
         """Check for new relevant WhatsApp messages"""
         logger.info("Checking WhatsApp...")
+        self.last_whatsapp_poll = time.time()
         try:
             # Check for specific keywords
             result = self.whatsapp_skill.check_messages(
@@ -131,14 +158,21 @@ subject: {email.get('subject')}
                 logger.info(f"Found {len(messages)} relevant WhatsApp messages.")
                 
                 for msg in messages:
-                    # Create unique ID based on timestamp and title
-                    msg_id = f"{msg.get('title')}_{int(datetime.now().timestamp())}"
-                    safe_id = "".join([c for c in msg_id if c.isalnum() or c in "_-"])
-                    
-                    file_name = f"WHATSAPP_{safe_id}.md"
-                    file_path = self.needs_action_path / file_name
-                    
-                    content = f"""---
+                    self.write_whatsapp_task(msg)
+                        
+        except Exception as e:
+            logger.error(f"WhatsApp check failed: {e}")
+
+    def write_whatsapp_task(self, msg: Dict[str, Any]):
+        """Create a Needs_Action task for one WhatsApp chat"""
+        # Create unique ID based on timestamp and title
+        msg_id = f"{msg.get('title')}_{int(datetime.now().timestamp())}"
+        safe_id = "".join([c for c in msg_id if c.isalnum() or c in "_-"])
+        
+        file_name = f"WHATSAPP_{safe_id}.md"
+        file_path = self.needs_action_path / file_name
+        
+        content = f"""---
 type: whatsapp
 source: whatsapp_web
 status: pending
@@ -155,13 +189,10 @@ Title: {msg.get('title')}
 Unread Count: {msg.get('unread')}
 Source: {msg.get('source', 'main_list')}
 """
-                    if not file_path.exists():
-                        with open(file_path, "w", encoding="utf-8") as f:
-                            f.write(content)
-                        logger.info(f"Created WhatsApp task: {file_name}")
-                        
-        except Exception as e:
-            logger.error(f"WhatsApp check failed: {e}")
+        if not file_path.exists():
+            with open(file_path, "w", encoding="utf-8") as f:
+                f.write(content)
+            logger.info(f"Created WhatsApp task: {file_name}")
 
 if __name__ == "__main__":
     watchers = WatcherSystem()